@@ -0,0 +1,172 @@
+"""
+backends.py
+-----------
+
+OCR engines the processors can hand images to.
+
+The processors never call an OCR library directly. They ask `get_backend` for the engine selected by the run's
+`ProcessingConfig.ocr_backend` and pass it an in-memory image.
+
+- `PytesseractBackend` ("pytesseract"): the default. Starts a tesseract process for every image, which reloads the
+  language model each time.
+- `TesserocrBackend` ("tesserocr"): keeps a pool of tesseract API handles open through the tesserocr bindings. The
+  model is loaded once per handle and images are passed straight from memory, with no subprocess or temp files. The
+  handles release the GIL while recognising, so a pool of `ocr_threads` handles serves that many threads at once.
+- `NullBackend` ("null"): recognises nothing. Measures the rest of the pipeline, see documentanalysis.benchmark.
+
+Backends are created once per process and reused for every document that process handles. Each imports its OCR
+library when it is created, so only the selected engine is ever loaded.
+
+Classes:
+    OCRBackend: Interface for an OCR engine.
+    PytesseractBackend: tesseract through the pytesseract command line wrapper.
+    TesserocrBackend: A pool of long lived tesseract API handles through tesserocr.
+    NullBackend: An engine that returns no text.
+
+Functions:
+    get_backend: The backend selected by a run's configuration.
+"""
+
+import os
+import queue
+from abc import abstractmethod
+from functools import cache
+from typing import Any, Protocol, runtime_checkable
+
+from documentanalysis.config import ProcessingConfig
+
+
+@runtime_checkable
+class OCRBackend(Protocol):
+    """
+    Interface for an OCR engine.
+    """
+
+    name: str
+
+    @abstractmethod
+    def identity(self) -> str:
+        """
+        Engine, version and settings. Part of every OCR cache key so switching engines does not serve stale results.
+        """
+        return ""
+
+    @abstractmethod
+    def image_to_string(self, image: Any) -> str:
+        """
+        Recognise the text in an in-memory image.
+        """
+        return ""
+
+    def image_to_text(self, image: Any) -> tuple[str, float | None]:
+        """
+        Recognise the text in an in-memory image, with the engine's mean confidence from 0 to 100.
+        The confidence is None for engines that cannot report it from the same recognition pass.
+        """
+        return self.image_to_string(image), None
+
+    def close(self) -> None:
+        """
+        Release any resources held by the engine.
+        """
+
+
+class PytesseractBackend(OCRBackend):
+    """
+    tesseract through the pytesseract command line wrapper.
+    """
+
+    name = "pytesseract"
+
+    def __init__(self, lang: str = "eng", workers: int = 1) -> None:
+        import pytesseract  # pylint: disable=import-outside-toplevel,import-error
+
+        # Every call starts its own tesseract process, so workers needs no pool here.
+        self.pytesseract = pytesseract
+        self.lang = lang
+        self._identity: str | None = None
+
+    def identity(self) -> str:
+        if self._identity is None:
+            self._identity = f"tesseract {self.pytesseract.get_tesseract_version()} {self.lang}"
+        return self._identity
+
+    def image_to_string(self, image: Any) -> str:
+        return self.pytesseract.image_to_string(image, lang=self.lang)
+
+
+class TesserocrBackend(OCRBackend):
+    """
+    A pool of long lived tesseract API handles through tesserocr.
+    Each handle is used by one thread at a time; callers wait for a free handle.
+    """
+
+    name = "tesserocr"
+
+    def __init__(self, lang: str = "eng", workers: int = 1) -> None:
+        try:
+            import tesserocr  # pylint: disable=import-outside-toplevel,import-error
+        except ImportError as e:
+            raise ImportError("The tesserocr OCR backend needs the tesserocr package: pip install tesserocr") from e
+        self.lang = lang
+        self._version = tesserocr.tesseract_version().splitlines()[0]
+        self._handles: queue.Queue = queue.Queue()
+        for _ in range(max(workers, 1)):
+            self._handles.put(tesserocr.PyTessBaseAPI(lang=lang))
+
+    def identity(self) -> str:
+        return f"{self._version} {self.lang}"
+
+    def image_to_string(self, image: Any) -> str:
+        return self.image_to_text(image)[0]
+
+    def image_to_text(self, image: Any) -> tuple[str, float | None]:
+        handle = self._handles.get()
+        try:
+            handle.SetImage(image)
+            return handle.GetUTF8Text(), float(handle.MeanTextConf())
+        finally:
+            self._handles.put(handle)
+
+    def close(self) -> None:
+        while not self._handles.empty():
+            self._handles.get_nowait().End()
+
+
+class NullBackend(OCRBackend):
+    """
+    An engine that returns no text, for measuring everything but OCR.
+    """
+
+    name = "null"
+
+    def __init__(self, lang: str = "eng", workers: int = 1) -> None:
+        self.lang = lang
+
+    def identity(self) -> str:
+        return f"null {self.lang}"
+
+    def image_to_string(self, image: Any) -> str:
+        return ""
+
+
+BACKENDS: dict[str, type] = {
+    PytesseractBackend.name: PytesseractBackend,
+    TesserocrBackend.name: TesserocrBackend,
+    NullBackend.name: NullBackend,
+}
+
+
+@cache
+def _open_backend(name: str, lang: str, workers: int, pid: int) -> OCRBackend:
+    # Keyed by process id: a forked worker, such as a page worker, must not share its parent's engine handles.
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown OCR backend {name}, expected one of {sorted(BACKENDS)}")
+    return BACKENDS[name](lang=lang, workers=workers)
+
+
+def get_backend(config: ProcessingConfig) -> OCRBackend:
+    """
+    Return the OCR backend selected by the run, created once per process.
+    """
+    return _open_backend(config.ocr_backend, config.ocr_lang, config.ocr_threads, os.getpid())
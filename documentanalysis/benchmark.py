@@ -0,0 +1,339 @@
+"""
+benchmark.py
+------------
+
+Throughput benchmarks for the extraction pipeline over a synthetic corpus.
+
+The corpus is generated locally so the numbers do not depend on the plat archive:
+
+- searchable: PDF pages with a text layer and no images.
+- scanned: PDF pages that are a single full page raster of text.
+- mixed: PDF pages with a text layer and a raster covering half the page.
+- small_images: PDF pages carrying many small rasters, like seals and logos.
+- huge_raster: a PDF page carrying one very large raster, like a survey plat sheet.
+- clipping: a PNG of text, like a newspaper clipping.
+
+Each target (`PDFProcessor.process`, `PDFProcessorNew.extract_text`, `PDFProcessorNew.image_extraction`,
+`PNGProcessor.process` and the writers) is timed on each document it applies to, in a freshly spawned process that
+has not built the corpus. Peak memory is the process's high water mark, reset when the case starts so it is
+attributable to the case: forked processes inherit their parent's peak and ru_maxrss never goes down, so on Linux the
+mark is reset through /proc/self/clear_refs and read from /proc/self/status. Elsewhere ru_maxrss of the spawned
+process is reported. Results are reported as JSON with pages/sec, MB/sec and peak memory.
+
+OCR usually dominates. Run with --ocr-backend null to measure everything else.
+
+The report also holds the import time of the modules the CLI and the ingestion workers load before their first file,
+measured in a fresh interpreter and checked against STARTUP_BUDGET_SECONDS. PyMuPDF, pypdf, OpenCV, tesseract and the
+database drivers are only imported once a document or writer needs them, and must not show up there.
+
+    python -m documentanalysis.benchmark --scale 2 --output bench.json
+
+Functions:
+    build_corpus: Generate the synthetic documents.
+    reset_peak_rss: Reset the peak memory of this process, where the platform allows it.
+    run_case: Time one target on one document.
+    measure_startup: Time importing a module in a fresh interpreter.
+    run_benchmarks: Time every target on the corpus.
+"""
+
+import io
+import json
+import logging
+import multiprocessing
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, replace
+from pathlib import Path
+from typing import Any, Callable
+
+import click
+import fitz
+from PIL import Image, ImageDraw  # pylint: disable=import-error
+
+from documentanalysis.config import ProcessingConfig
+from documentanalysis.png import PDFProcessorNew
+from documentanalysis.processors import PDFProcessor, PNGProcessor
+from documentanalysis.store import FileWriter
+
+logger: logging.Logger = logging.getLogger(name=__name__)
+
+LETTER: tuple[int, int] = (612, 792)
+LINE: str = "Lot 31 Block 2 Spyglass Ridge, recorded in Book 1234 Page 567 of the county records."
+PDF_TARGETS: tuple[str, ...] = (
+    "PDFProcessor.process",
+    "PDFProcessorNew.extract_text",
+    "PDFProcessorNew.image_extraction",
+)
+PNG_TARGETS: tuple[str, ...] = ("PNGProcessor.process",)
+WRITER_TARGETS: tuple[str, ...] = ("FileWriter.save",)
+WRITER_RECORDS: int = 200
+
+# Modules imported by the CLI and by ingestion workers before their first file, and the import time they may take.
+STARTUP_MODULES: tuple[str, ...] = ("documentanalysis.cli", "documentanalysis.ingest", "documentanalysis.store")
+STARTUP_BUDGET_SECONDS: float = 0.5
+# Libraries that are only to be imported when a document or writer needs them.
+HEAVY_MODULES: tuple[str, ...] = (
+    "fitz", "pymupdf", "pypdf", "PIL", "pytesseract", "tesserocr", "pymongo", "cv2", "numpy", "matplotlib"
+)
+
+
+def text_raster(width: int, height: int, lines: int) -> Image.Image:
+    """
+    A grayscale image of lines of text, standing in for a scanned page.
+    """
+    image = Image.new("L", (width, height), color=255)
+    draw = ImageDraw.Draw(image)
+    step = max(height // (lines + 1), 12)
+    for line in range(lines):
+        draw.text((20, 10 + line * step), LINE, fill=0)
+    return image
+
+
+def png_bytes(image: Image.Image) -> bytes:
+    """
+    The image encoded as PNG.
+    """
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _add_text(page: fitz.Page, lines: int, top: float = 36) -> None:
+    for line in range(lines):
+        page.insert_text((36, top + line * 14), LINE, fontsize=10)
+
+
+def build_corpus(directory: Path, scale: int = 1) -> dict[str, Path]:
+    """
+    Generate the synthetic documents into directory.
+    scale multiplies the page count of each PDF.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    page_raster = png_bytes(text_raster(1275, 1650, 40))
+    small_raster = png_bytes(text_raster(120, 60, 2))
+    huge_raster = png_bytes(text_raster(7200, 5400, 120))
+    corpus: dict[str, Path] = {}
+
+    def save(name: str, build_page: Callable[[fitz.Page], None], pages: int) -> None:
+        with fitz.open() as doc:
+            for _ in range(pages):
+                build_page(doc.new_page(width=LETTER[0], height=LETTER[1]))
+            corpus[name] = directory / f"{name}.pdf"
+            doc.save(corpus[name], deflate=True)
+
+    save("searchable", lambda page: _add_text(page, 50), 10 * scale)
+    save("scanned", lambda page: page.insert_image(page.rect, stream=page_raster), 4 * scale)
+
+    def mixed(page: fitz.Page) -> None:
+        _add_text(page, 25)
+        page.insert_image(fitz.Rect(0, LETTER[1] / 2, LETTER[0], LETTER[1]), stream=page_raster)
+
+    save("mixed", mixed, 4 * scale)
+
+    def small_images(page: fitz.Page) -> None:
+        for index in range(20):
+            x, y = 36 + (index % 4) * 130, 36 + (index // 4) * 140
+            page.insert_image(fitz.Rect(x, y, x + 120, y + 60), stream=small_raster)
+
+    save("small_images", small_images, 2 * scale)
+    save("huge_raster", lambda page: page.insert_image(page.rect, stream=huge_raster), 1)
+
+    corpus["clipping"] = directory / "clipping.png"
+    text_raster(1600, 2400, 60).save(corpus["clipping"])
+    return corpus
+
+
+def page_count(path: Path) -> int:
+    """
+    Number of pages in a document, 1 for an image.
+    """
+    if path.suffix.lower() != ".pdf":
+        return 1
+    with fitz.open(path) as doc:
+        return len(doc)
+
+
+def _run_target(target: str, path: Path, config: ProcessingConfig, scratch: Path) -> int:
+    """
+    Run target on path and return the number of bytes it produced or processed.
+    """
+    if target == "PDFProcessor.process":
+        PDFProcessor(path, logger, config).process()
+    elif target == "PDFProcessorNew.extract_text":
+        processor = PDFProcessorNew(path, logger)
+        processor.extract_text()
+        processor.close()
+    elif target == "PDFProcessorNew.image_extraction":
+        processor = PDFProcessorNew(path, logger)
+        for _ in processor.image_extraction():
+            pass
+        processor.close()
+    elif target == "PNGProcessor.process":
+        PNGProcessor(path, logger, config).process()
+    elif target == "FileWriter.save":
+        text = "\n".join([LINE] * 200)
+        for record in range(WRITER_RECORDS):
+            FileWriter(auth={}, path={"uri": str(scratch / f"{record}.txt")}).save({"text": text}, logger=logger)
+        return WRITER_RECORDS * len(text)
+    else:
+        raise ValueError(f"Unknown benchmark target {target}")
+    return path.stat().st_size
+
+
+def _memory_status() -> dict[str, int] | None:
+    """
+    The current (VmRSS) and peak (VmHWM) resident set size of this process in bytes, None where /proc is missing.
+    """
+    try:
+        with open("/proc/self/status", encoding="utf-8") as status:
+            lines = status.read().splitlines()
+    except OSError:
+        return None
+    sizes = {}
+    for line in lines:
+        name, _, value = line.partition(":")
+        if name in ("VmRSS", "VmHWM"):
+            sizes[name] = int(value.split()[0]) * 1024
+    return sizes if len(sizes) == 2 else None
+
+
+def reset_peak_rss() -> int | None:
+    """
+    Reset the peak resident set size of this process to its current size and return that size in bytes.
+    Returns None where the peak cannot be reset, anywhere but Linux.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="utf-8") as clear_refs:
+            clear_refs.write("5")
+    except OSError:
+        return None
+    status = _memory_status()
+    return None if status is None else status["VmRSS"]
+
+
+def run_case(target: str, path: str, config: ProcessingConfig) -> dict[str, Any]:
+    """
+    Time one target on one document.
+    peak_rss_mb is the peak resident set size of the process during the case, and rss_growth_mb how far that is above
+    what the process held when the case started. Both are measured from a peak reset at the start of the case where
+    the platform allows it, so they hold in any process; elsewhere run the case in a freshly spawned process.
+    """
+    document = Path(path)
+    baseline_rss = reset_peak_rss()
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    rss_unit = 1 if sys.platform == "darwin" else 1024
+    if baseline_rss is None:
+        baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * rss_unit
+    with tempfile.TemporaryDirectory() as scratch:
+        start = time.perf_counter()
+        size = _run_target(target, document, config, Path(scratch))
+        seconds = time.perf_counter() - start
+    status = _memory_status()
+    max_rss = status["VmHWM"] if status is not None else resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * rss_unit
+    pages = WRITER_RECORDS if target in WRITER_TARGETS else page_count(document)
+    return {
+        "case": document.stem,
+        "target": target,
+        "pages": pages,
+        "bytes": size,
+        "seconds": round(seconds, 6),
+        "pages_per_sec": round(pages / seconds, 3) if seconds else None,
+        "mb_per_sec": round(size / seconds / 1e6, 3) if seconds else None,
+        "peak_rss_mb": round(max_rss / 1e6, 3),
+        "rss_growth_mb": round(max(max_rss - baseline_rss, 0) / 1e6, 3),
+    }
+
+
+def measure_startup(module: str) -> dict[str, Any]:
+    """
+    Time importing module in a fresh interpreter, and list the heavy libraries the import pulled in.
+    """
+    code = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        f"import {module}\n"
+        "print(time.perf_counter() - start)\n"
+        f"print(' '.join(name for name in {HEAVY_MODULES!r} if name in sys.modules))\n"
+    )
+    root = Path(__file__).resolve().parent.parent
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=root, check=True, capture_output=True, text=True
+    ).stdout.splitlines()
+    seconds = float(output[0])
+    return {
+        "module": module,
+        "seconds": round(seconds, 6),
+        "budget_seconds": STARTUP_BUDGET_SECONDS,
+        "within_budget": seconds <= STARTUP_BUDGET_SECONDS,
+        "heavy_modules": output[1].split() if len(output) > 1 else [],
+    }
+
+
+def cases(corpus: dict[str, Path]) -> list[tuple[str, Path]]:
+    """
+    Every (target, document) pair to time.
+    """
+    selected: list[tuple[str, Path]] = []
+    for path in corpus.values():
+        targets = PDF_TARGETS if path.suffix.lower() == ".pdf" else PNG_TARGETS
+        selected.extend((target, path) for target in targets)
+    selected.extend((target, corpus["searchable"]) for target in WRITER_TARGETS)
+    return selected
+
+
+def run_benchmarks(directory: Path, config: ProcessingConfig, scale: int = 1, repeat: int = 1) -> dict[str, Any]:
+    """
+    Build the corpus in directory and time every target on it, each run in its own spawned process, which starts
+    without the memory this process used to build the corpus.
+    The fastest of repeat runs is kept.
+    """
+    corpus = build_corpus(directory, scale=scale)
+    results: list[dict[str, Any]] = []
+    for target, path in cases(corpus):
+        runs = []
+        for _ in range(repeat):
+            with ProcessPoolExecutor(
+                max_workers=1, max_tasks_per_child=1, mp_context=multiprocessing.get_context("spawn")
+            ) as pool:
+                runs.append(pool.submit(run_case, target, str(path), config).result())
+        results.append(min(runs, key=lambda run: run["seconds"]))
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "pymupdf": fitz.VersionBind,
+        },
+        "config": asdict(config),
+        "scale": scale,
+        "startup": [measure_startup(module) for module in STARTUP_MODULES],
+        "results": results,
+    }
+
+
+@click.command()
+@click.option("--scale", default=1, show_default=True, help="Multiplier for the page count of each PDF.")
+@click.option("--repeat", default=1, show_default=True, help="Runs per case, the fastest is reported.")
+@click.option("--ocr-backend", default="pytesseract", show_default=True, help="OCR engine, null skips OCR.")
+@click.option("--corpus-dir", type=click.Path(path_type=Path), default=None, help="Keep the corpus here.")
+@click.option("--output", type=click.Path(path_type=Path), default=None, help="Write the JSON here, not stdout.")
+def main(scale: int, repeat: int, ocr_backend: str, corpus_dir: Path | None, output: Path | None) -> None:
+    """
+    Benchmark the extraction pipeline on a synthetic corpus.
+    """
+    config = replace(ProcessingConfig(), ocr_backend=ocr_backend)
+    with tempfile.TemporaryDirectory() as scratch:
+        report = run_benchmarks(corpus_dir or Path(scratch), config, scale=scale, repeat=repeat)
+    text = json.dumps(report, indent=2)
+    if output is None:
+        click.echo(text)
+    else:
+        output.write_text(text, encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()  # pylint: disable=no-value-for-parameter
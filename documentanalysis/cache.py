@@ -0,0 +1,147 @@
+"""
+cache.py
+--------
+
+Content addressed cache of OCR results.
+
+Our archives hold many copies of the same scanned pages. `OCRCache` stores the text tesseract produced for an image
+in a SQLite file, keyed by a hash of the raw image bytes together with the OCR engine version and configuration, so
+an identical image is only ever OCR'd once. The cache is limited in size and evicts the least recently used results
+first. WAL mode lets the ingestion worker processes share one cache file. Each cache keeps a running total of the
+size rather than summing the table on every insert, and re-reads the real size every SIZE_CHECK_PUTS inserts and
+whenever it evicts.
+
+Classes:
+    OCRCache: SQLite backed OCR result cache with LRU eviction.
+
+Functions:
+    get_cache: The cache for a run's configuration, opened once per process.
+"""
+
+import hashlib
+import os
+import sqlite3
+import time
+from functools import cache
+from pathlib import Path
+
+from documentanalysis.config import ProcessingConfig
+
+SCHEMA: str = """
+CREATE TABLE IF NOT EXISTS ocr_cache (
+    key TEXT PRIMARY KEY,
+    text TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ocr_cache_last_used ON ocr_cache (last_used);
+"""
+
+# Inserts between re-reading the cache size, to take in what other processes sharing the file have stored.
+SIZE_CHECK_PUTS: int = 1000
+
+
+class OCRCache:
+    """
+    SQLite backed cache of OCR text keyed by image content.
+
+    cache = OCRCache("ocr_cache.sqlite", max_bytes=1 << 30)
+    key = cache.key(image_bytes, engine="tesseract 5.3.0")
+    text = cache.get(key)
+    if text is None:
+        text = ocr(image)
+        cache.put(key, text)
+    """
+
+    def __init__(self, path: Path | str, max_bytes: int = 1 << 30) -> None:
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+        self.hits = 0
+        self.misses = 0
+        self._size = self.size()
+        self._puts = 0
+
+    @staticmethod
+    def key(data: bytes | memoryview, engine: str) -> str:
+        """
+        Build the cache key for an encoded image and the identity of the engine that OCRs it.
+        """
+        digest = hashlib.sha256(engine.encode("utf-8"))
+        digest.update(data)
+        return digest.hexdigest()
+
+    def get(self, key: str) -> str | None:
+        """
+        Return the cached text for key, or None on a miss.
+        """
+        row = self.connection.execute("SELECT text FROM ocr_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.connection.execute("UPDATE ocr_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+        return row[0]
+
+    def put(self, key: str, text: str) -> None:
+        """
+        Store the text for key, evicting the least recently used results if the cache is over its limit.
+        """
+        size = len(text.encode("utf-8")) + len(key)
+        self.connection.execute(
+            "INSERT OR REPLACE INTO ocr_cache (key, text, size, last_used) VALUES (?, ?, ?, ?)",
+            (key, text, size, time.time()),
+        )
+        # A replaced result is counted twice until the next re-read, which only brings eviction forward.
+        self._size += size
+        self._puts += 1
+        if self._puts % SIZE_CHECK_PUTS == 0:
+            self._size = self.size()
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def size(self) -> int:
+        """
+        Total size of the cached results in bytes.
+        """
+        return self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM ocr_cache").fetchone()[0]
+
+    def evict(self) -> None:
+        """
+        Remove the least recently used results until the cache is back under 90% of its limit.
+        """
+        target = int(self.max_bytes * 0.9)
+        total = self.size()
+        stale: list[tuple[str]] = []
+        for key, size in self.connection.execute("SELECT key, size FROM ocr_cache ORDER BY last_used"):
+            if total <= target:
+                break
+            stale.append((key,))
+            total -= size
+        self.connection.executemany("DELETE FROM ocr_cache WHERE key = ?", stale)
+        self._size = total
+
+    def close(self) -> None:
+        """
+        Close the database connection.
+        """
+        self.connection.close()
+
+
+@cache
+def _open_cache(path: str, max_bytes: int, pid: int) -> OCRCache:
+    # Keyed by process id: a forked worker, such as a page worker, must not share its parent's connection.
+    return OCRCache(path, max_bytes=max_bytes)
+
+
+def get_cache(config: ProcessingConfig) -> OCRCache | None:
+    """
+    Return the OCR cache configured for the run, or None when caching is off.
+    The cache is opened once per process and shared by every document it handles.
+    """
+    if not config.ocr_cache_path:
+        return None
+    return _open_cache(config.ocr_cache_path, config.ocr_cache_max_bytes, os.getpid())
@@ -0,0 +1,115 @@
+"""
+classify.py
+-----------
+
+Decide, page by page, whether a PDF page needs OCR.
+
+Many recorded plats and CC&Rs are already searchable: PyMuPDF returns a good text layer and OCR'ing their images only
+repeats that work slowly. `classify_page` compares the density of the text layer with the area covered by images and
+picks one of three strategies:
+
+- TEXT: the text layer is dense enough and images are incidental. Extract the text, skip OCR.
+- BOTH: the text layer is dense enough but images cover a large part of the page. Extract the text and OCR the images.
+- OCR: there is little or no text layer. OCR the images.
+
+Classes:
+    PageDecision: The strategy chosen for a page and the measurements it was based on.
+
+Functions:
+    classify_page: Choose the strategy for a PyMuPDF page.
+"""
+
+from dataclasses import asdict, dataclass
+from typing import Any
+
+import fitz
+
+from documentanalysis.config import ProcessingConfig
+
+TEXT: str = "text"
+OCR: str = "ocr"
+BOTH: str = "both"
+
+POINTS_PER_INCH: int = 72
+
+
+@dataclass
+class PageDecision:
+    """
+    The strategy chosen for a page.
+
+    Attributes:
+    strategy (str): TEXT, OCR or BOTH.
+    text_chars (int): Non whitespace characters in the text layer.
+    text_density (float): text_chars per square inch of page.
+    image_coverage (float): Fraction of the page covered by images, capped at 1.
+    image_count (int): Number of images drawn on the page.
+    """
+
+    strategy: str
+    text_chars: int
+    text_density: float
+    image_coverage: float
+    image_count: int
+
+    @property
+    def extract_text(self) -> bool:
+        """
+        True when the text layer should be used.
+        """
+        return self.strategy in (TEXT, BOTH)
+
+    @property
+    def ocr(self) -> bool:
+        """
+        True when the page images should be OCR'd.
+        """
+        return self.strategy in (OCR, BOTH)
+
+    def as_dict(self) -> dict[str, Any]:
+        """
+        The decision as a plain dict for the document metadata.
+        """
+        return asdict(self)
+
+
+def image_coverage(page: fitz.Page) -> tuple[float, int]:
+    """
+    Return the fraction of the page covered by images and the number of images.
+    Overlapping images are counted twice, so the fraction is capped at 1.
+    """
+    page_rect = page.rect
+    page_area = abs(page_rect) or 1.0
+    images = page.get_image_info()
+    covered = sum(abs(fitz.Rect(image["bbox"]) & page_rect) for image in images)
+    return min(covered / page_area, 1.0), len(images)
+
+
+def classify_page(page: fitz.Page, text: str, config: ProcessingConfig) -> PageDecision:
+    """
+    Choose how to extract the text of a page.
+    text is the page's text layer, passed in so callers can reuse text they have already extracted.
+    """
+    text_chars = len("".join(text.split()))
+    square_inches = (page.rect.width / POINTS_PER_INCH) * (page.rect.height / POINTS_PER_INCH) or 1.0
+    text_density = text_chars / square_inches
+    coverage, image_count = image_coverage(page)
+
+    has_text = text_density >= config.text_min_density
+    if not config.fast_path:
+        strategy = BOTH if has_text else OCR
+    elif has_text:
+        strategy = BOTH if coverage > config.text_max_image_coverage else TEXT
+    elif image_count == 0:
+        # Nothing to OCR, whatever text layer there is will have to do.
+        strategy = TEXT
+    else:
+        strategy = OCR
+
+    return PageDecision(
+        strategy=strategy,
+        text_chars=text_chars,
+        text_density=round(text_density, 3),
+        image_coverage=round(coverage, 3),
+        image_count=image_count,
+    )
@@ -0,0 +1,407 @@
+"""
+cli.py
+------
+
+Command line interface for batch runs.
+
+    python -m documentanalysis.cli "documentanalysis/data/ccrs" --recursive \\
+        --writer file:documentanalysis/data/ocr_output --writer sqlite:plats.db --workers 8 --ocr-backend tesserocr
+
+Inputs are files, directories or glob patterns. Directories contribute the files directly inside them, or every file
+below them with --recursive. Files found in directories and globs are kept when their header is that of a registered
+file type, whatever their name (see documentanalysis.registry); files named explicitly are always processed and fail
+on their own if they cannot be.
+
+Each --writer is KIND:TARGET:
+
+- file:DIRECTORY writes the text of each document to DIRECTORY/<name>-<hash>.txt, the hash of the input's full path
+  keeping inputs of the same name in different directories apart.
+- shards:DIRECTORY appends every document to rotating, compressed JSON lines shards in DIRECTORY, with an index for
+  reading one back (see `ShardedFileWriter`). --shard-compression picks gzip, zstd or none.
+- mongo:mongodb://HOST:PORT/DATABASE/COLLECTION writes to MongoDB. Credentials come from documentanalysis.secure when
+  it exists, otherwise from MONGODB_USERNAME and MONGODB_PASSWORD.
+- sqlite:PATH writes to a local SQLite database with full text search.
+
+The Mongo and SQLite writers are built once per worker process and write in the background, see `QueuedWriter`.
+
+The state of every file is appended to a journal as the run goes (see documentanalysis.journal). A run that died part
+way is continued with --resume, which skips the files the journal records as finished; --retry-failed processes the
+ones that failed again. --timeout fails any file that takes longer, so one pathological plat cannot stall the batch.
+
+The command exits with status 1 when any file failed.
+
+--dry-run lists the files a run would process, skipping those the manifest says are unchanged, with their page and
+embedded image counts, and processes nothing.
+
+Classes:
+    Writers: Builds the writers for each document from the --writer specs.
+
+Functions:
+    parse_writer: Split a --writer spec into its kind and target.
+    discover: The files to process for a list of inputs.
+    estimate: Page and image counts of a file, without processing it.
+    main: The batch command.
+"""
+
+import functools
+import glob
+import logging
+import os
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Any, Iterable
+from urllib.parse import urlsplit
+
+import click
+
+from documentanalysis.config import ProcessingConfig
+from documentanalysis.hashing import bytes_sha256
+from documentanalysis.ingest import SKIPPED, BatchIngestor
+from documentanalysis.journal import Journal
+from documentanalysis.manifest import Manifest
+from documentanalysis.registry import PDF, TIFF, sniff
+from documentanalysis.store import (
+    FileWriter,
+    MongoWriter,
+    QueuedWriter,
+    ShardedFileWriter,
+    SQLiteWriter,
+    StoreWriter,
+)
+
+WRITER_KINDS: tuple[str, ...] = ("file", "shards", "mongo", "sqlite")
+
+OCR_OUTPUT_PATH: str = "documentanalysis/data/ocr_output/"
+MANIFEST_PATH: str = "documentanalysis/data/manifest.json"
+JOURNAL_PATH: str = "documentanalysis/data/journal.jsonl"
+DEFAULT_WRITERS: tuple[str, ...] = (f"file:{OCR_OUTPUT_PATH}", "mongo:mongodb://mongo:27017/hoa_docs/ccrs")
+LOG_FORMAT: str = "%(asctime)s %(levelname)-8s %(message)s"
+
+logger: logging.Logger = logging.getLogger(name=__name__)
+
+
+def parse_writer(spec: str) -> tuple[str, str]:
+    """
+    Split a KIND:TARGET writer spec into its kind and target.
+    """
+    kind, _, target = spec.partition(":")
+    if kind not in WRITER_KINDS or not target:
+        raise ValueError(f"Invalid writer {spec}, expected KIND:TARGET with KIND one of {list(WRITER_KINDS)}")
+    if kind == "mongo":
+        parts = urlsplit(target).path.strip("/").split("/")
+        if len(parts) != 2 or not all(parts):
+            raise ValueError(f"Invalid writer {spec}, expected mongo:mongodb://HOST:PORT/DATABASE/COLLECTION")
+    return kind, target
+
+
+@functools.cache
+def mongo_writer(uri: str) -> QueuedWriter:
+    """
+    The MongoWriter for uri shared by every document processed in this process, written to in the background.
+    """
+    parts = urlsplit(uri)
+    dbname, collection = parts.path.strip("/").split("/")
+    options: dict[str, Any] = {}
+    try:
+        from documentanalysis.secure import MONGODB_AUTHENTICATION  # pylint: disable=import-outside-toplevel
+
+        options["auth"] = MONGODB_AUTHENTICATION
+    except ImportError:
+        pass
+    host = parts._replace(path="/").geturl()
+    return QueuedWriter(writer=MongoWriter(path={"host": host, "dbname": dbname, "collection": collection}, **options))
+
+
+@functools.cache
+def sqlite_writer(uri: str) -> QueuedWriter:
+    """
+    The SQLiteWriter for uri shared by every document processed in this process, written to in the background.
+    """
+    return QueuedWriter(writer=SQLiteWriter(path={"uri": uri}))
+
+
+@functools.cache
+def sharded_writer(uri: str, compression: str) -> ShardedFileWriter:
+    """
+    The ShardedFileWriter for uri shared by every document processed in this process.
+    """
+    return ShardedFileWriter(path={"uri": uri}, compression=compression)
+
+
+def output_name(path: Path) -> str:
+    """
+    The name of the text file written for the input at path, unique to its full path.
+    """
+    return f"{path.stem}-{bytes_sha256(str(path.resolve()).encode('utf-8'))[:8]}.txt"
+
+
+@dataclass(frozen=True)
+class Writers:
+    """
+    Builds the writers for each document from the --writer specs.
+    Only holds the specs, so it pickles into the ingestion worker processes.
+
+    Attributes:
+    specs (tuple[str, ...]): KIND:TARGET writer specs, see `parse_writer`.
+    shard_compression (str): Compression of the shards written by shards writers, "gzip", "zstd" or "" for none.
+    """
+
+    specs: tuple[str, ...]
+    shard_compression: str = "gzip"
+
+    def __call__(self, path: Path) -> list[StoreWriter]:
+        writers: list[StoreWriter] = []
+        for kind, target in map(parse_writer, self.specs):
+            if kind == "file":
+                writers.append(FileWriter(auth={}, path={"uri": str(Path(target) / output_name(path))}))
+            elif kind == "shards":
+                writers.append(sharded_writer(target, self.shard_compression))
+            elif kind == "mongo":
+                writers.append(mongo_writer(target))
+            else:
+                writers.append(sqlite_writer(target))
+        return writers
+
+
+def _supported(path: Path) -> bool:
+    try:
+        return path.is_file() and sniff(path) is not None
+    except OSError:
+        return False
+
+
+def discover(inputs: Iterable[str], recursive: bool = False) -> list[Path]:
+    """
+    The files to process for inputs, each a file, a directory or a glob pattern, in order and without repeats.
+    """
+    found: dict[Path, None] = {}
+    for item in inputs:
+        path = Path(item)
+        if path.is_file():
+            found.setdefault(path)
+        elif path.is_dir():
+            candidates = path.rglob("*") if recursive else path.iterdir()
+            found.update(dict.fromkeys(sorted(candidate for candidate in candidates if _supported(candidate))))
+        else:
+            matches = sorted(Path(match) for match in glob.glob(item, recursive=recursive))
+            if not matches:
+                logger.warning(f"No files match {item}")
+            found.update(dict.fromkeys(match for match in matches if _supported(match)))
+    return list(found)
+
+
+def estimate(path: Path) -> dict[str, Any]:
+    """
+    The size, page count and embedded image count of path, read without decoding any image.
+    Images are counted once per page they appear on; each page of a TIFF is one image.
+    """
+    record: dict[str, Any] = {"path": str(path), "bytes": path.stat().st_size, "pages": 1, "images": 1}
+    file_type = sniff(path)
+    if file_type is PDF:
+        import fitz  # pylint: disable=import-outside-toplevel
+
+        with fitz.open(path) as doc:
+            record["pages"] = len(doc)
+            record["images"] = sum(len(page.get_images()) for page in doc)
+    elif file_type is TIFF:
+        from PIL import Image  # pylint: disable=import-outside-toplevel,import-error
+
+        with Image.open(path) as image:
+            record["pages"] = record["images"] = getattr(image, "n_frames", 1)
+    return record
+
+
+def _dry_run(paths: list[Path], manifest: Manifest | None, journal: Journal | None, retry_failed: bool) -> None:
+    """
+    Print what a run over paths would process.
+    """
+    totals = {"files": 0, "skipped": 0, "failed": 0, "bytes": 0, "pages": 0, "images": 0}
+    for path in paths:
+        entry = journal.entry(path) if journal is not None else None
+        if entry is not None and journal.finished(path, retry_failed=retry_failed):
+            totals["skipped"] += 1
+            click.echo(f"{entry.state}\t{path}")
+            continue
+        if manifest is not None and not manifest.changed(path):
+            totals["skipped"] += 1
+            click.echo(f"unchanged\t{path}")
+            continue
+        try:
+            record = estimate(path)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            totals["failed"] += 1
+            click.echo(f"unreadable\t{path}\t{type(e).__name__}: {e}")
+            continue
+        totals["files"] += 1
+        for counter in ("bytes", "pages", "images"):
+            totals[counter] += record[counter]
+        click.echo(f"process\t{path}\t{record['pages']} pages\t{record['images']} images")
+    click.echo(
+        f"{totals['files']} files to process ({totals['pages']} pages, {totals['images']} images, "
+        f"{totals['bytes'] / 1e6:.1f} MB), {totals['skipped']} unchanged or finished, {totals['failed']} unreadable"
+    )
+
+
+def _check_writers(ctx: click.Context, param: click.Parameter, value: tuple[str, ...]) -> tuple[str, ...]:
+    try:
+        for spec in value:
+            parse_writer(spec)
+    except ValueError as e:
+        raise click.BadParameter(str(e), ctx=ctx, param=param) from e
+    return value
+
+
+@click.command()
+@click.argument("inputs", nargs=-1, required=True)
+@click.option("--recursive", "-r", is_flag=True, help="Search directories and ** globs recursively.")
+@click.option(
+    "--writer", "writers", multiple=True, default=DEFAULT_WRITERS, show_default=True, envvar="PLAT_WRITERS",
+    callback=_check_writers, help="Where results go, KIND:TARGET with KIND file, shards, mongo or sqlite. Repeatable.",
+)
+@click.option("--shard-compression", type=click.Choice(["gzip", "zstd", "none"]), default="gzip", show_default=True,
+              help="Compression of the shards written by shards writers.")
+@click.option("--workers", default=os.cpu_count() or 1, show_default=True, envvar="PLAT_WORKERS",
+              help="Worker processes. 1 processes files in this process.")
+@click.option("--page-workers", default=0, show_default=True,
+              help="Processes sharing the pages of each large PDF, on top of --workers. 0 is off.")
+@click.option("--page-parallel-min-pages", default=50, show_default=True,
+              help="Smallest PDF, in pages, split between page workers.")
+@click.option("--max-in-flight", default=0, help="Files queued to the workers at once. 0 is twice the workers.")
+@click.option("--ocr-backend", type=click.Choice(["pytesseract", "tesserocr", "null"]), default="pytesseract",
+              show_default=True, help="OCR engine, null skips OCR.")
+@click.option("--ocr-lang", default="eng", show_default=True, help="tesseract language model.")
+@click.option("--ocr-threads", default=1, show_default=True, help="OCR engine handles per worker, for tesserocr.")
+@click.option("--page-raster", type=click.Choice(["images", "render"]), default="images", show_default=True,
+              help="OCR a page's embedded images, or render the whole page.")
+@click.option("--dpi", default=300, show_default=True, help="Resolution pages are rendered at.")
+@click.option("--render-colorspace", type=click.Choice(["gray", "rgb"]), default="gray", show_default=True,
+              help="Colorspace pages are rendered in.")
+@click.option("--preprocess", multiple=True,
+              type=click.Choice(["strip_color", "grayscale", "downscale", "denoise", "threshold", "deskew"]),
+              help="Step run over each image before OCR. Repeatable, off by default.")
+@click.option("--preprocess-target-dpi", default=300, show_default=True,
+              help="Resolution the downscale step shrinks images to.")
+@click.option("--preprocess-color", "preprocess_colors", multiple=True, type=click.Choice(["blue", "red", "green"]),
+              default=("blue", "red"), show_default=True, help="Ink colour the strip_color step removes. Repeatable.")
+@click.option("--tile-mode", type=click.Choice(["regions", "grid", "none"]), default="none", show_default=True,
+              help="OCR very large images piece by piece, by text region or on a grid.")
+@click.option("--tile-min-pixels", default=40_000_000, show_default=True,
+              help="Smallest image, in pixels, OCR'd piece by piece.")
+@click.option("--tile-size", default=2048, show_default=True, help="Largest piece, in pixels a side.")
+@click.option("--tile-overlap", default=64, show_default=True, help="Pixels each grid tile overlaps the next by.")
+@click.option("--tile-workers", default=0, show_default=True,
+              help="Threads OCR'ing the pieces of an image. 0 is one per CPU.")
+@click.option("--cache", "cache_path", type=click.Path(dir_okay=False), default=None,
+              help="SQLite file caching OCR results by image content.")
+@click.option("--cache-max-bytes", default=1 << 30, show_default=True, help="Size the OCR cache is trimmed to.")
+@click.option("--manifest", "manifest_path", type=click.Path(dir_okay=False), default=MANIFEST_PATH,
+              show_default=True, help="Record of processed files, unchanged files are skipped.")
+@click.option("--no-manifest", is_flag=True, help="Process every file and record nothing.")
+@click.option("--stream-pages", is_flag=True, help="Hand PDF pages to the writers one at a time.")
+@click.option("--metrics", "metrics_path", type=click.Path(dir_okay=False), default=None,
+              help="Export per stage timings and counters here.")
+@click.option("--journal", "journal_path", type=click.Path(dir_okay=False), default=JOURNAL_PATH, show_default=True,
+              help="Per file record of the run, written as it goes.")
+@click.option("--resume", is_flag=True, help="Continue the run recorded in the journal, skipping finished files.")
+@click.option("--retry-failed", is_flag=True, help="With --resume, process the files that failed again.")
+@click.option("--timeout", type=float, default=None, help="Seconds a file may take before it fails.")
+@click.option("--dry-run", is_flag=True, help="List the files and their page and image counts, process nothing.")
+@click.option("--log-file", default="plat_text_extract.log", show_default=True, help="Log file.")
+def main(  # pylint: disable=too-many-arguments,too-many-locals
+    inputs: tuple[str, ...],
+    recursive: bool,
+    writers: tuple[str, ...],
+    shard_compression: str,
+    workers: int,
+    page_workers: int,
+    page_parallel_min_pages: int,
+    max_in_flight: int,
+    ocr_backend: str,
+    ocr_lang: str,
+    ocr_threads: int,
+    page_raster: str,
+    dpi: int,
+    render_colorspace: str,
+    preprocess: tuple[str, ...],
+    preprocess_target_dpi: int,
+    preprocess_colors: tuple[str, ...],
+    tile_mode: str,
+    tile_min_pixels: int,
+    tile_size: int,
+    tile_overlap: int,
+    tile_workers: int,
+    cache_path: str | None,
+    cache_max_bytes: int,
+    manifest_path: str,
+    no_manifest: bool,
+    stream_pages: bool,
+    metrics_path: str | None,
+    journal_path: str,
+    resume: bool,
+    retry_failed: bool,
+    timeout: float | None,
+    dry_run: bool,
+    log_file: str,
+) -> None:
+    """
+    Extract the text of INPUTS, files, directories or glob patterns, and store it with the writers.
+    """
+    logging.basicConfig(
+        filename=log_file, encoding="utf-8", level=logging.INFO, format=LOG_FORMAT, datefmt="%Y-%m-%d %H:%M:%S"
+    )
+    config = replace(
+        ProcessingConfig(),
+        ocr_backend=ocr_backend,
+        ocr_lang=ocr_lang,
+        ocr_threads=ocr_threads,
+        page_raster=page_raster,
+        render_dpi=dpi,
+        render_colorspace=render_colorspace,
+        preprocess=preprocess,
+        preprocess_target_dpi=preprocess_target_dpi,
+        preprocess_colors=preprocess_colors,
+        tile_mode="" if tile_mode == "none" else tile_mode,
+        tile_min_pixels=tile_min_pixels,
+        tile_size=tile_size,
+        tile_overlap=tile_overlap,
+        tile_workers=tile_workers,
+        ocr_cache_path=cache_path,
+        ocr_cache_max_bytes=cache_max_bytes,
+        stream_pages=stream_pages,
+        metrics_path=metrics_path,
+        page_workers=page_workers,
+        page_parallel_min_pages=page_parallel_min_pages,
+        writers=tuple(sorted(set(writers))),
+    )
+    manifest = None if no_manifest else Manifest(manifest_path, version=config.fingerprint())
+    try:
+        journal = Journal(journal_path, version=config.fingerprint(), resume=resume)
+    except ValueError as e:
+        raise click.ClickException(str(e)) from e
+    paths = discover(inputs, recursive=recursive)
+    if dry_run:
+        # A new journal only replaces the old one once something is recorded in it, which a dry run never does.
+        _dry_run(paths, manifest, journal if resume else None, retry_failed)
+        return
+
+    ingestor = BatchIngestor(
+        writers_for=Writers(writers, "" if shard_compression == "none" else shard_compression),
+        logger=logger,
+        workers=workers,
+        max_in_flight=max_in_flight,
+        config=config,
+        manifest=manifest,
+        journal=journal,
+        retry_failed=retry_failed,
+        timeout=timeout,
+    )
+    results = ingestor.run(paths)
+    ok = sum(1 for result in results if result.ok)
+    skipped = sum(1 for result in results if result.status == SKIPPED)
+    click.echo(f"{ok} of {len(results)} files ok, {skipped} unchanged")
+    if ok < len(results):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()  # pylint: disable=no-value-for-parameter
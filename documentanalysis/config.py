@@ -0,0 +1,98 @@
+"""
+config.py
+---------
+
+This module defines the `ProcessingConfig` dataclass, the options for a processing run.
+
+A single `ProcessingConfig` is created per run and handed to `Document`, the processors and the ingestion engine. It is
+frozen and made only of plain values so it can be pickled into worker processes.
+
+Classes:
+    ProcessingConfig: Options for a processing run.
+"""
+
+import hashlib
+import json
+from dataclasses import dataclass, field, fields
+
+# Bump when a change to the processors alters the output they produce for the same input and options.
+PROCESSOR_VERSION: str = "1"
+
+
+@dataclass(frozen=True)
+class ProcessingConfig:
+    """
+    Options for a processing run.
+
+    Attributes:
+    fast_path (bool): Classify each PDF page and skip OCR on pages whose text layer is good enough.
+    text_min_density (float): Characters per square inch a text layer needs to be trusted.
+    text_max_image_coverage (float): Fraction of the page images may cover before a trusted page is also OCR'd.
+    ocr_cache_path (str | None): SQLite file caching OCR results by image content. None disables the cache.
+    ocr_cache_max_bytes (int): Size the OCR cache is trimmed back to, least recently used first.
+    stream_pages (bool): Hand PDF pages to the writers one at a time instead of collecting the whole document.
+    ocr_backend (str): OCR engine, "pytesseract", "tesserocr" or "null". See documentanalysis.backends.
+    ocr_lang (str): tesseract language model.
+    ocr_threads (int): Number of OCR engine handles kept open per process by backends that pool them.
+    metrics_path (str | None): Record per stage timings and counters and export them here. None disables metrics.
+    page_raster (str): How PDF pages that need OCR are rasterised. "images" OCRs each embedded image decoded by pypdf,
+        "render" renders the whole page once with PyMuPDF. Either falls back to the other for a page it fails on.
+    render_dpi (int): Resolution pages are rendered at.
+    render_colorspace (str): Colorspace pages are rendered in, "gray" or "rgb".
+    preprocess (tuple[str, ...]): Steps run over each image before OCR, any of "strip_color", "grayscale",
+        "downscale", "denoise", "threshold" and "deskew". See documentanalysis.preprocess. Empty disables it.
+    preprocess_target_dpi (int): Resolution the downscale step shrinks images to.
+    preprocess_colors (tuple[str, ...]): Ink colours the strip_color step removes, any of "blue", "red" and "green".
+    tile_mode (str): How images of at least tile_min_pixels are cut up for OCR, "regions" or "grid".
+        See documentanalysis.tiling. Empty OCRs every image whole.
+    tile_min_pixels (int): Smallest image, in pixels, that is OCR'd piece by piece.
+    tile_size (int): Largest piece, in pixels a side.
+    tile_overlap (int): Pixels each grid tile overlaps the next by.
+    tile_workers (int): Threads OCR'ing the pieces of an image. 0 means one per CPU.
+    page_workers (int): Processes sharing the pages of one large PDF. 0 or 1 processes every page in the
+        document's own process.
+    page_parallel_min_pages (int): Smallest PDF, in pages, that is split between page workers.
+    writers (tuple[str, ...]): The KIND:TARGET specs of the writers the results go to, see documentanalysis.cli.
+        Part of the fingerprint, so files already processed are processed again for a writer that was not there.
+
+    Options that only change how fast a run goes, not what it produces, are marked
+    metadata={"fingerprint": False} and left out of `fingerprint`.
+    """
+
+    fast_path: bool = True
+    text_min_density: float = 1.0
+    text_max_image_coverage: float = 0.5
+    ocr_cache_path: str | None = field(default=None, metadata={"fingerprint": False})
+    ocr_cache_max_bytes: int = field(default=1 << 30, metadata={"fingerprint": False})
+    stream_pages: bool = False
+    ocr_backend: str = "pytesseract"
+    ocr_lang: str = "eng"
+    ocr_threads: int = field(default=1, metadata={"fingerprint": False})
+    metrics_path: str | None = field(default=None, metadata={"fingerprint": False})
+    page_raster: str = "images"
+    render_dpi: int = 300
+    render_colorspace: str = "gray"
+    preprocess: tuple[str, ...] = ()
+    preprocess_target_dpi: int = 300
+    preprocess_colors: tuple[str, ...] = ("blue", "red")
+    tile_mode: str = ""
+    tile_min_pixels: int = 40_000_000
+    tile_size: int = 2048
+    tile_overlap: int = 64
+    tile_workers: int = field(default=0, metadata={"fingerprint": False})
+    page_workers: int = field(default=0, metadata={"fingerprint": False})
+    page_parallel_min_pages: int = field(default=50, metadata={"fingerprint": False})
+    writers: tuple[str, ...] = ()
+
+    def fingerprint(self) -> str:
+        """
+        Identify the processor version and the options that affect output.
+        Output produced under a different fingerprint is out of date.
+        """
+        options = {
+            option.name: getattr(self, option.name)
+            for option in fields(self)
+            if option.metadata.get("fingerprint", True)
+        }
+        digest = hashlib.sha256(json.dumps(options, sort_keys=True).encode("utf-8")).hexdigest()
+        return f"{PROCESSOR_VERSION}:{digest[:16]}"
@@ -14,6 +14,15 @@ It includes the following exception classes:
 - PlatFileTypeError: Raised when there's an error related to the file type of a plat.
     It includes the file path in the error message.
 
+- DocumentTimeoutError: Raised when processing a file takes longer than the batch allows.
+    It includes the file path in the error message.
+
+- WorkerCrashError: Raised when the worker process handling a file dies, for instance when it runs out of memory.
+    It includes the file path in the error message.
+
+- StoreWriteError: Raised when the results of a file could not be written to one of its writers.
+    It includes the file path in the error message.
+
 Each exception class inherits from the built-in Exception class and adds additional context
 to the error message, such as the file path or image data type.
 """
@@ -59,3 +68,36 @@ class FileTypeError(Exception):
     def __init__(self, message, file_path):
         self.file_path = file_path
         super().__init__(f"{message}. File path: {file_path}")
+
+
+class DocumentTimeoutError(Exception):
+    """
+    Exception in case processing a file takes longer than allowed
+    raise with raise DocumentTimeoutError("Some error message", self.file_path)
+    """
+
+    def __init__(self, message, file_path):
+        self.file_path = file_path
+        super().__init__(f"{message}. File path: {file_path}")
+
+
+class WorkerCrashError(Exception):
+    """
+    Exception in case the worker process processing a file dies
+    raise with raise WorkerCrashError("Some error message", self.file_path) from e
+    """
+
+    def __init__(self, message, file_path):
+        self.file_path = file_path
+        super().__init__(f"{message}. File path: {file_path}")
+
+
+class StoreWriteError(Exception):
+    """
+    Exception in case the results of a file could not be written to storage
+    raise with raise StoreWriteError("Some error message", self.file_path)
+    """
+
+    def __init__(self, message, file_path):
+        self.file_path = file_path
+        super().__init__(f"{message}. File path: {file_path}")
@@ -0,0 +1,30 @@
+"""
+hashing.py
+----------
+
+Content hashes used to recognise documents and images that have been seen before.
+
+Functions:
+    bytes_sha256: Hex digest of a bytes-like object.
+    file_sha256: Hex digest of a file's contents, hashed from a memory map of the file.
+"""
+
+import hashlib
+from pathlib import Path
+
+from documentanalysis.mapped import MappedFile
+
+
+def bytes_sha256(data: bytes | bytearray | memoryview) -> str:
+    """
+    Return the sha256 hex digest of data.
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_sha256(path: Path | str) -> str:
+    """
+    Return the sha256 hex digest of the file at path without reading it into memory.
+    """
+    with MappedFile(path) as mapped:
+        return bytes_sha256(mapped.view)
@@ -1,31 +1,47 @@
 import sys
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-import cv2 as cv
-import PIL
-from matplotlib import pyplot as plt
-from numpy import dtype, generic, ndarray
+from documentanalysis.mapped import MappedFile
+
+if TYPE_CHECKING:
+    from numpy import ndarray
 
 IMAGE_DIR: Path = Path("plat/data/image_analysis/")
-IMAGE_FILES: list[Path] = list(IMAGE_DIR.iterdir())
 BLUE: list[int] = [255, 0, 0]
 
+
+def image_files() -> list[Path]:
+    """
+    The images in IMAGE_DIR, listed when asked for rather than on import.
+    """
+    return list(IMAGE_DIR.iterdir())
+
 # def extract_color_from_image(path: Path|str, color: str) -> ndarray:
 #     """
 #     Given the path to an image, extract only the specified color.
 #     """
 
 
-def load_image(path: Path | str) -> ndarray:
+def load_image(path: Path | str) -> "ndarray":
+    import cv2 as cv  # pylint: disable=import-outside-toplevel
+    import numpy as np  # pylint: disable=import-outside-toplevel
+
     if isinstance(path, str):
         path = Path(path)
     if not path.exists():
         raise FileNotFoundError(f"File not found: {path}")
-    return cv.imread(str(path))
+    # Decoded straight from a memory map of the file, which NumPy wraps without copying.
+    with MappedFile(path) as mapped:
+        return cv.imdecode(np.frombuffer(mapped.view, dtype=np.uint8), cv.IMREAD_COLOR)
 
 
 def main() -> int:
-    img1 = load_image(IMAGE_FILES[2])
+    # OpenCV and matplotlib are only needed by the demo, not by modules importing from here.
+    import cv2 as cv  # pylint: disable=import-outside-toplevel
+    from matplotlib import pyplot as plt  # pylint: disable=import-outside-toplevel
+
+    img1 = load_image(image_files()[2])
 
     cv.imshow("img", img1)
     cv.waitKey(15)
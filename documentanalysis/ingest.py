@@ -0,0 +1,659 @@
+"""
+ingest.py
+---------
+
+Batch ingestion engine for running `Document` processing over a corpus of files.
+
+Every file is handed to a worker process so that OCR, which is CPU bound inside tesseract, can use every core on the
+box. The number of files in flight is bounded so a multi-thousand file archive is not queued up front, and every file
+produces an `IngestResult` recording how long it took and, when it failed, the error that stopped it. A failure in one
+file never aborts the rest of the batch.
+
+Given a `Manifest`, files that have not changed since they were last processed with the same processor version and
+options are skipped, and every file processed successfully is recorded for the next run.
+
+Given a `Journal`, the state of every file is appended to it as the run goes, and a journal read back with resume
+makes the run skip the files that already finished (see documentanalysis.journal).
+
+With a timeout, a file that takes longer fails with `DocumentTimeoutError`. The worker interrupts its own file when
+the time is up; a worker stuck in native code past twice the timeout plus timeout_grace is killed by the parent. When
+a worker dies, whether killed or out of memory, the pool goes down with it. It is replaced, and the files that were in
+flight are run again one at a time in a process of their own: the file that kills that process fails with
+`WorkerCrashError` and the rest are processed as usual.
+
+A file is only DONE once its results are in storage. Each worker confirms the writes of the files it has processed
+together, every confirm_every files or confirm_interval seconds and when it exits, with one `StoreWriter.confirm` per
+writer. A QueuedWriter confirms from its own thread, so workers never wait on storage, and writers that batch still
+batch across files. Confirmed files come back to the parent on a queue and only then are recorded DONE; until then
+they stay PENDING in the journal, so a run that dies first processes them again on resume. Files whose worker is
+killed before confirming them are processed again. A file whose writes failed fails with `StoreWriteError`, and when
+a confirmation fails every file confirmed with it fails.
+
+With `ProcessingConfig.metrics_path` set, every worker records per stage timings and counters for the files it
+processes (see documentanalysis.metrics). The records travel back with each `IngestResult` and the run summary is
+exported to metrics_path when the batch finishes.
+
+Classes:
+    IngestResult: The outcome of processing a single file.
+    BatchIngestor: Runs `process_path` over a list of files with a process pool.
+
+Functions:
+    process_path: Process a single file into its writers. Runs inside the worker process.
+"""
+
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures import wait
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from dataclasses import dataclass, field, replace
+from multiprocessing.util import Finalize
+from pathlib import Path
+from typing import Any, Callable, Generator, Iterable, Iterator
+
+from documentanalysis.config import ProcessingConfig
+from documentanalysis.errors import DocumentTimeoutError, StoreWriteError, WorkerCrashError
+from documentanalysis.journal import DONE, FAILED, PENDING, SKIPPED, Journal
+from documentanalysis.manifest import Manifest
+from documentanalysis.metrics import METRICS, Metrics
+from documentanalysis.ocr import Document
+from documentanalysis.store import StoreWriter, close_all_writers
+
+# Given the path of a document, return the writers its results should go to.
+# Must be a module level callable so it can be pickled into the worker processes.
+# Writers that pool connections or buffer writes should be built once per process and reused.
+WriterFactory = Callable[[Path], list[StoreWriter]]
+
+
+@dataclass
+class IngestResult:
+    """
+    The outcome of processing a single file.
+
+    Attributes:
+    path (str): The file that was processed.
+    status (str): DONE, FAILED or SKIPPED. Inside the engine, PENDING for a file processed by a worker whose writes
+        are not yet confirmed.
+    seconds (float): Wall time spent on the file inside the worker.
+    error_type (str | None): Class name of the exception that stopped the file, if any.
+    error (str | None): The exception message, if any.
+    metrics (list[dict[str, Any]]): Stage records for the file, when metrics are enabled.
+    """
+
+    path: str
+    status: str
+    seconds: float = 0.0
+    error_type: str | None = None
+    error: str | None = None
+    metrics: list[dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        """
+        True when the file was processed without error, or did not need processing.
+        """
+        return self.status != FAILED
+
+
+@contextmanager
+def _time_limit(path: Path, seconds: float | None) -> Iterator[None]:
+    """
+    Raise DocumentTimeoutError in the block once it has run for seconds.
+    The error is raised again every second after that, in case the code that was running when it first fired caught
+    it. Only the main thread can receive signals, elsewhere the block runs without a limit.
+    """
+    if not seconds or not hasattr(signal, "SIGALRM") or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    def expire(signum: int, frame: Any) -> None:
+        raise DocumentTimeoutError(f"Processing took longer than {seconds}s", path)
+
+    previous = signal.signal(signal.SIGALRM, expire)
+    signal.setitimer(signal.ITIMER_REAL, seconds, 1.0)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def _confirm_writes(path: Path, writers: list[StoreWriter], logger: logging.Logger) -> None:
+    """
+    Flush the writers so the file's results are in storage before it is reported DONE.
+    Raises StoreWriteError when a writer failed to flush them.
+    """
+    failures = 0
+    for writer in writers:
+        if not writer.flush(logger=logger):
+            failures += 1
+            # What the writer could not write belongs to this file, which fails, rather than to the next one.
+            writer.discard(logger=logger)
+    if failures:
+        raise StoreWriteError(f"{failures} writes to storage failed", path)
+
+
+class _Settlement:
+    """
+    One confirmation of a group of files. Each writer reports its outcome, possibly from a thread of its own, and
+    once every writer has reported the files are put on settled, DONE or, when any writer failed, FAILED.
+    """
+
+    def __init__(self, files: list[IngestResult], writers: int, settled: Any) -> None:
+        self.files = files
+        self.remaining = writers
+        self.failed = 0
+        self.settled = settled
+        self._lock = threading.Lock()
+
+    def report(self, written: bool) -> None:
+        """
+        Record the outcome of one writer.
+        """
+        with self._lock:
+            self.failed += not written
+            self.remaining -= 1
+            if self.remaining > 0:
+                return
+        for result in self.files:
+            if self.failed:
+                error = StoreWriteError(f"{self.failed} writers failed to confirm the writes of a group of files",
+                                        result.path)
+                result = replace(result, status=FAILED, error_type=type(error).__name__, error=str(error))
+            self.settled.put(result)
+
+
+@dataclass
+class _Confirmer:
+    """
+    The files processed in this process whose writes are not yet confirmed, and the writers holding them.
+
+    Attributes:
+    settled (Any): Queue the settled results are put on.
+    every (int): Number of files confirmed together.
+    interval (float): Seconds after which the files waiting are confirmed, however few.
+    """
+
+    settled: Any
+    every: int
+    interval: float
+    files: list[IngestResult] = field(default_factory=list)
+    writers: dict[int, StoreWriter] = field(default_factory=dict)
+    last: float = field(default_factory=time.monotonic)
+
+    def add(self, result: IngestResult, writers: list[StoreWriter], logger: logging.Logger) -> None:
+        """
+        Hold a processed file until its writes are confirmed, confirming the group once it is big or old enough.
+        """
+        self.files.append(result)
+        for writer in writers:
+            self.writers[id(writer)] = writer
+        if len(self.files) >= self.every or time.monotonic() - self.last >= self.interval:
+            self.confirm(logger)
+
+    def confirm(self, logger: logging.Logger) -> None:
+        """
+        Confirm the writes of every file held. Writers that write in the background settle the files later.
+        """
+        files, writers = self.files, list(self.writers.values())
+        self.files, self.writers, self.last = [], {}, time.monotonic()
+        if not files:
+            return
+        settlement = _Settlement(files, max(len(writers), 1), self.settled)
+        if not writers:
+            settlement.report(True)
+        for writer in writers:
+            try:
+                writer.confirm(settlement.report, logger=logger)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                logger.error(f"Failed to confirm the writes to {writer.path}: {type(e).__name__}: {e}")
+                settlement.report(False)
+
+
+# Confirms the writes of the files processed in this process. Set in each worker process by _init_worker, and in the
+# parent while a BatchIngestor processes files inline. Without one, process_path confirms every file on its own.
+_CONFIRMER: _Confirmer | None = None
+
+
+def _use_confirmer(confirmer: _Confirmer | None) -> _Confirmer | None:
+    """
+    Make confirmer the one process_path hands its files to, returning the one it replaces.
+    """
+    global _CONFIRMER  # pylint: disable=global-statement
+    previous, _CONFIRMER = _CONFIRMER, confirmer
+    return previous
+
+
+def process_path(
+    path: Path, writers_for: WriterFactory, config: ProcessingConfig | None = None, timeout: float | None = None
+) -> IngestResult:
+    """
+    Process a single file and send its results to the writers built by writers_for.
+    Any exception is caught and recorded so one bad file cannot take down a worker.
+    Inside a BatchIngestor the file is handed to the process's confirmer and comes back PENDING, to be settled once
+    its writes are confirmed. Called on its own, the writers are flushed before it returns. A file whose results could
+    not be written fails with StoreWriteError.
+    With a timeout, processing that runs longer is stopped and recorded as a DocumentTimeoutError.
+    """
+    logger = logging.getLogger(__name__)
+    config = config or ProcessingConfig()
+    METRICS.enabled = bool(config.metrics_path)
+    start = time.perf_counter()
+    try:
+        with _time_limit(path, timeout):
+            writers = writers_for(path)
+            document = Document(location=path, logger=logger, writers=writers, config=config)
+            if document.write_failures:
+                raise StoreWriteError(f"{document.write_failures} writes to storage failed", path)
+        if _CONFIRMER is None:
+            _confirm_writes(path, writers, logger)
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        logger.error(f"Failed to process {path}: {type(e).__name__}: {e}")
+        return IngestResult(
+            path=str(path),
+            status=FAILED,
+            seconds=time.perf_counter() - start,
+            error_type=type(e).__name__,
+            error=str(e),
+            metrics=METRICS.pop_documents(),
+        )
+    result = IngestResult(
+        path=str(path), status=DONE, seconds=time.perf_counter() - start, metrics=METRICS.pop_documents()
+    )
+    if _CONFIRMER is None:
+        return result
+    _CONFIRMER.add(result, writers, logger)
+    # The metrics travel with the settled result.
+    return replace(result, status=PENDING, metrics=[])
+
+
+def _failure(path: Path, error: Exception, seconds: float = 0.0) -> IngestResult:
+    """
+    A FAILED result for an error raised outside the worker's own handling of the file.
+    """
+    return IngestResult(
+        path=str(path), status=FAILED, seconds=seconds, error_type=type(error).__name__, error=str(error)
+    )
+
+
+def _kill_workers(pool: ProcessPoolExecutor) -> None:
+    """
+    Kill the worker processes of pool, which breaks it.
+    ProcessPoolExecutor has no public way to stop a call that is already running.
+    """
+    for process in list(pool._processes.values()):  # pylint: disable=protected-access
+        process.kill()
+
+
+def _init_worker(settled: Any, confirm_every: int, confirm_interval: float) -> None:
+    """
+    Give the worker a confirmer putting settled results on settled, and confirm its last files and close its shared
+    writers when the worker process exits.
+    multiprocessing runs its finalizers on exit, atexit handlers are skipped.
+    """
+    _use_confirmer(_Confirmer(settled, confirm_every, confirm_interval))
+    Finalize(None, _finish_worker, args=(logging.getLogger(__name__),), exitpriority=10)
+
+
+def _finish_worker(logger: logging.Logger) -> None:
+    """
+    Confirm the writes of the files not confirmed yet, then flush and close every writer. Closing a QueuedWriter
+    waits for its thread, so its confirmation is settled before the process exits.
+    """
+    if _CONFIRMER is not None:
+        _CONFIRMER.confirm(logger)
+    close_all_writers(logger)
+
+
+@dataclass
+class _Outstanding:
+    """
+    Files the workers processed whose writes are not confirmed yet, matched up with their settled results.
+    A file can be settled before the PENDING result its worker returned for it arrives.
+
+    Attributes:
+    waiting (dict[str, list[IngestResult]]): PENDING results by path.
+    early (dict[str, list[IngestResult]]): Settled results by path, whose PENDING result has not arrived.
+    retry (list[Path]): Files to process again, their worker died before confirming them.
+    """
+
+    waiting: dict[str, list[IngestResult]] = field(default_factory=dict)
+    early: dict[str, list[IngestResult]] = field(default_factory=dict)
+    retry: list[Path] = field(default_factory=list)
+
+    def processed(self, result: IngestResult) -> Iterator[IngestResult]:
+        """
+        Yield result when it is final, or the settled result of its file when that is already in.
+        """
+        if result.status != PENDING:
+            yield result
+        elif self.early.get(result.path):
+            yield self.early[result.path].pop()
+        else:
+            self.waiting.setdefault(result.path, []).append(result)
+
+    def settled(self, results: Any, timeout: float = 0.0) -> Iterator[IngestResult]:
+        """
+        Yield the results settled on the results queue, waiting up to timeout for the first.
+        """
+        while True:
+            try:
+                result = results.get(timeout=timeout) if timeout else results.get_nowait()
+            except queue.Empty:
+                return
+            timeout = 0.0
+            if self.waiting.get(result.path):
+                self.waiting[result.path].pop()
+                yield result
+            else:
+                self.early.setdefault(result.path, []).append(result)
+
+    def lose(self) -> list[Path]:
+        """
+        Give up on the files still waiting, whose worker died, and return them.
+        """
+        paths = [Path(path) for path, results in self.waiting.items() for _ in results]
+        self.waiting.clear()
+        self.early.clear()
+        return paths
+
+
+@dataclass
+class BatchIngestor:
+    """
+    Process a corpus of files with a pool of worker processes.
+
+    Attributes:
+    writers_for (WriterFactory): Builds the writers for each file.
+    logger (logging.Logger): Logger for batch level progress.
+    workers (int): Number of worker processes. 1 processes the files inline in this process.
+    max_in_flight (int): Maximum number of files submitted to the pool at once. 0 means twice the worker count.
+    config (ProcessingConfig): Options for processing each file.
+    manifest (Manifest | None): When given, unchanged files are skipped and processed files recorded.
+    journal (Journal | None): When given, the state of every file is recorded in it as the run goes, and files it
+        records as finished are not processed again.
+    retry_failed (bool): Process files the journal records as FAILED again.
+    timeout (float | None): Seconds a file may take before it fails with DocumentTimeoutError. None is no limit.
+    timeout_grace (float): Seconds past twice the timeout after which a worker that has not stopped is killed.
+    confirm_every (int): Number of files whose writes each worker confirms together.
+    confirm_interval (float): Seconds after which a worker confirms the files it holds, however few.
+    metrics (Metrics): The stage records of the last run, gathered from every worker.
+    """
+
+    writers_for: WriterFactory
+    logger: logging.Logger
+    workers: int = field(default_factory=lambda: os.cpu_count() or 1)
+    max_in_flight: int = 0
+    config: ProcessingConfig = field(default_factory=ProcessingConfig)
+    manifest: Manifest | None = None
+    journal: Journal | None = None
+    retry_failed: bool = False
+    timeout: float | None = None
+    timeout_grace: float = 30.0
+    confirm_every: int = 100
+    confirm_interval: float = 30.0
+    metrics: Metrics = field(default_factory=Metrics, init=False, repr=False)
+    # The queue the workers of the current pool put their settled results on.
+    _settled: Any = field(default=None, init=False, repr=False)
+
+    def run(self, paths: Iterable[Path]) -> list[IngestResult]:
+        """
+        Process every path and return the results in completion order.
+        """
+        start = time.perf_counter()
+        results = list(self.iter_results(paths))
+        failed = sum(1 for result in results if not result.ok)
+        skipped = sum(1 for result in results if result.status == SKIPPED)
+        self.logger.info(
+            f"Ingested {len(results)} files ({failed} failed, {skipped} unchanged and skipped) "
+            f"with {self.workers} workers in {time.perf_counter() - start:.2f}s"
+        )
+        if self.config.metrics_path:
+            self.logger.info(f"Stage metrics written to {self.config.metrics_path}: {self.metrics.summary()['stages']}")
+        return results
+
+    def iter_results(self, paths: Iterable[Path]) -> Iterator[IngestResult]:
+        """
+        Process every path, yielding each result as soon as its file completes and its writes are confirmed.
+        paths is consumed lazily so no more than max_in_flight files are ever queued.
+        """
+        self.metrics.reset()
+        try:
+            for result in self._process(self._select(paths)):
+                if self.manifest is not None and result.status == DONE:
+                    self.manifest.record(Path(result.path))
+                if self.journal is not None:
+                    self.journal.record(result.path, result.status, result.error_type, result.error)
+                self.metrics.add_documents(result.metrics)
+                yield result
+        finally:
+            if self.manifest is not None:
+                self.manifest.save()
+            if self.journal is not None:
+                self.journal.close()
+            if self.config.metrics_path:
+                self.metrics.export(self.config.metrics_path)
+
+    def _select(self, paths: Iterable[Path]) -> Iterator[Path | IngestResult]:
+        """
+        Pass on the paths that need processing, replacing unchanged ones with a SKIPPED result and ones the journal
+        records as finished with their recorded result.
+        """
+        for path in paths:
+            entry = self.journal.entry(path) if self.journal is not None else None
+            if entry is not None and self.journal.finished(path, retry_failed=self.retry_failed):
+                self.logger.info(f"Skipping {path}, already {entry.state} in the journal")
+                yield IngestResult(path=str(path), status=entry.state, error_type=entry.error_type, error=entry.error)
+            elif self.manifest is not None and not self.manifest.changed(path):
+                self.logger.info(f"Skipping unchanged file {path}")
+                yield IngestResult(path=str(path), status=SKIPPED)
+            else:
+                if self.journal is not None:
+                    self.journal.record(path, PENDING)
+                yield path
+
+    def _process(self, items: Iterable[Path | IngestResult]) -> Iterator[IngestResult]:
+        """
+        Process each path, passing results that are already known straight through.
+        """
+        if self.workers <= 1:
+            settled: queue.Queue = queue.Queue()
+            outstanding = _Outstanding()
+            confirmer = _Confirmer(settled, self.confirm_every, self.confirm_interval)
+            previous = _use_confirmer(confirmer)
+            try:
+                for item in items:
+                    if isinstance(item, IngestResult):
+                        yield item
+                    else:
+                        yield from outstanding.processed(
+                            process_path(item, self.writers_for, self.config, self.timeout)
+                        )
+                        yield from outstanding.settled(settled)
+                confirmer.confirm(self.logger)
+            finally:
+                _use_confirmer(previous)
+                close_all_writers(self.logger)
+            yield from outstanding.settled(settled)
+        else:
+            yield from self._process_pool(items)
+
+    def _process_pool(self, items: Iterable[Path | IngestResult]) -> Iterator[IngestResult]:
+        """
+        Process each path on the worker pool, at most max_in_flight at a time.
+        Files that were in flight when a worker died are run again one at a time once the rest are done.
+        """
+        limit = self.max_in_flight or 2 * self.workers
+        pending: dict[Future, Path] = {}
+        started: dict[Future, float] = {}
+        suspects: list[Path] = []
+        outstanding = _Outstanding()
+        pool = self._pool()
+        try:
+            for path in items:
+                if isinstance(path, IngestResult):
+                    yield path
+                    continue
+                while len(pending) >= limit:
+                    pool = yield from self._wait(pool, pending, started, suspects, outstanding)
+                pending[pool.submit(process_path, path, self.writers_for, self.config, self.timeout)] = path
+            while pending or outstanding.retry:
+                while outstanding.retry and len(pending) < limit:
+                    path = outstanding.retry.pop(0)
+                    pending[pool.submit(process_path, path, self.writers_for, self.config, self.timeout)] = path
+                pool = yield from self._wait(pool, pending, started, suspects, outstanding)
+            yield from self._drain(pool, outstanding)
+        finally:
+            pool.shutdown(cancel_futures=True)
+        for path in suspects + outstanding.lose():
+            yield self._isolated(path)
+
+    def _pool(self, workers: int = 0) -> ProcessPoolExecutor:
+        """
+        A new worker pool, with a new queue in _settled for its workers' settled results.
+        A killed worker can leave a result half written on its queue, so the queue of a replaced pool is not read again.
+        """
+        self._settled = multiprocessing.Queue()
+        return ProcessPoolExecutor(
+            max_workers=workers or self.workers,
+            initializer=_init_worker,
+            initargs=(self._settled, self.confirm_every, self.confirm_interval),
+        )
+
+    def _drain(self, pool: ProcessPoolExecutor, outstanding: _Outstanding) -> Iterator[IngestResult]:
+        """
+        Shut the pool down, yielding the results its workers settle as they exit.
+        Workers confirm their last files on exit, and cannot exit until what they put on the queue has been read.
+        """
+        processes = list(pool._processes.values())  # pylint: disable=protected-access
+        pool.shutdown(wait=False)
+        while any(process.is_alive() for process in processes):
+            yield from outstanding.settled(self._settled, timeout=0.1)
+        yield from outstanding.settled(self._settled)
+
+    def _hard_timeout(self) -> float | None:
+        """
+        Seconds after which a worker still busy with a file is killed.
+        The pool hands a file to a worker queue up to one file before the worker starts it, so the parent allows
+        twice the timeout the worker enforces itself.
+        """
+        return None if self.timeout is None else 2 * self.timeout + self.timeout_grace
+
+    def _wait(
+        self,
+        pool: ProcessPoolExecutor,
+        pending: dict[Future, Path],
+        started: dict[Future, float],
+        suspects: list[Path],
+        outstanding: _Outstanding,
+    ) -> Generator[IngestResult, None, ProcessPoolExecutor]:
+        """
+        Wait for files in flight to finish and yield their results, and those of files whose writes were confirmed,
+        returning the pool to submit to next.
+        Files lost when a worker dies are added to suspects. When a worker has to be killed, or has died, the pool is
+        replaced, and the files its workers had not confirmed are processed again.
+        """
+        hard_timeout = self._hard_timeout()
+        done, _ = wait(pending, timeout=None if hard_timeout is None else 1.0, return_when=FIRST_COMPLETED)
+        broken = False
+        for future in done:
+            path = pending.pop(future)
+            started.pop(future, None)
+            if isinstance(future.exception(), BrokenProcessPool):
+                broken = True
+                suspects.append(path)
+            else:
+                yield from outstanding.processed(self._collect(future, path))
+        yield from outstanding.settled(self._settled)
+
+        now = time.monotonic()
+        overdue = self._overdue(pending, started, now)
+        if overdue:
+            _kill_workers(pool)
+            for future in overdue:
+                path = pending.pop(future)
+                self.logger.error(f"Killed the worker processing {path} after {hard_timeout}s")
+                yield _failure(path, DocumentTimeoutError(f"Processing took longer than {hard_timeout}s", path),
+                               seconds=now - started.pop(future))
+        if not broken and not overdue:
+            return pool
+
+        # Every other file in flight fails with the pool.
+        wait(pending)
+        for future, path in pending.items():
+            if isinstance(future.exception(), BrokenProcessPool):
+                suspects.append(path)
+            else:
+                yield from outstanding.processed(self._collect(future, path))
+        pending.clear()
+        started.clear()
+        self.logger.warning(f"A worker process died, {len(suspects)} files will be run again one at a time")
+        pool.shutdown(wait=False, cancel_futures=True)
+        lost = outstanding.lose()
+        if lost:
+            self.logger.warning(f"{len(lost)} files whose writes were not confirmed will be processed again")
+            outstanding.retry.extend(lost)
+        return self._pool()
+
+    def _overdue(self, pending: dict[Future, Path], started: dict[Future, float], now: float) -> list[Future]:
+        """
+        The running files that have gone past the hard timeout. Notes when each file was first seen running.
+        """
+        hard_timeout = self._hard_timeout()
+        overdue = []
+        for future in pending:
+            if future.running():
+                started.setdefault(future, now)
+                if hard_timeout is not None and now - started[future] > hard_timeout:
+                    overdue.append(future)
+        return overdue
+
+    def _isolated(self, path: Path) -> IngestResult:
+        """
+        Process a file that was in flight when a worker died, in a process of its own.
+        """
+        pool = self._pool(workers=1)
+        start = time.monotonic()
+        future = pool.submit(process_path, path, self.writers_for, self.config, self.timeout)
+        try:
+            error = future.exception(timeout=self._hard_timeout())
+        except FutureTimeoutError:
+            _kill_workers(pool)
+            pool.shutdown()
+            timeout = DocumentTimeoutError(f"Processing took longer than {self._hard_timeout()}s", path)
+            self.logger.error(f"Killed the worker processing {path}: {timeout}")
+            return _failure(path, timeout, seconds=time.monotonic() - start)
+        if isinstance(error, BrokenProcessPool):
+            pool.shutdown()
+            crash = WorkerCrashError(f"The worker process died: {error}", path)
+            self.logger.error(f"{crash}")
+            return _failure(path, crash, seconds=time.monotonic() - start)
+        outstanding = _Outstanding()
+        results = list(outstanding.processed(self._collect(future, path)))
+        results.extend(self._drain(pool, outstanding))
+        if results:
+            return results[0]
+        crash = WorkerCrashError("The worker process died before its writes were confirmed", path)
+        self.logger.error(f"{crash}")
+        return _failure(path, crash, seconds=time.monotonic() - start)
+
+    def _collect(self, future: Future, path: Path) -> IngestResult:
+        """
+        Turn a finished future into a result.
+        Errors raised here come from the pool itself (an unpicklable writer) rather than the file.
+        """
+        try:
+            result: IngestResult = future.result()
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            self.logger.error(f"Worker failed while processing {path}: {type(e).__name__}: {e}")
+            return _failure(path, e)
+        if not result.ok:
+            self.logger.warning(f"{result.path} failed with {result.error_type}: {result.error}")
+        return result
@@ -0,0 +1,154 @@
+"""
+journal.py
+----------
+
+Per file record of a batch run, written as the run goes so a run that dies part way can be resumed.
+
+The manifest (documentanalysis.manifest) is saved when a batch finishes, so a run killed by the OOM killer or a
+crashed parent loses it. The journal is an append-only JSON lines file instead: a header naming the processor
+fingerprint, then one line each time a file changes state. A file is PENDING once it is handed to a worker and DONE,
+FAILED or SKIPPED once its result is back. Failed files carry the class name of the error that stopped them, such as
+`DocumentTimeoutError` or `WorkerCrashError` from documentanalysis.errors.
+
+Lines are flushed as they are written. When a run is resumed the journal is replayed, the last line for each file
+winning, and files that already finished are not processed again. A line torn by the crash is ignored, so the file it
+belonged to counts as unfinished.
+
+    journal = Journal("journal.jsonl", version=config.fingerprint(), resume=True)
+    if not journal.finished(path):
+        journal.record(path, PENDING)
+        ...
+        journal.record(path, DONE)
+    journal.close()
+
+Classes:
+    JournalEntry: The last known state of one file.
+    Journal: The states of the files of a batch run, stored as a JSON lines file.
+"""
+
+import json
+from collections import Counter
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import IO
+
+JOURNAL_FORMAT: int = 1
+
+PENDING: str = "pending"
+DONE: str = "done"
+FAILED: str = "failed"
+SKIPPED: str = "skipped"
+
+
+@dataclass
+class JournalEntry:
+    """
+    The last known state of one file.
+
+    Attributes:
+    state (str): PENDING, DONE, FAILED or SKIPPED.
+    error_type (str | None): Class name of the exception that failed the file, if any.
+    error (str | None): The exception message, if any.
+    """
+
+    state: str
+    error_type: str | None = None
+    error: str | None = None
+
+
+class Journal:
+    """
+    The states of the files of a batch run, keyed by absolute path.
+
+    Without resume an existing journal is replaced by a new one for this run. With resume it is read back and added
+    to, and a ValueError is raised if it was written under another processor fingerprint.
+    """
+
+    def __init__(self, path: Path | str, version: str, resume: bool = False) -> None:
+        self.path = Path(path)
+        self.version = version
+        self.entries: dict[str, JournalEntry] = {}
+        self._file: IO[str] | None = None
+        self._new = not (resume and self.path.exists())
+        if not self._new:
+            self._load()
+
+    @staticmethod
+    def _key(file: Path | str) -> str:
+        return str(Path(file).resolve())
+
+    def _load(self) -> None:
+        text = self.path.read_text(encoding="utf-8")
+        lines = text.splitlines()
+        header = json.loads(lines[0]) if lines else {}
+        if header.get("version") != self.version:
+            raise ValueError(
+                f"Journal {self.path} was written under processor version {header.get('version')}, "
+                f"not {self.version}. Start a new run rather than resuming it."
+            )
+        for line in lines[1:]:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # The last line of a run that was killed while writing it.
+                continue
+            key = record.pop("path")
+            self.entries[key] = JournalEntry(**record)
+        if not text.endswith("\n"):
+            with open(self.path, "a", encoding="utf-8") as file:
+                file.write("\n")
+
+    def _writer(self) -> IO[str]:
+        """
+        The journal file, opened for appending on first use. A new journal starts with its header.
+        """
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            mode = "w" if self._new else "a"
+            self._file = open(self.path, mode, encoding="utf-8")  # pylint: disable=consider-using-with
+            if self._new:
+                self._file.write(json.dumps({"format": JOURNAL_FORMAT, "version": self.version}) + "\n")
+                self._new = False
+        return self._file
+
+    def entry(self, file: Path | str) -> JournalEntry | None:
+        """
+        The last recorded state of file, if any.
+        """
+        return self.entries.get(self._key(file))
+
+    def finished(self, file: Path | str, retry_failed: bool = False) -> bool:
+        """
+        True when file is DONE or SKIPPED, or FAILED and failures are not to be retried.
+        """
+        entry = self.entry(file)
+        if entry is None or entry.state == PENDING:
+            return False
+        return not (retry_failed and entry.state == FAILED)
+
+    def record(self, file: Path | str, state: str, error_type: str | None = None, error: str | None = None) -> None:
+        """
+        Record the new state of file and flush it to disk. Recording the state file is already in does nothing.
+        """
+        key = self._key(file)
+        entry = JournalEntry(state=state, error_type=error_type, error=error)
+        if self.entries.get(key) == entry:
+            return
+        self.entries[key] = entry
+        writer = self._writer()
+        writer.write(json.dumps({"path": key, **asdict(entry)}) + "\n")
+        writer.flush()
+
+    def counts(self) -> dict[str, int]:
+        """
+        The number of files in each state.
+        """
+        return dict(Counter(entry.state for entry in self.entries.values()))
+
+    def close(self) -> None:
+        """
+        Close the journal file.
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
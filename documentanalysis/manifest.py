@@ -0,0 +1,104 @@
+"""
+manifest.py
+-----------
+
+Persistent record of the files a corpus run has already processed, so the next run only processes what changed.
+
+For each input the manifest stores its size, modification time and content hash along with the fingerprint of the
+processor version and options that produced its output. A file is unchanged when its size and modification time
+match. When they do not, its content hash is compared before deciding it changed, so a copy or touch that leaves the
+bytes alone is still skipped. Any file processed under a different fingerprint is processed again.
+
+Classes:
+    ManifestEntry: What is known about one processed file.
+    Manifest: The entries for a corpus, stored as a JSON file.
+"""
+
+import json
+import os
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from documentanalysis.hashing import file_sha256
+
+MANIFEST_FORMAT: int = 1
+
+
+@dataclass
+class ManifestEntry:
+    """
+    What is known about one processed file.
+
+    Attributes:
+    size (int): Size of the file in bytes.
+    mtime_ns (int): Modification time of the file in nanoseconds.
+    sha256 (str): Hash of the file contents.
+    version (str): Fingerprint of the processor and options that produced the output.
+    """
+
+    size: int
+    mtime_ns: int
+    sha256: str
+    version: str
+
+
+class Manifest:
+    """
+    The processed files of a corpus, keyed by absolute path.
+
+    manifest = Manifest("manifest.json", version=config.fingerprint())
+    todo = [path for path in paths if manifest.changed(path)]
+    ...
+    manifest.record(path)
+    manifest.save()
+    """
+
+    def __init__(self, path: Path | str, version: str) -> None:
+        self.path = Path(path)
+        self.version = version
+        self.entries: dict[str, ManifestEntry] = {}
+        if self.path.exists():
+            stored = json.loads(self.path.read_text(encoding="utf-8"))
+            self.entries = {key: ManifestEntry(**entry) for key, entry in stored.get("files", {}).items()}
+
+    @staticmethod
+    def _key(file: Path) -> str:
+        return str(Path(file).resolve())
+
+    def changed(self, file: Path) -> bool:
+        """
+        True when file is new, has different contents or was processed under another version.
+        """
+        entry = self.entries.get(self._key(file))
+        if entry is None or entry.version != self.version:
+            return True
+        stat = os.stat(file)
+        if stat.st_size == entry.size and stat.st_mtime_ns == entry.mtime_ns:
+            return False
+        if stat.st_size != entry.size or file_sha256(file) != entry.sha256:
+            return True
+        # Same contents with a new modification time, remember it so the hash is not needed next time.
+        entry.mtime_ns = stat.st_mtime_ns
+        return False
+
+    def record(self, file: Path, sha256: str | None = None) -> None:
+        """
+        Record that file has been processed under the current version.
+        """
+        stat = os.stat(file)
+        self.entries[self._key(file)] = ManifestEntry(
+            size=stat.st_size,
+            mtime_ns=stat.st_mtime_ns,
+            sha256=sha256 or file_sha256(file),
+            version=self.version,
+        )
+
+    def save(self) -> None:
+        """
+        Write the manifest, replacing the previous one atomically.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self.path.with_name(f"{self.path.name}.tmp")
+        stored = {"format": MANIFEST_FORMAT, "files": {key: asdict(entry) for key, entry in self.entries.items()}}
+        temporary.write_text(json.dumps(stored, indent=1), encoding="utf-8")
+        os.replace(temporary, self.path)
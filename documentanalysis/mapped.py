@@ -0,0 +1,93 @@
+"""
+mapped.py
+---------
+
+Input files mapped into memory once and shared, without copying, by every library that reads them.
+
+Reading a multi-hundred-megabyte scan with `read_bytes` puts a private copy of the whole file on the heap, and each
+library that is then handed the path reads it into buffers of its own. A `MappedFile` maps the file read-only
+instead. Its pages are served straight from the operating system's page cache, shared with every other process that
+maps the same file, such as the page workers of one PDF, and dropped under memory pressure rather than swapped.
+
+- `view` is a memoryview of the whole file. PyMuPDF opens it with `fitz.open(stream=view)`, NumPy wraps it with
+  `np.frombuffer` for OpenCV's `imdecode`, and hashes read it in place.
+- `stream` is the map as a read-only, seekable file object, for pypdf and PIL, which read through file objects.
+
+    with MappedFile(path) as mapped:
+        document = fitz.open(stream=mapped.view, filetype="pdf")
+        ...
+        document.close()
+
+A map cannot be closed while something still holds a view of it, so anything opened over `view` must be closed or
+dropped before the `MappedFile` is.
+
+Classes:
+    MappedFile: A file mapped read-only into memory.
+"""
+
+import io
+import mmap
+import os
+from pathlib import Path
+from typing import IO, Any
+
+
+class MappedFile:
+    """
+    A file mapped read-only into memory, as a memoryview and as a file object.
+    Empty files cannot be mapped and are given an empty view and stream instead.
+    Use as a context manager so the map is released at the end of the run.
+    """
+
+    def __init__(self, path: Path | str) -> None:
+        self.path = Path(path)
+        with open(self.path, "rb") as file:
+            self.size = os.fstat(file.fileno()).st_size
+            # The map holds its own reference to the file, so the descriptor can be closed straight away.
+            self._map: mmap.mmap | None = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else None
+        self._closed = False
+
+    def __enter__(self) -> "MappedFile":
+        return self
+
+    def __exit__(self, exc_type: Any, *exc_info: Any) -> None:
+        try:
+            self.close()
+        except BufferError:
+            # The traceback of the error being raised can still hold a view, the map is released along with it.
+            if exc_type is None:
+                raise
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def view(self) -> memoryview:
+        """
+        The whole file, without copying it.
+        Each use gives a new view, and the map stays open while any of them is alive.
+        """
+        if self._closed:
+            raise ValueError(f"{self.path} is no longer mapped")
+        return memoryview(self._map) if self._map is not None else memoryview(b"")
+
+    @property
+    def stream(self) -> IO[bytes]:
+        """
+        The file as a seekable file object reading from the map. Each read copies only the bytes it returns.
+        There is one stream per map, so its position is shared by everything reading from it.
+        """
+        if self._closed:
+            raise ValueError(f"{self.path} is no longer mapped")
+        if self._map is None:
+            return io.BytesIO(b"")
+        return self._map  # type: ignore[return-value]
+
+    def close(self) -> None:
+        """
+        Unmap the file.
+        Raises BufferError while a view from `view`, such as one held by an open PyMuPDF document, is still alive.
+        """
+        if self._map is not None and not self._map.closed:
+            self._map.close()
+        self._closed = True
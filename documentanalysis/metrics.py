@@ -0,0 +1,212 @@
+"""
+metrics.py
+----------
+
+Per stage timings and counters for a processing run.
+
+Stages such as PDF parsing, image extraction, OCR and writes are wrapped in `METRICS.stage(...)`, which records wall
+time and any counters (bytes, pages, images, errors) against the document currently being processed. Documents are
+opened with `METRICS.document(path)`. Stages nest, and the time of a stage includes the stages run inside it.
+Each process has one `Metrics` instance; the ingestion engine carries the records
+of its workers back to the parent, which builds the run summary and exports it. Stages run by the page workers of a
+document are added to the document's record with `add_stages`.
+
+When metrics are disabled, which is the default, `stage` and `document` return a shared no-op object so the
+instrumented code pays one attribute check per stage.
+
+    with METRICS.document(path):
+        with METRICS.stage("ocr", bytes=len(data)) as stage:
+            ...
+            stage.add(errors=1)
+
+Classes:
+    Metrics: The stage records of the documents processed in this process.
+
+Attributes:
+    METRICS: The per process Metrics instance.
+"""
+
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, Iterable
+
+
+class _NullStage:
+    """
+    Stands in for a stage or document when metrics are disabled.
+    """
+
+    def __enter__(self) -> "_NullStage":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        return None
+
+    def add(self, **counters: int) -> None:
+        """
+        Ignore the counters.
+        """
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    """
+    Times one pass through a stage and adds it, with its counters, to a document record.
+    """
+
+    def __init__(self, metrics: "Metrics", name: str, counters: dict[str, int]) -> None:
+        self.metrics = metrics
+        self.name = name
+        self.counters = counters
+        self.start = 0.0
+
+    def __enter__(self) -> "_Stage":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type: Any, *exc_info: Any) -> None:
+        if exc_type is not None:
+            self.add(errors=1)
+        self.metrics.record(self.name, time.perf_counter() - self.start, self.counters)
+
+    def add(self, **counters: int) -> None:
+        """
+        Add to the counters recorded for this pass.
+        """
+        for counter, value in counters.items():
+            self.counters[counter] = self.counters.get(counter, 0) + value
+
+
+class _Document:
+    """
+    Makes a document current for the stages run inside it.
+    """
+
+    def __init__(self, metrics: "Metrics", path: str) -> None:
+        self.metrics = metrics
+        self.record: dict[str, Any] = {"path": path, "seconds": 0.0, "stages": {}}
+        self.previous: dict[str, Any] | None = None
+        self.start = 0.0
+
+    def __enter__(self) -> "_Document":
+        self.previous, self.metrics.current = self.metrics.current, self.record
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.record["seconds"] = round(time.perf_counter() - self.start, 6)
+        self.metrics.current = self.previous
+        with self.metrics.lock:
+            self.metrics.documents.append(self.record)
+
+
+class Metrics:
+    """
+    The stage records of the documents processed in this process.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.documents: list[dict[str, Any]] = []
+        self.current: dict[str, Any] | None = None
+        # Stages that ran outside any document, such as writes flushed at shutdown.
+        self.unattributed: dict[str, Any] = {"path": None, "seconds": 0.0, "stages": {}}
+
+    def document(self, path: Path | str) -> _Document | _NullStage:
+        """
+        Record the stages run inside the returned context against path.
+        """
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Document(self, str(path))
+
+    def stage(self, name: str, **counters: int) -> _Stage | _NullStage:
+        """
+        Time the stage run inside the returned context, with its counters.
+        """
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name, dict(counters))
+
+    def record(self, name: str, seconds: float, counters: dict[str, int]) -> None:
+        """
+        Add one pass through a stage to the current document.
+        """
+        target = self.current if self.current is not None else self.unattributed
+        with self.lock:
+            stage = target["stages"].setdefault(name, {"calls": 0, "seconds": 0.0})
+            stage["calls"] += 1
+            stage["seconds"] = round(stage["seconds"] + seconds, 6)
+            for counter, value in counters.items():
+                stage[counter] = stage.get(counter, 0) + value
+
+    def add_stages(self, stages: dict[str, dict[str, Any]]) -> None:
+        """
+        Add stage totals recorded in another process, such as a page worker, to the current document.
+        """
+        target = self.current if self.current is not None else self.unattributed
+        with self.lock:
+            for name, totals in stages.items():
+                stage = target["stages"].setdefault(name, {"calls": 0, "seconds": 0.0})
+                for key, value in totals.items():
+                    stage[key] = stage.get(key, 0) + value
+                stage["seconds"] = round(stage["seconds"], 6)
+
+    def pop_documents(self) -> list[dict[str, Any]]:
+        """
+        Return and forget the records collected so far, to send them to another process.
+        """
+        with self.lock:
+            documents, self.documents = self.documents, []
+        return documents
+
+    def add_documents(self, documents: Iterable[dict[str, Any]]) -> None:
+        """
+        Add records collected by another process.
+        """
+        with self.lock:
+            self.documents.extend(documents)
+
+    def summary(self) -> dict[str, Any]:
+        """
+        Totals per stage across every document.
+        """
+        stages: dict[str, dict[str, Any]] = {}
+        for document in [*self.documents, self.unattributed]:
+            for name, stage in document["stages"].items():
+                total = stages.setdefault(name, {"calls": 0, "seconds": 0.0})
+                for key, value in stage.items():
+                    total[key] = total.get(key, 0) + value
+        for total in stages.values():
+            total["seconds"] = round(total["seconds"], 6)
+        return {
+            "documents": len(self.documents),
+            "seconds": round(sum(document["seconds"] for document in self.documents), 6),
+            "stages": stages,
+        }
+
+    def export(self, path: Path | str) -> None:
+        """
+        Write the summary and the per document records as JSON.
+        """
+        report = {"summary": self.summary(), "documents": self.documents}
+        if self.unattributed["stages"]:
+            report["unattributed"] = self.unattributed
+        Path(path).write_text(json.dumps(report, indent=1), encoding="utf-8")
+
+    def reset(self) -> None:
+        """
+        Forget everything recorded so far.
+        """
+        with self.lock:
+            self.documents = []
+            self.current = None
+            self.unattributed = {"path": None, "seconds": 0.0, "stages": {}}
+
+
+METRICS = Metrics()
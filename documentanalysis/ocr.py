@@ -22,12 +22,41 @@ including extracted text.
 import logging
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
+from documentanalysis.config import ProcessingConfig
 from documentanalysis.errors import FileTypeError
-from documentanalysis.processors import DocumentProcessor, PDFProcessor, PNGProcessor
+from documentanalysis.metrics import METRICS
+from documentanalysis.registry import sniff
+from documentanalysis.results import DocumentRecord
 from documentanalysis.store import StoreWriter
 
+if TYPE_CHECKING:
+    # The processors pull in PyMuPDF, pypdf and PIL; they are imported when the first file is dispatched.
+    from documentanalysis.processors import DocumentProcessor, PDFProcessor, TIFFProcessor
+
+# Processors that can still be imported from this module. They are loaded from documentanalysis.processors on first
+# access, see __getattr__, so importing this module stays cheap.
+PROCESSORS: tuple[str, ...] = (
+    "DocumentProcessor",
+    "ImageProcessor",
+    "JPEGProcessor",
+    "PDFProcessor",
+    "PNGProcessor",
+    "TIFFProcessor",
+)
+
+
+def __getattr__(name: str) -> Any:
+    """
+    The processor classes, imported from documentanalysis.processors when first asked for.
+    """
+    if name in PROCESSORS:
+        from documentanalysis import processors  # pylint: disable=import-outside-toplevel
+
+        return getattr(processors, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 @dataclass()
 class Document:
@@ -37,6 +66,8 @@ class Document:
     Attributes:
     location (Path): The path to the document file.
     ocr_output_path (str): The path where the OCR results should be written.
+    config (ProcessingConfig): Options for the run, passed on to the processor.
+    write_failures (int): The number of saves the writers reported as failed.
 
     Methods:
     __post_init__: A special method in Python dataclasses that's called after the class is fully initialized.
@@ -44,6 +75,10 @@ class Document:
     write_ocr_text: Writes the OCR results to a file. It first ensures that the directory for the output file exists,
                     then writes the OCR results to the output file.
 
+    The processors produce documentanalysis.results records, which are handed to the writers as they are: a
+    DocumentRecord for every file type, or for streamed documents a PageRecord per page followed by the document
+    record without its pages. Each writer serializes them as it needs.
+
     .save(
         ,
         obj={"name": "John", "address": "Highway 37"}
@@ -52,8 +87,11 @@ class Document:
 
     location: Path
     logger: logging.Logger
-    processor: DocumentProcessor = field(init=False)
+    processor: "DocumentProcessor" = field(init=False)
     writers: list[StoreWriter]
+    config: ProcessingConfig = field(default_factory=ProcessingConfig)
+    kind: str = field(init=False, default="")
+    write_failures: int = field(init=False, default=0)
 
     def __post_init__(self) -> None:
         """
@@ -62,41 +100,91 @@ class Document:
         """
         self.process_file()
 
-    def write_ocr_text(self, ocr_text) -> None:
+    def write_ocr_text(self, ocr_text, metadata: dict[str, Any] | None = None) -> None:
         """
         Write out the ocr'd text results
+        metadata, such as the image properties and OCR confidence, is saved alongside the text.
         """
         if ocr_text and len("\n".join(ocr_text)) > 0:
-            for writer in self.writers:
-                writer.save({"file": str(self.location), "text": "\n".join(ocr_text)}, logger=self.logger)
+            metadata = dict(metadata or {})
+            confidence = metadata.pop("confidence", None)
+            record = DocumentRecord.from_image(self.location, self.kind, "\n".join(ocr_text), confidence, metadata)
+            self.write_record(record)
 
     def write_metadata_text(self, metadata: dict[str, Any]) -> None:
         """
         Write out the ocr'd text results
         """
         if metadata:
+            self.write_record(DocumentRecord.from_metadata(self.location, self.kind, metadata))
+
+    def write_record(self, record: DocumentRecord) -> None:
+        """
+        Hand the document to every writer. The writers share the record and must not change it.
+        """
+        for writer in self.writers:
+            self.save(writer, record)
+
+    def save(self, writer: StoreWriter, obj: Any) -> bool:
+        """
+        Save obj with writer, recorded as a stage named after the writer.
+        """
+        with METRICS.stage(f"save.{type(writer).__name__}") as stage:
+            saved = writer.save(obj, logger=self.logger)
+            if not saved:
+                stage.add(errors=1)
+                self.write_failures += 1
+        return saved
+
+    def write_streamed_pages(self, processor: "PDFProcessor | TIFFProcessor") -> None:
+        """
+        Hand each page record to the writers as soon as it has been processed, then the document record without
+        its pages.
+        """
+        for page in processor.stream():
             for writer in self.writers:
-                writer.save(metadata, logger=self.logger)
+                with METRICS.stage(f"save_page.{type(writer).__name__}"):
+                    writer.save_page(page, logger=self.logger)
+        metadata = processor.document_record()
+        for writer in self.writers:
+            with METRICS.stage(f"end_document.{type(writer).__name__}") as stage:
+                if not writer.end_document(metadata, logger=self.logger):
+                    stage.add(errors=1)
+                    self.write_failures += 1
 
     def process_file(self) -> None:
         """
         process the file
+        Recorded as the "process_file" stage of the document, with the size of the file.
         """
-        if self.location.suffix.lower() == ".pdf":
-            self.processor = PDFProcessor(path=self.location, logger=self.logger)
-            # self.write_ocr_text(self.processor.process())
-            self.processor.process()
-            self.write_metadata_text(self.processor.metadata)
+        with METRICS.document(self.location), METRICS.stage("process_file") as stage:
+            if METRICS.enabled and self.location.exists():
+                stage.add(bytes=self.location.stat().st_size)
+            self.dispatch()
+
+    def dispatch(self) -> None:
+        """
+        Hand the file to the processor for its type, recognised from its header, and write the results.
+        See documentanalysis.registry.
+        """
+        file_type = sniff(self.location)
+        if file_type is None:
+            error_message: str = (
+                f"File type {self.location.suffix.lower()} not implemented for plat analysis {self.location}"
+            )
+            custom_exception = FileTypeError(error_message, self.location)
+            self.logger.warning(custom_exception)
             return
-        if self.location.suffix.lower() == ".png":
-            self.processor = PNGProcessor(path=self.location, logger=self.logger)
+        if file_type.suffixes and self.location.suffix.lower() not in file_type.suffixes:
+            self.logger.info(f"{self.location} is a {file_type.name.upper()} file despite its name")
+        self.kind = file_type.name
+        self.processor = file_type.load()(path=self.location, logger=self.logger, config=self.config)
+        if file_type.paged:
+            if self.config.stream_pages:
+                self.write_streamed_pages(self.processor)
+                return
             # self.write_ocr_text(self.processor.process())
-            self.processor.process()
-            self.write_ocr_text(self.processor.process())
-            # self.write_metadata_text(self.processor.metadata)
+            self.write_record(self.processor.process())
             return
-        error_message: str = (
-            f"File type {self.location.suffix.lower()} not implemented for plat analysis {self.location}"
-        )
-        custom_exception = FileTypeError(error_message, self.location)
-        self.logger.warning(custom_exception)
+        if self.processor.record.text:
+            self.write_record(self.processor.record)
@@ -12,15 +12,18 @@ Classes:
 Methods defined in PDFProcessor:
     __init__: Initializes the PDFProcessor with a path to a PDF file and a logger.
     extract_text: Extracts text from the PDF document using PyMuPDF.
+    image_extraction: Yields the images of the PDF document a page at a time, each unique image decoded once.
 """
 
 import logging
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, Iterator, List, Tuple
 
 import fitz  # PyMuPDF
 
+from documentanalysis.hashing import bytes_sha256
+from documentanalysis.mapped import MappedFile
 from documentanalysis.processor import DocumentProcessorNew
 
 
@@ -42,12 +45,13 @@ class PDFProcessorNew(DocumentProcessorNew):
         Initialize the PDFProcessor with the given path and logger.
         """
         self.extracted_text_list = []
+        self.image_refs: Dict[int, List[int]] = {}
         self.logger.info(f"Processing PDF: {self.path}")
-        self.document = fitz.open(self.path)
+        # The file is mapped rather than read. The document holds the only view of the map, which is unmapped along
+        # with the document.
+        self.document = fitz.open(stream=MappedFile(self.path).view, filetype="pdf")
         self.metadata: Dict[str, Any] = dict(self.document.metadata)
 
-        print('a')
-
     def extract_text(self) -> list[str]:
         """
         Extract text from the PDF document using PyMuPDF.
@@ -68,32 +72,47 @@ class PDFProcessorNew(DocumentProcessorNew):
 
         return extracted_text
 
-    def image_extraction(self, doc: Any = None) -> List[fitz.Pixmap]:
+    def image_extraction(self, doc: Any = None) -> Iterator[List[fitz.Pixmap]]:
         """
-        Extract images from the PDF document using PyMuPDF.
+        Extract images from the PDF document using PyMuPDF, one page at a time.
 
         Parameters:
             doc: PyMuPDF Document object (optional).
 
-        Returns:
-            A list of extracted images as PyMuPDF Pixmap objects.
+        Yields:
+            For each page, the images first seen on that page as PyMuPDF Pixmap objects, so every unique image is
+            decoded once. Only one page's images are held at a time: the generator drops its references to them
+            before decoding the next page.
+            self.image_refs records the pages each image appears on, by xref, and is complete once every page has been
+            yielded.
         """
         # If a specific document is not provided, use the PDF document loaded during initialization.
         if doc is None:
             doc = self.document
 
-        images = []
+        # Each unique image is decoded once. image_refs maps its xref to the pages that show it.
+        self.image_refs = {}
+        # The same image stored under several xrefs is decoded once too, under the first of them.
+        unique_xrefs: Dict[int, int] = {}
+        by_content: Dict[str, int] = {}
         for page_number in range(len(doc)):
             page = doc[page_number]
+            images = []
             # Iterate through each image in the page and create a Pixmap object.
-            for img_index, img in enumerate(page.get_images(full=True)):
+            for img in page.get_images(full=True):
                 xref = img[0]
-                base_image = doc.extract_image(xref)
-                img_data = base_image["image"]
-                img_pixmap = fitz.open("png", img_data)
-                images.append(img_pixmap)
-
-        return images
+                if xref not in unique_xrefs:
+                    shape = f"{img[2]}x{img[3]}x{img[4]}:".encode("utf-8")
+                    digest = bytes_sha256(shape + (doc.xref_stream_raw(xref) or b""))
+                    unique_xrefs[xref] = by_content.setdefault(digest, xref)
+                xref = unique_xrefs[xref]
+                if xref not in self.image_refs:
+                    self.image_refs[xref] = []
+                    images.append(fitz.Pixmap(doc, xref))
+                if page_number not in self.image_refs[xref]:
+                    self.image_refs[xref].append(page_number)
+            yield images
+            del images
 
     def close(self):
         """
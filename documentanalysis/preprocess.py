@@ -0,0 +1,187 @@
+"""
+preprocess.py
+-------------
+
+Clean up images before they are OCR'd.
+
+Historical clippings and faded plats go to tesseract as they were scanned: colour, noisy, often tilted and at far
+more resolution than recognition needs. `preprocess` runs a configurable OpenCV pipeline over an image first, working
+on whole NumPy arrays rather than pixel by pixel. The steps, selected with `ProcessingConfig.preprocess`, always run in
+this order:
+
+- STRIP_COLOR: whiten strongly coloured ink, such as blue or red watermarks and stamps, keeping black text.
+- GRAYSCALE: drop to a single channel.
+- DOWNSCALE: shrink to `ProcessingConfig.preprocess_target_dpi` when the image's resolution is known to be higher.
+- DENOISE: remove speckle with a median filter.
+- THRESHOLD: binarise with an adaptive threshold, which copes with uneven fading across a page.
+- DESKEW: rotate the text back to horizontal.
+
+Preprocessing changes what tesseract reads, so the steps and their settings are part of every OCR cache key, see
+`identity`.
+
+Functions:
+    preprocess: Run the configured steps over an image.
+    identity: The configured steps and settings, for cache keys.
+    steps: The configured steps, in the order they run.
+    strip_color: Whiten the pixels of the given colours.
+    downscale: Shrink an image to a target resolution.
+    deskew_angle: The rotation that levels the text in a binary image.
+    deskew: Rotate an image by its skew.
+"""
+
+from typing import Any
+
+import cv2 as cv
+import numpy as np
+from PIL import Image  # pylint: disable=import-error
+
+from documentanalysis.config import ProcessingConfig
+
+STRIP_COLOR: str = "strip_color"
+GRAYSCALE: str = "grayscale"
+DOWNSCALE: str = "downscale"
+DENOISE: str = "denoise"
+THRESHOLD: str = "threshold"
+DESKEW: str = "deskew"
+STEPS: tuple[str, ...] = (STRIP_COLOR, GRAYSCALE, DOWNSCALE, DENOISE, THRESHOLD, DESKEW)
+
+# OpenCV hue ranges (0-180) of the colours strip_color can remove.
+COLOR_HUES: dict[str, list[tuple[int, int]]] = {
+    "blue": [(90, 135)],
+    "red": [(0, 10), (170, 180)],
+    "green": [(35, 85)],
+}
+# Pixels less saturated than this are treated as black, grey or white and kept.
+MIN_SATURATION: int = 80
+# Skew angles beyond this are more likely a table or a drawing than tilted text, and are left alone.
+MAX_SKEW_DEGREES: float = 15.0
+MIN_SKEW_DEGREES: float = 0.1
+
+
+def identity(config: ProcessingConfig) -> str:
+    """
+    The configured steps and the settings they use, empty when preprocessing is off.
+    """
+    selected = steps(config)
+    if not selected:
+        return ""
+    colors = ",".join(config.preprocess_colors)
+    return f"preprocess {','.join(selected)} dpi={config.preprocess_target_dpi} colors={colors}"
+
+
+def strip_color(rgb: np.ndarray, colors: tuple[str, ...]) -> np.ndarray:
+    """
+    Set every strongly saturated pixel whose hue is one of colors to white.
+    rgb is an RGB array; a new array is returned.
+    """
+    hsv = cv.cvtColor(rgb, cv.COLOR_RGB2HSV)
+    hue, saturation = hsv[..., 0], hsv[..., 1]
+    mask = np.zeros(hue.shape, dtype=bool)
+    for color in colors:
+        if color not in COLOR_HUES:
+            raise ValueError(f"Unknown colour {color}, expected one of {sorted(COLOR_HUES)}")
+        for low, high in COLOR_HUES[color]:
+            mask |= (hue >= low) & (hue <= high)
+    mask &= saturation >= MIN_SATURATION
+    stripped = rgb.copy()
+    stripped[mask] = 255
+    return stripped
+
+
+def downscale(array: np.ndarray, dpi: float | None, target_dpi: int) -> np.ndarray:
+    """
+    Shrink array from dpi to target_dpi. Images of unknown or lower resolution are returned as they are.
+    """
+    if not dpi or dpi <= target_dpi:
+        return array
+    scale = target_dpi / dpi
+    size = (max(round(array.shape[1] * scale), 1), max(round(array.shape[0] * scale), 1))
+    return cv.resize(array, size, interpolation=cv.INTER_AREA)
+
+
+def deskew_angle(binary: np.ndarray) -> float:
+    """
+    The counter-clockwise rotation in degrees that levels the text in a black on white image, 0 when it cannot be
+    told.
+    """
+    ink = cv.findNonZero(cv.bitwise_not(binary))
+    if ink is None or len(ink) < 2:
+        return 0.0
+    (_, _), (width, height), angle = cv.minAreaRect(ink)
+    # minAreaRect reports angles in (0, 90]; fold them to the smallest rotation that makes the box level.
+    if width < height:
+        angle -= 90
+    if abs(angle) > 45:
+        angle -= 90 * np.sign(angle)
+    return float(angle)
+
+
+def deskew(array: np.ndarray) -> np.ndarray:
+    """
+    Rotate a grayscale or RGB image so its text is horizontal, filling the corners with white.
+    The skew is measured on a binarised copy, so array need not be binary itself.
+    """
+    binary = cv.threshold(_gray(array), 0, 255, cv.THRESH_BINARY | cv.THRESH_OTSU)[1]
+    angle = deskew_angle(binary)
+    if not MIN_SKEW_DEGREES <= abs(angle) <= MAX_SKEW_DEGREES:
+        return array
+    height, width = array.shape[:2]
+    matrix = cv.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    white = 255 if array.ndim == 2 else (255, 255, 255)
+    return cv.warpAffine(array, matrix, (width, height), borderMode=cv.BORDER_CONSTANT, borderValue=white)
+
+
+def _gray(array: np.ndarray) -> np.ndarray:
+    """
+    array as a single channel.
+    """
+    return array if array.ndim == 2 else cv.cvtColor(array, cv.COLOR_RGB2GRAY)
+
+
+def _image_dpi(image: Image.Image) -> float | None:
+    """
+    The horizontal resolution recorded on image, if any.
+    """
+    dpi: Any = image.info.get("dpi")
+    return dpi[0] if isinstance(dpi, tuple) else dpi
+
+
+def steps(config: ProcessingConfig) -> list[str]:
+    """
+    The steps selected in config, in the order they run.
+    """
+    unknown = set(config.preprocess) - set(STEPS)
+    if unknown:
+        raise ValueError(f"Unknown preprocessing steps {sorted(unknown)}, expected any of {list(STEPS)}")
+    return [step for step in STEPS if step in config.preprocess]
+
+
+def preprocess(image: Image.Image, config: ProcessingConfig) -> Image.Image:
+    """
+    Run the steps selected in config over image and return the result. Without steps image is returned as it is.
+    The image's resolution is read from image.info["dpi"] when it has one.
+    """
+    selected = steps(config)
+    if not selected:
+        return image
+    dpi = _image_dpi(image)
+    array = np.asarray(image if image.mode in ("L", "RGB") else image.convert("RGB"))
+    run = {
+        STRIP_COLOR: lambda array: strip_color(array, config.preprocess_colors) if array.ndim == 3 else array,
+        GRAYSCALE: _gray,
+        DOWNSCALE: lambda array: downscale(array, dpi, config.preprocess_target_dpi),
+        DENOISE: lambda array: cv.medianBlur(array, 3),
+        THRESHOLD: lambda array: cv.adaptiveThreshold(
+            _gray(array), 255, cv.ADAPTIVE_THRESH_GAUSSIAN_C, cv.THRESH_BINARY, 31, 15
+        ),
+        DESKEW: deskew,
+    }
+    for step in selected:
+        array = run[step](array)
+
+    result = Image.fromarray(array)
+    if dpi:
+        if DOWNSCALE in selected:
+            dpi = min(dpi, config.preprocess_target_dpi)
+        result.info["dpi"] = (dpi, dpi)
+    return result
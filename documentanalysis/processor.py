@@ -15,7 +15,7 @@ Methods defined in DocumentProcessor:
     font_extraction: Extracts font information from a document.
 """
 
-from typing import Any, Protocol, runtime_checkable
+from typing import Any, Iterator, Protocol, runtime_checkable
 
 
 @runtime_checkable
@@ -35,11 +35,11 @@ class DocumentProcessorNew(Protocol):
         The extracted text as a string.
         """
 
-    def image_extraction(self) -> list[Any]:
+    def image_extraction(self) -> Iterator[list[Any]]:
         """
         Extract images from the document.
         Parameters:
         doc: The document to extract images from.
-        Returns:
-        A list of extracted images.
+        Yields:
+        The extracted images, a page at a time.
         """
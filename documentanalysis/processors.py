@@ -9,36 +9,223 @@ It includes the following:
   - `ocr`: Perform OCR on an image.
   - `process`: Process a document and return the extracted text.
 
+- `ImageResult`: The text, confidence and metadata produced for an image file.
+
+- `ImageProcessor`: A class for processing files holding a single image. Its result is computed once, on first use,
+    and `record` is that result as a documentanalysis.results.DocumentRecord.
+  - `PNGProcessor`: PNG images.
+  - `JPEGProcessor`: JPEG images, turned upright by their EXIF orientation.
+
+- `TIFFProcessor`: A class for processing TIFF scans page by page, with records shaped like a PDF's.
+
 - `PDFProcessor`: A class for processing PDF documents.
     It implements the `DocumentProcessor` interface and provides the following methods:
   - `ocr`: Perform OCR on an image and return the extracted text.
   - `collect_pdf_images`: Extract images from a PDF page and perform OCR on each image.
+    Images repeated within a document, such as logos and seals, are decoded and OCR'd once.
+  - `render_pdf_page`: Render a PDF page with PyMuPDF and perform OCR on the raster.
   - `collect_pdf_pages`: Extract pages from a PDF document and collect the OCR'd text from each page.
-  - `process`: Given the path to a PDF document, return a list of OCR'd text for each page.
+  - `process`: Given the path to a PDF document, return its DocumentRecord, holding the OCR'd text of each page.
+  - `stream`: Process a PDF document one page at a time, yielding each page's PageRecord.
+
+  Pages, images and errors are built as the typed records of documentanalysis.results and handed to the writers as
+  they are.
+
+  The PDF is opened once per `process` call through a `PDFSession`, which every stage shares. The session maps the
+  file into memory and PyMuPDF and pypdf both read that map, and images are OCR'd from the raster pypdf has already
+  decoded rather than decoded a second time.
+
+  With `ProcessingConfig.page_workers` set, a PDF of at least `page_parallel_min_pages` pages is split into
+  contiguous page ranges handled by a pool of processes, see `process_page_range`. Each opens its own handles on
+  the file, and the page records come back in page order in the same structure as a serial run.
+
+- `page_ranges`: Split a page count into contiguous ranges.
+- `process_page_range`: Process a range of pages of a PDF. Runs in a page worker process.
 
 This module is part of the plat project, which is used for processing plat documents.
 """
 
-import io
+import json
 import logging
+import multiprocessing
 import struct
+import time
 from abc import abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
+from functools import cached_property
 from pathlib import Path
-from typing import Any, Protocol, runtime_checkable
+from typing import Any, Iterator, Protocol, runtime_checkable
 
-import fitz
-import pytesseract  # pylint: disable=import-error
-from PIL import Image, UnidentifiedImageError  # pylint: disable=import-error
+from PIL import Image, ImageOps, UnidentifiedImageError  # pylint: disable=import-error
 from pypdf import PageObject, PdfReader  # pylint: disable=import-error
+from pypdf.generic import StreamObject  # pylint: disable=import-error
 from pypdf._utils import ImageFile  # pylint: disable=import-error
 
+from documentanalysis.backends import get_backend
+from documentanalysis.cache import get_cache
+from documentanalysis.classify import classify_page
+from documentanalysis.config import ProcessingConfig
 from documentanalysis.errors import PDFPageError
+from documentanalysis.hashing import bytes_sha256
+from documentanalysis.mapped import MappedFile
+from documentanalysis.metrics import METRICS
+from documentanalysis.results import DocumentRecord, ErrorRecord, ImageRecord, PageRecord
+from documentanalysis.session import RENDER_ERRORS, PDFSession
+
+# Ways of rasterising a PDF page for OCR, see ProcessingConfig.page_raster.
+IMAGES: str = "images"
+RENDER: str = "render"
+# Page ranges a large PDF is split into per page worker. More ranges than workers evens out ranges of slow pages.
+RANGES_PER_WORKER: int = 2
+# How page workers are started. Forking a process that runs threads can copy a lock some thread holds.
+PAGE_WORKER_START_METHOD: str = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+# Entries of an image XObject that change how its stored bytes decode, and so are part of its OCR cache key.
+IMAGE_KEY_ENTRIES: tuple[str, ...] = (
+    "/Width", "/Height", "/BitsPerComponent", "/Filter", "/DecodeParms", "/ColorSpace", "/Decode", "/SMask", "/Mask",
+    "/ImageMask",
+)
+# Levels of nested PDF objects followed when describing an image for its key.
+IMAGE_KEY_DEPTH: int = 8
 
 # import tika
 # tika.initVM()
 # from tika import parser
 
 
+def image_to_text(image: Any, data: bytes | memoryview | None, config: ProcessingConfig) -> tuple[str, float | None]:
+    """
+    OCR an image with the run's OCR backend, consulting the run's OCR cache first.
+    Returns the text and the engine's mean confidence, which is None when the engine does not report one
+    or the text came from the cache.
+    data is the encoded image the cache key is built from, so a cache hit never decodes the image.
+    Without data the cache is skipped.
+    The image goes through the run's preprocessing steps before it is OCR'd, and very large images are OCR'd tile by
+    tile; both settings are part of the cache key.
+    """
+    backend = get_backend(config)
+    ocr_cache = get_cache(config)
+    with METRICS.stage("ocr", images=1, bytes=len(data or b"")) as stage:
+        if ocr_cache is None or data is None:
+            return recognise(image, config)
+        key = ocr_cache.key(data, ocr_identity(backend.identity(), config))
+        text = ocr_cache.get(key)
+        if text is not None:
+            stage.add(cache_hits=1)
+            return text, None
+        text, confidence = recognise(image, config)
+        ocr_cache.put(key, text)
+        return text, confidence
+
+
+def ocr_identity(engine: str, config: ProcessingConfig) -> str:
+    """
+    The OCR engine's identity with every setting that changes the text it produces, for cache keys.
+    The preprocessing and tiling modules load OpenCV, so they are only imported when the run uses them.
+    """
+    settings = [engine]
+    if config.preprocess:
+        from documentanalysis import preprocess  # pylint: disable=import-outside-toplevel
+
+        settings.append(preprocess.identity(config))
+    if config.tile_mode:
+        from documentanalysis import tiling  # pylint: disable=import-outside-toplevel
+
+        settings.append(tiling.identity(config))
+    return " ".join(settings)
+
+
+def recognise(image: Any, config: ProcessingConfig) -> tuple[str, float | None]:
+    """
+    Preprocess and OCR an image with the run's OCR backend, piece by piece when it is large enough.
+    Tiled images have no single confidence, so theirs is None.
+    """
+    backend = get_backend(config)
+    image = preprocess_image(image, config)
+    if config.tile_mode:
+        from documentanalysis import tiling  # pylint: disable=import-outside-toplevel
+
+        if tiling.use_tiling(image, config):
+            with METRICS.stage("ocr_tiled", images=1):
+                text, _ = tiling.ocr_tiled(image, backend.image_to_string, config)
+            return text, None
+    return backend.image_to_text(image)
+
+
+def preprocess_image(image: Any, config: ProcessingConfig) -> Any:
+    """
+    Run the run's preprocessing steps over image, see documentanalysis.preprocess.
+    """
+    if not config.preprocess:
+        return image
+    from documentanalysis.preprocess import preprocess  # pylint: disable=import-outside-toplevel
+
+    with METRICS.stage("preprocess", images=1):
+        return preprocess(image, config)
+
+
+def image_to_string(image: Any, data: bytes | memoryview | None, config: ProcessingConfig) -> str:
+    """
+    OCR an image with the run's OCR backend, consulting the run's OCR cache first. See image_to_text.
+    """
+    return image_to_text(image, data, config)[0]
+
+
+def _pdf_value(value: Any, depth: int = 0) -> Any:
+    """
+    A PDF object as plain JSON values, with references followed and streams given as their entries and data hash.
+    """
+    if depth > IMAGE_KEY_DEPTH:
+        return None
+    value = value.get_object() if hasattr(value, "get_object") else value
+    if isinstance(value, StreamObject):
+        entries = {str(name): _pdf_value(item, depth + 1) for name, item in value.items()}
+        return {"entries": entries, "data": bytes_sha256(value._data)}  # pylint: disable=protected-access
+    if isinstance(value, dict):
+        return {str(name): _pdf_value(item, depth + 1) for name, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_pdf_value(item, depth + 1) for item in value]
+    if isinstance(value, bytes):
+        return value.hex()
+    return str(value)
+
+
+def stream_image_bytes(stream: StreamObject) -> bytes:
+    """
+    An image XObject as it is stored in the PDF, still encoded, preceded by the entries that decide how its bytes
+    decode: its dimensions, filters and their parameters, colorspace with any Indexed palette or ICC profile, decode
+    array and masks.
+    """
+    entries = {name: _pdf_value(stream[name]) for name in IMAGE_KEY_ENTRIES if name in stream}
+    header = json.dumps(entries, sort_keys=True, separators=(",", ":")) + "\n"
+    return header.encode("utf-8") + stream._data  # pylint: disable=protected-access
+
+
+def encoded_image_bytes(image: ImageFile) -> bytes:
+    """
+    The image as it is stored in the PDF, used to build OCR cache keys.
+    pypdf's image.data is a fresh encode of the decoded raster and is not byte for byte stable between runs.
+    """
+    if image.indirect_reference is None:
+        return image.data
+    return stream_image_bytes(image.indirect_reference.get_object())
+
+
+def image_stream(page: PageObject, image_id: str | list[str]) -> StreamObject | None:
+    """
+    The XObject stream of one of page.images, found without decoding it.
+    image_id is a key of page.images; nested ids walk down through the form XObjects that hold the image.
+    Inline images have no stream of their own and give None.
+    """
+    names = [image_id] if isinstance(image_id, str) else list(image_id)
+    if names[0].startswith("~"):
+        return None
+    holder: Any = page
+    for name in names:
+        holder = holder["/Resources"].get_object()["/XObject"].get_object()[name].get_object()
+    return holder
+
+
 @runtime_checkable
 class DocumentProcessor(Protocol):
     """
@@ -47,9 +234,9 @@ class DocumentProcessor(Protocol):
     """
 
     @abstractmethod
-    def __init__(self, path: Path, logger: logging.Logger) -> None:
+    def __init__(self, path: Path, logger: logging.Logger, config: ProcessingConfig | None = None) -> None:
         """
-        Initialize the processor with the given path and logger.
+        Initialize the processor with the given path, logger and run options.
         """
 
     @abstractmethod
@@ -67,31 +254,197 @@ class DocumentProcessor(Protocol):
         return [""]
 
 
-class PNGProcessor(DocumentProcessor):
+@dataclass(frozen=True)
+class ImageResult:
     """
-    Interface for a document processor.
-    TODO: Should this be a path or a string?
+    The text, confidence and metadata produced for an image file.
+
+    Attributes:
+    text (str): The OCR'd text.
+    confidence (float | None): Mean confidence of the OCR engine from 0 to 100, None when it is not known.
+    metadata (dict[str, Any]): The file and image properties: path, format, mode, width, height and bytes.
+    """
+
+    text: str
+    confidence: float | None = None
+    metadata: dict[str, Any] = field(default_factory=dict)
+
+
+class ImageProcessor(DocumentProcessor):
+    """
+    Processor for files holding a single image.
+    The image is read and OCR'd once, the first time `result` is used; process, metadata and
+    every later read of result share that work. The file is mapped into memory rather than read, and PIL decodes it
+    and the OCR cache hashes it straight from the map.
+    Subclasses name the kind of image, which is used for the metrics stage, and may prepare the image for OCR.
     """
 
-    def __init__(self, path: Path, logger: logging.Logger) -> None:
+    kind: str = "image"
+
+    def __init__(self, path: Path, logger: logging.Logger, config: ProcessingConfig | None = None) -> None:
         """
-        Initialize the processor with the given path and logger.
+        Initialize the processor with the given path, logger and run options.
         """
         self.path: Path = path
         self.logger = logger
-        self.logger.info(f"Processing PDF: {path}")
+        self.config = config or ProcessingConfig()
+        self.logger.info(f"Processing {self.kind.upper()}: {path}")
 
-    def ocr(self, image: Any) -> str:
+    def ocr(self, image: Any, data: bytes | None = None) -> str:
         """
         Perform OCR on an image.
+        data is the encoded image, used to look the result up in the OCR cache.
+        """
+        return image_to_string(image, data, self.config)
+
+    def prepare(self, image: Image.Image) -> Image.Image:
+        """
+        The image as it should be OCR'd.
+        """
+        return image
+
+    @cached_property
+    def result(self) -> ImageResult:
+        """
+        The OCR result for the image, computed on first use.
+        """
+        with METRICS.stage(f"{self.kind}_process", pages=1) as stage:
+            with MappedFile(self.path) as mapped:
+                stage.add(bytes=len(mapped))
+                with Image.open(mapped.stream) as image:
+                    metadata = {
+                        "file": str(self.path),
+                        "format": image.format,
+                        "mode": image.mode,
+                        "width": image.width,
+                        "height": image.height,
+                        "bytes": len(mapped),
+                    }
+                    text, confidence = image_to_text(self.prepare(image), mapped.view, self.config)
+        return ImageResult(text=text, confidence=confidence, metadata=metadata)
+
+    @property
+    def metadata(self) -> dict[str, Any]:
+        """
+        The file and image properties, as for PDFProcessor.metadata.
         """
-        return pytesseract.image_to_string(image)
+        return self.result.metadata
+
+    @cached_property
+    def record(self) -> DocumentRecord:
+        """
+        The OCR result for the image as a document of one page holding the image.
+        """
+        result = self.result
+        return DocumentRecord.from_image(self.path, self.kind, result.text, result.confidence, result.metadata)
 
     def process(self) -> list[str]:
         """
         Process a document and return the extracted text.
         """
-        return [self.ocr(Image.open(str(self.path)))]
+        return [self.result.text]
+
+
+class PNGProcessor(ImageProcessor):
+    """
+    Processor for PNG images.
+    """
+
+    kind = "png"
+
+
+class JPEGProcessor(ImageProcessor):
+    """
+    Processor for JPEG images, such as photographs of clippings.
+    Photographs are turned upright by their EXIF orientation before they are OCR'd.
+    """
+
+    kind = "jpeg"
+
+    def prepare(self, image: Image.Image) -> Image.Image:
+        return ImageOps.exif_transpose(image)
+
+
+class TIFFProcessor(DocumentProcessor):
+    """
+    Processor for TIFF scans, which often hold every page of a recorded document.
+
+    Pages are decoded one at a time as they are reached, never the whole file up front, and each is OCR'd with the
+    run's OCR backend and cache. The result has the same structure as a PDF's, each page recorded as a PageRecord
+    with its text in a single image, so every writer handles scans and PDFs alike.
+    """
+
+    kind: str = "tiff"
+
+    def __init__(self, path: Path, logger: logging.Logger, config: ProcessingConfig | None = None) -> None:
+        self.path: Path = path
+        self.logger = logger
+        self.config = config or ProcessingConfig()
+        self.logger.info(f"Processing TIFF: {path}")
+        self.metadata: dict[str, Any] = {}
+
+    def ocr(self, image: Any, data: bytes | None = None) -> str:
+        """
+        Perform OCR on an image.
+        """
+        return image_to_string(image, data, self.config)
+
+    def collect_tiff_page(self, page_number: int, image: Image.Image) -> PageRecord:
+        """
+        Decode and OCR the page image is positioned at.
+        A page that cannot be decoded is recorded with its error and no images.
+        """
+        start = time.perf_counter()
+        page_record = PageRecord(page=page_number, strategy="ocr", raster="tiff")
+        with METRICS.stage("tiff_page", pages=1) as stage:
+            try:
+                image.seek(page_number)
+                image.load()
+                data = None
+                if get_cache(self.config) is not None:
+                    # The decoded page is the cache key, TIFF pages are not stored as separate encoded images.
+                    data = f"tiff:{image.mode}:{image.width}x{image.height}:".encode("utf-8") + image.tobytes()
+                text, confidence = image_to_text(image, data, self.config)
+                page_record.images.append(
+                    ImageRecord(format="TIFF", text=text, confidence=confidence, width=image.width, height=image.height)
+                )
+            except (OSError, ValueError, EOFError) as e:
+                error_message = f"Unable to decode page {page_number} of {self.path}: {e}"
+                self.logger.warning(PDFPageError(error_message, self.path))
+                page_record.errors.append(ErrorRecord(error_message, type(e).__name__))
+                stage.add(errors=1)
+        page_record.timings = {"total": round(time.perf_counter() - start, 6)}
+        return page_record
+
+    def iter_tiff_pages(self) -> Iterator[PageRecord]:
+        """
+        Yield the record of each page in turn.
+        """
+        with Image.open(self.path) as image:
+            page_count = getattr(image, "n_frames", 1)
+            self.metadata.update(format=image.format, pages=page_count, bytes=self.path.stat().st_size)
+            self.metadata["page_strategies"] = {"ocr": page_count}
+            for page_number in range(page_count):
+                yield self.collect_tiff_page(page_number, image)
+
+    def document_record(self, pages: list[PageRecord] | None = None) -> DocumentRecord:
+        """
+        The scan as a DocumentRecord, with self.metadata as its properties.
+        """
+        return DocumentRecord(path=str(self.path), kind=self.kind, pages=pages or [], properties=dict(self.metadata))
+
+    def process(self) -> DocumentRecord:
+        """
+        OCR every page and return the document record.
+        """
+        return self.document_record(list(self.iter_tiff_pages()))
+
+    def stream(self) -> Iterator[PageRecord]:
+        """
+        Process the scan one page at a time, yielding each page's record as soon as it is ready.
+        self.metadata is complete once the stream is exhausted.
+        """
+        yield from self.iter_tiff_pages()
 
 
 class PDFProcessor(DocumentProcessor):
@@ -105,57 +458,77 @@ class PDFProcessor(DocumentProcessor):
 
     """
 
-    def __init__(self, path: Path, logger: logging.Logger) -> None:
+    kind: str = "pdf"
+
+    def __init__(self, path: Path, logger: logging.Logger, config: ProcessingConfig | None = None) -> None:
         self.path: Path = path
         self.logger = logger
+        self.config = config or ProcessingConfig()
         self.logger.info(f"Processing PDF: {path}")
-        self.metadata = {}
+        self.metadata: dict[str, Any] = {}
+        self.session: PDFSession | None = None
+        # OCR records of the images seen so far in the document, by content hash.
+        self.image_refs: dict[str, ImageRecord] = {}
 
-    def ocr(self, image: ImageFile) -> dict[str, str]:
+    def ocr(self, image: ImageFile) -> ImageRecord:
         """
         Perform OCR on an image.
-        Save the text to the medatadata.
         # image_data pypdf is having issues with the new ccrs.  fitz may be the solution.
+        The raster pypdf decoded the image into is OCR'd as it is; image.data is a re-encode of it and is not decoded.
         """
-        image_data = Image.open(io.BytesIO(initial_bytes=image.data))
         # searchable_text: str = parser.from_file(str(self.path))
-        doc = fitz.open(self.path)
-        self.metadata["pdf_metadata"] = doc.metadata
-        # for page in doc:
-        #     text = page.get_text().encode("utf8")
-        text_data = [page.get_text().encode('utf-8') for page in doc]
-        self.metadata["searchable_text"] = '\n'.join()
-        image_text = pytesseract.image_to_string(image_data)
+        image_text = image_to_string(image.image, encoded_image_bytes(image), self.config)
         # self.metadata[image.name] = {'format': image.image.format, 'text': image_text}
         # return pytesseract.image_to_string(image_data)
 
         # Return the image data
-        return {"format": image.image.format, "text": image_text}
+        return ImageRecord(format=image.image.format, text=image_text)
 
-    def collect_pdf_images(self, page: PageObject) -> list[dict[str, Any]]:
+    def collect_pdf_images(self, page: PageObject, errors: list[ErrorRecord]) -> list[ImageRecord]:
         """
         Get image from self.image_data.data
+        Errors are appended to errors.
+
+        Each image is identified by the hash of its stream as stored in the PDF, before it is decoded. An image
+        already seen in the document, under the same xref or another, is not decoded or OCR'd again: the page
+        records a copy of the first occurrence's result, marked duplicate. Identical images in other
+        documents are caught by the OCR cache.
         """
-        image_data: list[str] = []
+        image_data: list[ImageRecord] = []
+        stage = METRICS.stage("pdf_images")
         try:
-            for image in page.images:
-                # self.metadata[image.name] = {'format': image.image.format_description}
-                image_data.append(self.ocr(image))
+            with stage:
+                for image_id in page.images.keys():
+                    stream = image_stream(page, image_id)
+                    key = None if stream is None else bytes_sha256(stream_image_bytes(stream))
+                    if key in self.image_refs:
+                        image_data.append(replace(self.image_refs[key], duplicate=True))
+                        stage.add(duplicates=1)
+                        continue
+                    # self.metadata[image.name] = {'format': image.image.format_description}
+                    record = self.ocr(page.images[image_id])
+                    if key is not None:
+                        reference = stream.indirect_reference
+                        record.sha256 = key
+                        record.xref = None if reference is None else reference.idnum
+                        self.image_refs[key] = record
+                    image_data.append(record)
+                    stage.add(images=1)
         except NotImplementedError as e:
             error_message = f"Not implemented error on pages in pdf {self.path}: {e}"
             custom_exception = PDFPageError(error_message, self.path)
             self.logger.warning(custom_exception)
-            image_data.append(error_message)
+            errors.append(ErrorRecord(error_message, type(e).__name__))
         except UnidentifiedImageError as e:
             error_message = f"UnidentifiedImageError error on pages in pdf {self.path}: {e}"
             custom_exception = PDFPageError(error_message, self.path)
             self.logger.warning(custom_exception)
-            image_data.append(error_message)
+            errors.append(ErrorRecord(error_message, type(e).__name__))
         except struct.error as e:
             error_message = f"Unable to extract page_image due to a struct error {self.path}: {e}"
             custom_exception = PDFPageError(error_message, self.path)
             self.logger.error(custom_exception)
-            image_data.append(error_message)
+            errors.append(ErrorRecord(error_message, "struct.error"))
         # collect all of the imagedata into metadtata for the page.
 
         # TODO: This should be implemented as a list of dicts.
@@ -165,38 +538,220 @@ class PDFProcessor(DocumentProcessor):
 
         return image_data
 
-    def collect_pdf_pages(self, pdf: PdfReader) -> list[str]:
+    def render_pdf_page(self, page_number: int, errors: list[ErrorRecord]) -> list[ImageRecord]:
         """
-        Collects pages from the pdf document.
+        Render the page once with PyMuPDF at the configured DPI and colorspace and OCR the raster.
+        The raster is handed to OCR as it is, with no intermediate image encode. Errors are appended to errors.
+        """
+        config = self.config
+        try:
+            with METRICS.stage("pdf_render", pages=1):
+                image = self.session.render_page(page_number, config.render_dpi, config.render_colorspace)
+        except RENDER_ERRORS as e:
+            error_message = f"Unable to render page {page_number} of {self.path}: {e}"
+            self.logger.warning(PDFPageError(error_message, self.path))
+            errors.append(ErrorRecord(error_message, type(e).__name__))
+            return []
+        with image:
+            data = None
+            if get_cache(config) is not None:
+                # The cache key is the raster itself, so identical pages rendered the same way share a result.
+                data = f"render:{config.render_dpi}:{config.render_colorspace}:".encode("utf-8") + image.tobytes()
+            text = image_to_string(image, data, config)
+        return [ImageRecord(format=RENDER, text=text, dpi=config.render_dpi)]
+
+    def rasterise_pdf_page(
+        self, page_number: int, page: PageObject, errors: list[ErrorRecord]
+    ) -> tuple[str, list[ImageRecord]]:
+        """
+        OCR the page with the configured raster path, falling back to the other one when it yields nothing.
+        Returns the path used and the OCR'd images.
+        """
+        order = [RENDER, IMAGES] if self.config.page_raster == RENDER else [IMAGES, RENDER]
+        for raster in order:
+            first_error = len(errors)
+            if raster == RENDER:
+                images = self.render_pdf_page(page_number, errors)
+            else:
+                images = self.collect_pdf_images(page, errors)
+            if images or len(errors) == first_error:
+                return raster, images
+            self.logger.info(f"Page {page_number} of {self.path} failed with {raster}, trying the other raster path")
+        return raster, images
+
+    def collect_pdf_page(self, page_number: int, page: PageObject) -> PageRecord:
+        """
+        Classify, extract and OCR a single page.
 
+        Pages with a good text layer use it directly and only go through OCR when their
+        images cover enough of the page to matter. The decision is recorded on the page under "strategy".
+        The page's decoded images are released before returning.
+        """
+        start = time.perf_counter()
+        with METRICS.stage("pdf_text", pages=1):
+            page_text = self.session.page_text(page_number)
+            decision = classify_page(self.session.document[page_number], page_text, self.config)
+        page_record = PageRecord(
+            page=page_number, text=page_text if decision.extract_text else "", **decision.as_dict()
+        )
+
+        ocr_start = time.perf_counter()
+        # TODO: This is returning empty lists in some cases, deal with it here.
+        # should record something.
+        if decision.ocr:
+            page_record.raster, page_record.images = self.rasterise_pdf_page(page_number, page, page_record.errors)
+        end = time.perf_counter()
+        page_record.timings = {
+            "extract": round(ocr_start - start, 6),
+            "ocr": round(end - ocr_start, 6),
+            "total": round(end - start, 6),
+        }
+
+        self.session.release_page(page_number, page)
+        self.metadata["page_strategies"][decision.strategy] = (
+            self.metadata["page_strategies"].get(decision.strategy, 0) + 1
+        )
+        return page_record
+
+    def iter_pdf_pages(self, pdf: PdfReader | None = None) -> Iterator[PageRecord]:
+        """
+        Yield the record of each page in turn.
+        Defaults to the reader held by the current session.
+        Large documents are handed to page workers when the run has them.
+        """
+        if pdf is None:
+            pdf = self.session.reader
+        self.metadata["page_strategies"] = {}
+        self.image_refs = {}
+        page_count = len(pdf.pages)
+        if self.config.page_workers > 1 and page_count >= self.config.page_parallel_min_pages:
+            yield from self.iter_parallel_pages(page_count)
+        else:
+            for page_number, page in enumerate(pdf.pages):
+                yield self.collect_pdf_page(page_number, page)
+        self.logger.info(f"Page strategies for {self.path}: {self.metadata['page_strategies']}")
+
+    def iter_parallel_pages(self, page_count: int) -> Iterator[PageRecord]:
+        """
+        Yield the record of each page in turn, processing the pages in ranges on config.page_workers processes.
+        Images repeated across ranges are OCR'd once per range rather than once per document; the OCR cache, when
+        enabled, still serves the repeats.
+        The page workers are started from a fork server rather than forked from this process, which may be running
+        writer threads that a fork would copy mid-operation. When processing stops early, the page workers are
+        terminated rather than waited for.
         """
-        print(self.metadata)
-        page_data = []
-        for page in pdf.pages:
-            # TODO: This is returning empty lists in some cases, deal with it here.
-            # should record something.
-            page_data.append(self.collect_pdf_images(page))
+        ranges = page_ranges(page_count, self.config.page_workers * RANGES_PER_WORKER)
+        self.logger.info(f"Processing {page_count} pages of {self.path} in {len(ranges)} ranges")
+        pool = ProcessPoolExecutor(
+            max_workers=min(self.config.page_workers, len(ranges)),
+            mp_context=multiprocessing.get_context(PAGE_WORKER_START_METHOD),
+        )
+        try:
+            futures = [pool.submit(process_page_range, self.path, pages, self.config) for pages in ranges]
+            for future in futures:
+                result = future.result()
+                strategies = self.metadata["page_strategies"]
+                for strategy, count in result["page_strategies"].items():
+                    strategies[strategy] = strategies.get(strategy, 0) + count
+                for document in result["metrics"]:
+                    METRICS.add_stages(document["stages"])
+                yield from result["pages"]
+        except BaseException:
+            # A document timeout, or a stream abandoned part way, must not wait for the ranges still being processed.
+            processes = list((pool._processes or {}).values())  # pylint: disable=protected-access
+            pool.shutdown(wait=False, cancel_futures=True)
+            for process in processes:
+                process.terminate()
+            raise
+        pool.shutdown()
+
+    def collect_pdf_pages(self, pdf: PdfReader | None = None) -> list[PageRecord]:
+        """
+        Collects pages from the pdf document.
+        Defaults to the reader held by the current session.
+        """
+        return list(self.iter_pdf_pages(pdf))
 
-        self.metadata["pdf_pages"] = page_data
-        return self.metadata["pdf_pages"]
+    def document_record(self, pages: list[PageRecord] | None = None) -> DocumentRecord:
+        """
+        The document as a DocumentRecord, with self.metadata as its properties.
+        """
+        return DocumentRecord(path=str(self.path), kind=self.kind, pages=pages or [], properties=dict(self.metadata))
 
-    def process(self) -> dict[str, Any]:
+    def process(self) -> DocumentRecord:
         """
         PDFProcessor process method
         1. Collects pages from the pdf document.
         1. Collects images from each page.
         1. OCR's the images.
-        1. Returns the OCR'd text for each page.
+        1. Returns the document record, holding the OCR'd text for each page.
+        The text layer is kept on the pages that use it, not repeated in the properties; see DocumentRecord.text.
 
         ## TODO!!! Get the text extract going here
         ## look at textacy
         ## Text classifier using nlp
 
-        # TODO: How do i know if this is a searchable doc?
+        Searchable pages are detected per page by `classify_page` and skip OCR.
+        """
+        with PDFSession(self.path, self.logger) as session:
+            self.session = session
+            with METRICS.stage("pdf_parse", bytes=self.path.stat().st_size):
+                self.metadata["pdf_file_metadata"] = session.file_metadata
+                self.metadata["pdf_metadata"] = session.metadata
+            pages = self.collect_pdf_pages(session.reader)
+        self.session = None
+
+        return self.document_record(pages)
+
+    def stream(self) -> Iterator[PageRecord]:
+        """
+        Process the document one page at a time, yielding each page's record as soon as it is ready.
+
+        Nothing is kept between pages, so memory stays flat however long the document is.
+        self.metadata holds the document level metadata, without the pages; it is complete once the stream is
+        exhausted.
         """
-        pdf_file = PdfReader(stream=self.path)
-        self.metadata["path"] = str(self.path)
-        self.metadata["pdf_file_metadata"] = pdf_file.metadata
-        self.collect_pdf_pages(pdf_file)
+        with PDFSession(self.path, self.logger) as session:
+            self.session = session
+            with METRICS.stage("pdf_parse", bytes=self.path.stat().st_size):
+                self.metadata["pdf_file_metadata"] = session.file_metadata
+                self.metadata["pdf_metadata"] = session.metadata
+            yield from self.iter_pdf_pages(session.reader)
+        self.session = None
+
 
-        return self.metadata
+def page_ranges(page_count: int, parts: int) -> list[range]:
+    """
+    Split page_count pages into at most parts contiguous ranges of near equal length, in page order.
+    """
+    parts = max(min(parts, page_count), 1)
+    size, extra = divmod(page_count, parts)
+    ranges: list[range] = []
+    start = 0
+    for part in range(parts):
+        end = start + size + (1 if part < extra else 0)
+        ranges.append(range(start, end))
+        start = end
+    return ranges
+
+
+def process_page_range(path: Path, pages: range, config: ProcessingConfig) -> dict[str, Any]:
+    """
+    Process the given pages of the PDF at path with handles of this process's own.
+    Returns the page records, the count of each page strategy used and the stage metrics recorded.
+    Runs inside a page worker process.
+    """
+    logger = logging.getLogger(__name__)
+    METRICS.reset()
+    METRICS.enabled = bool(config.metrics_path)
+    processor = PDFProcessor(path, logger, config)
+    processor.metadata["page_strategies"] = {}
+    with METRICS.document(path), PDFSession(path, logger) as session:
+        processor.session = session
+        reader = session.reader
+        records = [processor.collect_pdf_page(page_number, reader.pages[page_number]) for page_number in pages]
+    return {
+        "pages": records,
+        "page_strategies": processor.metadata["page_strategies"],
+        "metrics": METRICS.pop_documents(),
+    }
@@ -0,0 +1,133 @@
+"""
+registry.py
+-----------
+
+The file types the pipeline can process, how each is recognised and the processor that handles it.
+
+A file's type is decided by its first bytes rather than its name, so a plat saved as `.pdf.bak`, a scan named `.jpg`
+that is really a TIFF, or an archive dump of files with no suffix at all all reach the right processor. `sniff`
+matches the header of a file against the signatures of every registered `FileType`, in registration order.
+
+Processors are named as "module:Class" and imported the first time a file of their type is processed, so the
+registry costs nothing at startup. Further types are added with `register`:
+
+    register(FileType("bmp", "mypackage.processors:BMPProcessor", signatures=(b"BM",), suffixes=(".bmp",)))
+
+Paged types (PDF, TIFF) return a `DocumentRecord` holding their pages from `process` and support `stream`, which
+yields a `PageRecord` per page; the others hold a `DocumentRecord` of one page in `record`. See
+documentanalysis.processors and documentanalysis.results.
+
+Classes:
+    FileType: A file type, its signatures and its processor.
+
+Functions:
+    register: Add a file type, or replace the one with the same name.
+    sniff: The file type of a file, from its header.
+    suffixes: The usual suffixes of every registered type.
+"""
+
+import importlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+# Bytes read from the start of a file to recognise it.
+HEADER_BYTES: int = 1024
+
+
+@dataclass(frozen=True)
+class FileType:
+    """
+    A file type, how to recognise it and the processor that handles it.
+
+    Attributes:
+    name (str): Name of the type.
+    processor (str): The processor class, as "module:Class".
+    signatures (tuple[bytes, ...]): Headers files of the type start with.
+    suffixes (tuple[str, ...]): Usual suffixes of the type, lower case, for display and discovery hints.
+    paged (bool): Whether the processor produces pages and can stream them.
+    search (int): When set, a signature may start anywhere in the first search bytes rather than at the start.
+    """
+
+    name: str
+    processor: str
+    signatures: tuple[bytes, ...]
+    suffixes: tuple[str, ...] = ()
+    paged: bool = False
+    search: int = 0
+
+    def matches(self, header: bytes) -> bool:
+        """
+        True when header, the first bytes of a file, carries one of the type's signatures.
+        """
+        if self.search:
+            return any(signature in header[: self.search] for signature in self.signatures)
+        return header.startswith(self.signatures)
+
+    def load(self) -> Any:
+        """
+        The processor class, imported on first use.
+        """
+        module, _, name = self.processor.partition(":")
+        return getattr(importlib.import_module(module), name)
+
+
+FILE_TYPES: dict[str, FileType] = {}
+
+
+def register(file_type: FileType) -> FileType:
+    """
+    Add file_type to the registry, replacing any type of the same name.
+    """
+    FILE_TYPES[file_type.name] = file_type
+    return file_type
+
+
+PDF = register(
+    FileType(
+        "pdf",
+        "documentanalysis.processors:PDFProcessor",
+        signatures=(b"%PDF-",),
+        suffixes=(".pdf",),
+        paged=True,
+        # Readers accept the header anywhere in the first kilobyte, after junk some scanners write.
+        search=HEADER_BYTES,
+    )
+)
+PNG = register(
+    FileType("png", "documentanalysis.processors:PNGProcessor", signatures=(b"\x89PNG\r\n\x1a\n",), suffixes=(".png",))
+)
+TIFF = register(
+    FileType(
+        "tiff",
+        "documentanalysis.processors:TIFFProcessor",
+        # Little and big endian, classic and BigTIFF.
+        signatures=(b"II*\x00", b"MM\x00*", b"II+\x00", b"MM\x00+"),
+        suffixes=(".tif", ".tiff"),
+        paged=True,
+    )
+)
+JPEG = register(
+    FileType(
+        "jpeg", "documentanalysis.processors:JPEGProcessor", signatures=(b"\xff\xd8\xff",), suffixes=(".jpg", ".jpeg")
+    )
+)
+
+
+def sniff(path: Path | str) -> FileType | None:
+    """
+    The registered type whose signature the file at path starts with, None when it matches none.
+    """
+    with open(path, "rb") as file:
+        header = file.read(HEADER_BYTES)
+    for file_type in FILE_TYPES.values():
+        if file_type.matches(header):
+            return file_type
+    return None
+
+
+def suffixes() -> tuple[str, ...]:
+    """
+    The usual suffixes of every registered type.
+    """
+    return tuple(suffix for file_type in FILE_TYPES.values() for suffix in file_type.suffixes)
@@ -0,0 +1,403 @@
+"""
+results.py
+----------
+
+The typed result model every writer is handed, and its serialization.
+
+The processors build these records as they go: slotted dataclasses for the document, its pages, their images and
+their errors, holding only plain values and stamped with SCHEMA_VERSION. `PDFProcessor.process` and
+`TIFFProcessor.process` return a `DocumentRecord`, their `stream` yields a `PageRecord` per page, and
+`ImageProcessor.record` is a `DocumentRecord` of one page holding the image. documentanalysis.ocr.Document hands the
+records to the writers as they are, and each writer serializes them as it needs.
+
+`DocumentRecord.as_dict` is the dict form for writers that store dicts. It keeps the layout writers already read, the
+document properties at the top level and the pages under "pdf_pages", so every writer sees the same structure for
+PDFs, TIFF scans and single images alike:
+
+    {"schema_version": 2, "kind": "pdf", "path": "plat.pdf", "pdf_metadata": {...}, ...,
+     "pdf_pages": [{"page": 0, "strategy": "ocr", "text": "", "images": [{"format": "TIFF", "text": "..."}],
+                    "errors": [{"message": "...", "error_type": "struct.error"}], ...}]}
+
+The text of a document is stored once, on its pages and images; `DocumentRecord.text` joins it back up. Page dicts
+from processors outside this package are read with `PageRecord.from_dict` and `DocumentRecord.from_metadata`.
+
+Fields that are not set are left out of the dicts, so a page rendered by PyMuPDF has no sha256 and an image without
+a confidence has no confidence key. SCHEMA_VERSION is raised whenever a field is renamed or changes meaning.
+
+`dumps` and `packb` serialize records or their dicts. `dumps` writes compact JSON with orjson when it is installed
+and the standard library otherwise; `packb` writes MessagePack and needs msgpack. Values neither knows are written as
+their str.
+
+Classes:
+    ErrorRecord: An error met while processing part of a document.
+    ImageRecord: The OCR result of one image.
+    PageRecord: One page and the images OCR'd on it.
+    DocumentRecord: A processed document.
+
+Functions:
+    plain: A value with library objects turned into plain JSON types.
+    as_plain: A record as its dict, anything else as it is.
+    dumps: A record or dict as compact JSON bytes.
+    loads: JSON bytes back into dicts.
+    packb: A record or dict as MessagePack bytes.
+    unpackb: MessagePack bytes back into dicts.
+"""
+
+import json
+from dataclasses import dataclass, field, fields
+from pathlib import Path
+from typing import Any
+
+SCHEMA_VERSION: int = 2
+
+# Page dict keys read into PageRecord fields. Anything else on a page is kept in PageRecord.extra.
+PAGE_FIELDS: tuple[str, ...] = (
+    "page", "strategy", "text", "raster", "text_chars", "text_density", "image_coverage", "image_count", "timings"
+)
+
+
+def plain(value: Any) -> Any:
+    """
+    value with library objects turned into plain JSON types: dicts with str keys, lists, str, int, float, bool and
+    None. pypdf's strings, numbers, arrays and dictionaries become their plain equivalents and indirect references
+    are resolved, so call this while the document is still open. Bytes become hex and anything else its str.
+    """
+    if value is None or isinstance(value, bool):
+        return value
+    if isinstance(value, int):
+        return int(value)
+    if isinstance(value, float):
+        return float(value)
+    if isinstance(value, str):
+        return str(value)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value).hex()
+    if isinstance(value, dict):
+        return {str(key): plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return [plain(item) for item in value]
+    if hasattr(value, "get_object"):
+        resolved = value.get_object()
+        return str(value) if resolved is value else plain(resolved)
+    return str(value)
+
+
+def _set_fields(record: Any) -> dict[str, Any]:
+    """
+    The fields of record that hold a value, left out when they are None, False or empty.
+    """
+    values = {}
+    for record_field in fields(record):
+        value = getattr(record, record_field.name)
+        if value is None or value is False or value == {}:
+            continue
+        values[record_field.name] = value
+    return values
+
+
+@dataclass(slots=True)
+class ErrorRecord:
+    """
+    An error met while processing part of a document.
+
+    Attributes:
+    message (str): What went wrong, as logged.
+    error_type (str | None): Class name of the exception, when known.
+    """
+
+    message: str
+    error_type: str | None = None
+
+    @classmethod
+    def from_value(cls, value: Any) -> "ErrorRecord":
+        """
+        An error from a page's errors list: a message string or a dict of the fields.
+        """
+        if isinstance(value, dict):
+            return cls(message=str(value.get("message", "")), error_type=value.get("error_type"))
+        return cls(message=str(value))
+
+    def as_dict(self) -> dict[str, Any]:
+        """
+        The error as a plain dict.
+        """
+        return _set_fields(self)
+
+
+@dataclass(slots=True)
+class ImageRecord:
+    """
+    The OCR result of one image, or of a page rendered as one image.
+
+    Attributes:
+    format (str | None): The image format, or the raster path ("render") for rendered pages.
+    text (str): The OCR'd text.
+    confidence (float | None): Mean confidence of the OCR engine from 0 to 100, None when it is not known.
+    width (int | None): Width in pixels, when known.
+    height (int | None): Height in pixels, when known.
+    dpi (int | None): Resolution of a rendered page.
+    sha256 (str | None): Hash of the image as stored in the PDF, used to recognise repeats.
+    xref (int | None): PDF object number of the image.
+    duplicate (bool): True when the image repeats one seen earlier in the document and reuses its result.
+    """
+
+    format: str | None = None
+    text: str = ""
+    confidence: float | None = None
+    width: int | None = None
+    height: int | None = None
+    dpi: int | None = None
+    sha256: str | None = None
+    xref: int | None = None
+    duplicate: bool = False
+
+    @classmethod
+    def from_dict(cls, image: dict[str, Any]) -> "ImageRecord":
+        """
+        An image from an image dict built by a processor.
+        """
+        return cls(
+            format=plain(image.get("format")),
+            text=image.get("text") or "",
+            confidence=plain(image.get("confidence")),
+            width=image.get("width"),
+            height=image.get("height"),
+            dpi=image.get("dpi"),
+            sha256=image.get("sha256"),
+            xref=image.get("xref"),
+            duplicate=bool(image.get("duplicate", False)),
+        )
+
+    def as_dict(self) -> dict[str, Any]:
+        """
+        The image as a plain dict. format and text are always present.
+        """
+        return {"format": self.format, "text": self.text, **_set_fields(self)}
+
+
+@dataclass(slots=True)
+class PageRecord:
+    """
+    One page of a document and the images OCR'd on it.
+
+    Attributes:
+    page (int): Page number, from 0.
+    strategy (str | None): How the page was read, see documentanalysis.classify.
+    text (str): The page's text layer, when it was used.
+    raster (str | None): The raster path OCR used, "images", "render" or the image kind for scans.
+    images (list[ImageRecord]): The OCR result of each image.
+    errors (list[ErrorRecord]): Errors met on the page.
+    text_chars (int | None): Non whitespace characters in the text layer.
+    text_density (float | None): text_chars per square inch of page.
+    image_coverage (float | None): Fraction of the page covered by images.
+    image_count (int | None): Number of images drawn on the page.
+    timings (dict[str, float]): Seconds spent on each step of the page.
+    extra (dict[str, Any]): Any other plain values a processor recorded on the page.
+    """
+
+    page: int
+    strategy: str | None = None
+    text: str = ""
+    raster: str | None = None
+    images: list[ImageRecord] = field(default_factory=list)
+    errors: list[ErrorRecord] = field(default_factory=list)
+    text_chars: int | None = None
+    text_density: float | None = None
+    image_coverage: float | None = None
+    image_count: int | None = None
+    timings: dict[str, float] = field(default_factory=dict)
+    extra: dict[str, Any] = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, page: dict[str, Any]) -> "PageRecord":
+        """
+        A page from a page dict built by a processor.
+        Error strings recorded among the images are moved to the errors.
+        """
+        images: list[ImageRecord] = []
+        errors = [ErrorRecord.from_value(error) for error in page.get("errors", [])]
+        for image in page.get("images", []):
+            if isinstance(image, dict):
+                images.append(ImageRecord.from_dict(image))
+            else:
+                errors.append(ErrorRecord.from_value(image))
+        return cls(
+            page=int(page.get("page", 0)),
+            strategy=page.get("strategy"),
+            text=page.get("text") or "",
+            raster=page.get("raster"),
+            images=images,
+            errors=errors,
+            text_chars=page.get("text_chars"),
+            text_density=page.get("text_density"),
+            image_coverage=page.get("image_coverage"),
+            image_count=page.get("image_count"),
+            timings=dict(page.get("timings", {})),
+            extra=plain({key: value for key, value in page.items() if key not in (*PAGE_FIELDS, "images", "errors")}),
+        )
+
+    @property
+    def search_text(self) -> str:
+        """
+        Everything readable on the page: its text layer followed by the text of its images.
+        """
+        return "\n".join(text for text in [self.text, *(image.text for image in self.images)] if text)
+
+    def as_dict(self) -> dict[str, Any]:
+        """
+        The page as a plain dict. page, text, images and errors are always present.
+        """
+        values = _set_fields(self)
+        extra = values.pop("extra", {})
+        return {
+            **values,
+            "page": self.page,
+            "text": self.text,
+            "images": [image.as_dict() for image in self.images],
+            "errors": [error.as_dict() for error in self.errors],
+            **extra,
+        }
+
+
+@dataclass(slots=True)
+class DocumentRecord:
+    """
+    A processed document.
+
+    Attributes:
+    path (str): The file the document was read from.
+    kind (str): The file type, see documentanalysis.registry.
+    pages (list[PageRecord]): The pages, in order. Single images are one page holding the image.
+    properties (dict[str, Any]): Document level metadata as plain values, such as pdf_metadata, the image format
+        and size, or page_strategies.
+    schema_version (int): SCHEMA_VERSION when the record was built.
+    """
+
+    path: str
+    kind: str
+    pages: list[PageRecord] = field(default_factory=list)
+    properties: dict[str, Any] = field(default_factory=dict)
+    schema_version: int = SCHEMA_VERSION
+
+    @classmethod
+    def from_metadata(
+        cls, path: Path | str, kind: str, metadata: dict[str, Any], pages: list[PageRecord] | None = None
+    ) -> "DocumentRecord":
+        """
+        A document from the metadata dict of a paged processor.
+        Without pages, the page dicts under "pdf_pages" are read, if it has any.
+        """
+        if pages is None:
+            pages = [PageRecord.from_dict(page) for page in metadata.get("pdf_pages", [])]
+        return cls(
+            path=str(metadata.get("path") or path),
+            kind=kind,
+            pages=pages,
+            properties=plain({key: value for key, value in metadata.items() if key not in ("path", "pdf_pages")}),
+        )
+
+    @classmethod
+    def from_image(
+        cls, path: Path | str, kind: str, text: str, confidence: float | None, metadata: dict[str, Any]
+    ) -> "DocumentRecord":
+        """
+        A single image document from its OCR'd text, confidence and image metadata.
+        The text and confidence are kept on the image only.
+        """
+        properties = plain(metadata)
+        image = ImageRecord(
+            format=properties.get("format"),
+            text=text,
+            confidence=confidence,
+            width=properties.get("width"),
+            height=properties.get("height"),
+        )
+        return cls(
+            path=str(path),
+            kind=kind,
+            pages=[PageRecord(page=0, strategy="ocr", raster=kind, images=[image])],
+            properties=properties,
+        )
+
+    @property
+    def text(self) -> str:
+        """
+        The readable text of every page, in order.
+        """
+        return "\n".join(page.search_text for page in self.pages)
+
+    def as_dict(self) -> dict[str, Any]:
+        """
+        The document as a plain dict for the writers, with its properties at the top level and its pages under
+        "pdf_pages".
+        """
+        return {
+            "schema_version": self.schema_version,
+            "kind": self.kind,
+            "path": self.path,
+            **self.properties,
+            "pdf_pages": [page.as_dict() for page in self.pages],
+        }
+
+
+def _orjson() -> Any:
+    """
+    The orjson module, or None when it is not installed.
+    """
+    try:
+        import orjson  # pylint: disable=import-outside-toplevel,import-error
+    except ImportError:
+        return None
+    return orjson
+
+
+def _msgpack() -> Any:
+    """
+    The msgpack module, imported when a record is first packed or unpacked.
+    """
+    try:
+        import msgpack  # pylint: disable=import-outside-toplevel,import-error
+    except ImportError as e:
+        raise ImportError("MessagePack serialization needs the msgpack package: pip install msgpack") from e
+    return msgpack
+
+
+def as_plain(obj: Any) -> Any:
+    """
+    obj as a dict when it is a record, anything else as it is.
+    """
+    return obj.as_dict() if hasattr(obj, "as_dict") else obj
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    A record or dict as compact UTF-8 JSON, with orjson when it is installed.
+    """
+    orjson = _orjson()
+    if orjson is not None:
+        return orjson.dumps(as_plain(obj), default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(as_plain(obj), default=str, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data: bytes | str) -> Any:
+    """
+    JSON written by dumps, back into dicts.
+    """
+    orjson = _orjson()
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def packb(obj: Any) -> bytes:
+    """
+    A record or dict as MessagePack. Needs msgpack.
+    """
+    return _msgpack().packb(as_plain(obj), default=str, use_bin_type=True)
+
+
+def unpackb(data: bytes) -> Any:
+    """
+    MessagePack written by packb, back into dicts.
+    """
+    return _msgpack().unpackb(data, raw=False, strict_map_key=False)
@@ -0,0 +1,177 @@
+"""
+session.py
+----------
+
+This module defines the `PDFSession` class, which holds the open handles for a single PDF document for the length of
+one processing run.
+
+Opening a PDF is expensive: PyMuPDF and pypdf both parse the cross reference table and object streams on open, and
+extracting the text layer touches every page. A `PDFSession` opens each library at most once, on first use, and caches
+the searchable text and metadata so every stage of processing shares the same parse.
+
+The file itself is mapped into memory once, see documentanalysis.mapped, and both libraries read that map: PyMuPDF
+through a memoryview and pypdf through the map's file object. Neither keeps a copy of the whole file of its own.
+
+Classes:
+    PDFSession: Lazily opened PyMuPDF and pypdf handles plus cached text and metadata for one PDF.
+"""
+
+import logging
+from functools import cached_property
+from pathlib import Path
+from typing import Any
+
+import fitz
+from PIL import Image  # pylint: disable=import-error
+from pypdf import PdfReader  # pylint: disable=import-error
+
+from documentanalysis.mapped import MappedFile
+from documentanalysis.results import plain
+
+# PyMuPDF colorspace and PIL mode for each colorspace pages can be rendered in.
+COLORSPACES: dict[str, tuple[Any, str]] = {
+    "gray": (fitz.csGRAY, "L"),
+    "rgb": (fitz.csRGB, "RGB"),
+}
+# Errors raised for a page that cannot be rendered. MuPDF's own errors, such as FzErrorLimit for a raster too large to
+# allocate, derive from FzErrorBase rather than RuntimeError.
+RENDER_ERRORS: tuple[type[Exception], ...] = (RuntimeError, ValueError, fitz.mupdf.FzErrorBase)
+
+
+class PDFSession:
+    """
+    Shared handles for a single PDF document.
+    Use as a context manager so the handles are closed at the end of the run.
+
+    with PDFSession(path, logger) as session:
+        session.searchable_text
+        for page in session.reader.pages:
+            ...
+    """
+
+    def __init__(self, path: Path, logger: logging.Logger) -> None:
+        self.path: Path = path
+        self.logger = logger
+        self._mapped: MappedFile | None = None
+        self._document: fitz.Document | None = None
+        self._reader: PdfReader | None = None
+        self._page_text: dict[int, str] = {}
+
+    def __enter__(self) -> "PDFSession":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    @property
+    def mapped(self) -> MappedFile:
+        """
+        The file mapped into memory, mapped on first use.
+        """
+        if self._mapped is None:
+            self._mapped = MappedFile(self.path)
+        return self._mapped
+
+    @property
+    def document(self) -> fitz.Document:
+        """
+        The PyMuPDF handle, opened on first use.
+        """
+        if self._document is None:
+            self.logger.debug(f"Opening {self.path} with PyMuPDF")
+            self._document = fitz.open(stream=self.mapped.view, filetype="pdf")
+        return self._document
+
+    @property
+    def reader(self) -> PdfReader:
+        """
+        The pypdf handle, opened on first use.
+        """
+        if self._reader is None:
+            self.logger.debug(f"Opening {self.path} with pypdf")
+            self._reader = PdfReader(stream=self.mapped.stream)
+        return self._reader
+
+    @property
+    def page_count(self) -> int:
+        """
+        Number of pages in the document.
+        """
+        return len(self.document)
+
+    def page_text(self, page_number: int) -> str:
+        """
+        The text layer of a single page, extracted once.
+        """
+        if page_number not in self._page_text:
+            self._page_text[page_number] = self.document[page_number].get_text()
+        return self._page_text[page_number]
+
+    def render_page(self, page_number: int, dpi: int = 300, colorspace: str = "gray") -> Image.Image:
+        """
+        Render a page with PyMuPDF into a PIL image, without encoding it to an image format in between.
+        Every image on the page is decoded by MuPDF, which handles filters pypdf does not, such as JBIG2.
+        A page that cannot be rendered raises one of RENDER_ERRORS.
+        """
+        if colorspace not in COLORSPACES:
+            raise ValueError(f"Unknown colorspace {colorspace}, expected one of {sorted(COLORSPACES)}")
+        fitz_colorspace, mode = COLORSPACES[colorspace]
+        pixmap = self.document[page_number].get_pixmap(dpi=dpi, colorspace=fitz_colorspace, alpha=False)
+        # The samples are copied out of MuPDF once, and the image wraps that copy rather than copying again.
+        image = Image.frombuffer(mode, (pixmap.width, pixmap.height), pixmap.samples, "raw", mode, pixmap.stride, 1)
+        image.info["dpi"] = (dpi, dpi)
+        return image
+
+    def release_page(self, page_number: int, page: Any = None) -> None:
+        """
+        Drop what was cached while processing a page.
+        page is the pypdf page, whose image streams keep their decoded rasters until released.
+        """
+        self._page_text.pop(page_number, None)
+        if page is None or "/Resources" not in page:
+            return
+        xobjects = page["/Resources"].get_object().get("/XObject")
+        if xobjects is None:
+            return
+        for xobject in xobjects.get_object().values():
+            xobject = xobject.get_object()
+            if getattr(xobject, "decoded_self", None) is not None:
+                xobject.decoded_self = None
+
+    @cached_property
+    def searchable_text(self) -> str:
+        """
+        The text layer of the whole document.
+        """
+        return "\n".join(self.page_text(page_number) for page_number in range(self.page_count))
+
+    @cached_property
+    def metadata(self) -> dict[str, Any]:
+        """
+        Document metadata as reported by PyMuPDF.
+        """
+        return dict(self.document.metadata or {})
+
+    @cached_property
+    def file_metadata(self) -> dict[str, Any]:
+        """
+        Document information dictionary as reported by pypdf, as plain values.
+        Its entries can be references into the file, so they are resolved now rather than after the session closes.
+        """
+        return plain(self.reader.metadata or {})
+
+    def close(self) -> None:
+        """
+        Close any open handles, then unmap the file.
+        """
+        if self._document is not None:
+            self._document.close()
+            self._document = None
+        self._reader = None
+        if self._mapped is not None:
+            try:
+                self._mapped.close()
+            except BufferError:
+                # A page or document object outlived the session. The map is released with the last of them.
+                self.logger.debug(f"{self.path} is still in use, it will be unmapped once released")
+            self._mapped = None
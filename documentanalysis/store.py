@@ -2,16 +2,59 @@
 Storage Handlers
 
 Protocol interfaces for file, mongodb, sql, and other storage handlers.
+
+Documents processed page by page arrive through `save_page` followed by `end_document`. By default the pages are
+collected and the whole document handed to `save`; writers that can write incrementally override both.
+
+Writers may buffer what they are given to save. Call `flush` to push buffered objects to storage and `close` when
+the writer is no longer needed. `confirm` reports through a callback once everything saved so far is in storage;
+QueuedWriter reports from its thread, so the caller never waits on storage to learn the outcome. `close_all_writers`
+closes every writer that holds an open connection, which the ingestion engine calls when a run or worker process
+ends.
+
+Each writer imports its storage library the first time it is used, so importing this module stays cheap.
+
+Documents arrive as documentanalysis.results records: a DocumentRecord to `save`, or for a streamed document a
+PageRecord per page to `save_page` and the DocumentRecord without its pages to `end_document`. Each writer serializes
+them itself. Writers that store dicts use `DocumentRecord.as_dict`, through documentanalysis.results.as_plain, which
+puts the pages under "pdf_pages"; writers that serialize to JSON use documentanalysis.results.dumps. Plain document
+dicts in that layout are accepted too.
+
+Writers:
+    FileWriter: Writes the extracted text to a text file.
+    ShardedFileWriter: Appends documents to rotating, compressed JSON lines shards with an offset index.
+    MongoWriter: Buffers documents into bulk writes to a MongoDB collection.
+    SQLiteWriter: Buffers documents into transactions on a local SQLite database with a full text index.
+    QueuedWriter: Hands another writer's work to a background thread so processing never waits on storage.
 """
 
+import gzip
+import json
 import os
+import queue
+import sqlite3
+import threading
+import time
+import weakref
 from abc import abstractmethod
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
 from logging import Logger
 from pathlib import Path
-from typing import Any, Protocol, runtime_checkable
+from typing import Any, Callable, Protocol, runtime_checkable
+
+from documentanalysis.hashing import bytes_sha256, file_sha256
+from documentanalysis.results import DocumentRecord, PageRecord, as_plain, dumps, loads
 
-import pymongo
+# Writers holding open connections, by id, so they can be flushed and closed at shutdown.
+_OPEN_WRITERS: "weakref.WeakValueDictionary[int, StoreWriter]" = weakref.WeakValueDictionary()
+
+
+def close_all_writers(logger: Logger) -> None:
+    """
+    Flush and close every writer that still holds an open connection.
+    """
+    for writer in list(_OPEN_WRITERS.values()):
+        writer.close(logger=logger)
 
 
 @runtime_checkable
@@ -36,6 +79,57 @@ class StoreWriter(Protocol):
         """
         return False
 
+    def save_page(self, page: PageRecord | dict[str, Any], logger: Logger) -> None:
+        """
+        Accept the next page of a document that is being streamed.
+        """
+        if getattr(self, "_stream_pages", None) is None:
+            self._stream_pages: list[Any] = []
+        self._stream_pages.append(page)
+
+    def end_document(self, metadata: DocumentRecord | dict[str, Any], logger: Logger) -> bool:
+        """
+        Finish a streamed document. metadata is the document record without its pages.
+        """
+        pages, self._stream_pages = getattr(self, "_stream_pages", None) or [], None
+        if isinstance(metadata, DocumentRecord):
+            return self.save(replace(metadata, pages=pages), logger=logger)
+        return self.save({**metadata, "pdf_pages": [as_plain(page) for page in pages]}, logger=logger)
+
+    def flush(self, logger: Logger) -> bool:
+        """
+        Push any buffered objects to storage.
+        """
+        return True
+
+    def confirm(self, callback: Callable[[bool], None], logger: Logger) -> None:
+        """
+        Call callback once everything saved so far is in storage, with False when any of it could not be written.
+        What could not be written is discarded. By default the writer is flushed and callback called straight away.
+        """
+        written = self.flush(logger=logger)
+        if not written:
+            self.discard(logger=logger)
+        callback(written)
+
+    def pending(self) -> int:
+        """
+        The number of saved objects buffered and not yet in storage.
+        """
+        return 0
+
+    def discard(self, logger: Logger) -> int:
+        """
+        Drop the buffered objects that could not be written, returning how many were dropped.
+        """
+        return 0
+
+    def close(self, logger: Logger) -> None:
+        """
+        Flush and release any resources held by the writer.
+        """
+        self.flush(logger=logger)
+
 
 @dataclass
 class FileWriter(StoreWriter):
@@ -51,21 +145,333 @@ class FileWriter(StoreWriter):
         """
         Save the object to a file.
         path: dict[str, str]  # {'uri': 'path/to/file.txt'}
+        The text is written to a temporary file that then replaces the target, so readers never see a partial file.
+        Documents without a top level text, such as PDFs, are written as the text of their pages.
         """
         try:
-            with open(Path(self.path.get("uri")), "w", encoding="utf-8") as file:
-                result = file.write(obj["text"])
+            target = Path(self.path.get("uri"))
+            temporary = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+            with open(temporary, "w", encoding="utf-8") as file:
+                result = file.write(obj["text"] if isinstance(obj, dict) and "text" in obj else document_text(obj))
+            os.replace(temporary, target)
             logger.info(f"Successfully wrote {result} characters to the file with path {self.path}.")
-            return result > 0
+            return True
         except Exception as e:
             logger.error(f"An error occurred while writing to the file: {e} with path {self.path}")
             return False
 
+    def save_page(self, page: PageRecord | dict[str, Any], logger: Logger) -> None:
+        """
+        Append the text of the next page of a streamed document to the file.
+        The file is opened on the first page and kept open until end_document.
+        """
+        if getattr(self, "_stream_file", None) is None:
+            self._stream_file = open(Path(self.path.get("uri")), "w", encoding="utf-8")
+        self._stream_file.write(page_text(page) + "\n")
+
+    def end_document(self, metadata: DocumentRecord | dict[str, Any], logger: Logger) -> bool:
+        """
+        Close the file of a streamed document.
+        """
+        stream_file, self._stream_file = getattr(self, "_stream_file", None), None
+        if stream_file is None:
+            return False
+        written = stream_file.tell()
+        stream_file.close()
+        logger.info(f"Successfully streamed {written} characters to the file with path {self.path}.")
+        return True
+
+
+def _zstd() -> Any:
+    """
+    The zstandard module, imported when a zstd shard is first written or read.
+    """
+    try:
+        import zstandard  # pylint: disable=import-outside-toplevel,import-error
+    except ImportError as e:
+        raise ImportError("zstd compressed shards need the zstandard package: pip install zstandard") from e
+    return zstandard
+
+
+# Compressors for ShardedFileWriter: shard suffix, compress and decompress. Each batch is compressed on its own, and
+# gzip members and zstd frames can both be concatenated, so a whole shard still reads with zcat or zstdcat.
+SHARD_COMPRESSION: dict[str, tuple[str, Any, Any]] = {
+    "": (".jsonl", lambda data: data, lambda data: data),
+    "gzip": (".jsonl.gz", lambda data: gzip.compress(data, compresslevel=6, mtime=0), gzip.decompress),
+    "zstd": (
+        ".jsonl.zst",
+        lambda data: _zstd().ZstdCompressor(level=3).compress(data),
+        lambda data: _zstd().ZstdDecompressor().decompressobj().decompress(data),
+    ),
+}
+
+
+@dataclass
+class ShardedFileWriter(StoreWriter):
+    """
+    Appends documents as JSON lines to rotating, compressed shard files in a directory.
+
+    One file per document does not scale to millions of documents, and names derived from the input collide. Instead
+    documents are buffered and written batch_bytes at a time, each batch compressed on its own, to a shard that is
+    closed once max_shard_bytes of JSON have gone into it. A shard is written under a .part name and renamed into
+    place when it is closed, with its index, so the finished shards in the directory are always complete. Shard names
+    carry the process id, so every worker process writes its own shards.
+
+    The index of a shard is a JSON lines file giving, for each document, its source path and where its batch starts
+    and ends in the shard. `get` reads one document back by decompressing only its batch. While a shard is open its
+    index is appended to under a .idx.part name, and `flush` syncs the batch and then its index entries to disk before
+    reporting success, so a document reported written survives a crash of the process writing it. The shards left
+    open by a process that died are sealed by `recover`, which runs before a writer opens its first shard.
+
+    Build one writer per process and share it between documents.
+    """
+
+    path: dict[str, str]
+    logger: Logger = field(default_factory=lambda: Logger("ShardedFileWriter"))
+    auth: dict[str, str] = field(default_factory=dict)
+    compression: str = "gzip"
+    max_shard_bytes: int = 256 << 20
+    batch_bytes: int = 1 << 20
+    prefix: str = "documents"
+    _buffer: list[tuple[str, bytes]] = field(default_factory=list, init=False, repr=False, compare=False)
+    _buffered: int = field(default=0, init=False, repr=False, compare=False)
+    _shard: Any = field(default=None, init=False, repr=False, compare=False)
+    _index: Any = field(default=None, init=False, repr=False, compare=False)
+    _shard_name: str = field(default="", init=False, repr=False, compare=False)
+    _shard_bytes: int = field(default=0, init=False, repr=False, compare=False)
+    _sequence: int = field(default=0, init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        if self.compression not in SHARD_COMPRESSION:
+            raise ValueError(f"Unknown compression {self.compression}, expected one of {sorted(SHARD_COMPRESSION)}")
+        self.suffix, self._compress, self._decompress = SHARD_COMPRESSION[self.compression]
+
+    @property
+    def directory(self) -> Path:
+        """
+        The directory the shards are written to.
+        """
+        return Path(self.path["uri"])
+
+    def save(self, obj: Any, logger: Logger) -> bool:
+        """
+        Buffer the document, writing the buffer out once batch_bytes are waiting.
+        """
+        record = as_plain(obj)
+        line = dumps(record) + b"\n"
+        self._buffer.append((str(record.get("path") or record.get("file")), line))
+        self._buffered += len(line)
+        _OPEN_WRITERS[id(self)] = self
+        if self._buffered >= self.batch_bytes:
+            return self.flush(logger=logger)
+        return True
+
+    def flush(self, logger: Logger) -> bool:
+        """
+        Compress the buffered documents into the current shard, closing it if it is full.
+        The batch is synced to disk before the index entries that point into it, and both before returning True.
+        """
+        if not self._buffer:
+            return True
+        try:
+            shard = self._open_shard(logger)
+            batch = b"".join(line for _, line in self._buffer)
+            data = self._compress(batch)
+            offset = shard.tell()
+            shard.write(data)
+            shard.flush()
+            os.fsync(shard.fileno())
+            start, entries = 0, []
+            for source, line in self._buffer:
+                entry = {"source": source, "offset": offset, "length": len(data), "start": start, "size": len(line)}
+                entries.append(json.dumps(entry))
+                start += len(line)
+            self._index.write("".join(entry + "\n" for entry in entries))
+            self._index.flush()
+            os.fsync(self._index.fileno())
+        except OSError as e:
+            logger.error(f"Failed to write {len(self._buffer)} documents to {self._shard_name}: {e}")
+            return False
+        logger.info(f"Wrote {len(self._buffer)} documents to {self._shard_name}")
+        self._buffer, self._buffered = [], 0
+        self._shard_bytes += len(batch)
+        if self._shard_bytes >= self.max_shard_bytes:
+            self._close_shard()
+        return True
+
+    def pending(self) -> int:
+        """
+        The number of saved objects buffered and not yet written.
+        """
+        return len(self._buffer)
+
+    def discard(self, logger: Logger) -> int:
+        """
+        Drop the buffered objects, once their writes have been given up on.
+        """
+        dropped, self._buffer, self._buffered = len(self._buffer), [], 0
+        if dropped:
+            logger.warning(f"Dropped {dropped} unwritten documents for {self.path}")
+        return dropped
+
+    def close(self, logger: Logger) -> None:
+        """
+        Flush the buffer and close the current shard.
+        """
+        self.flush(logger=logger)
+        self._close_shard()
+        _OPEN_WRITERS.pop(id(self), None)
+
+    def recover(self, logger: Logger) -> int:
+        """
+        Seal the shards left open by processes that are no longer running and return how many were sealed.
+        Each shard keeps the batches its .idx.part index reached; anything written after the last index entry was never
+        reported written and is cut off. A shard with no index entries is removed.
+        A process id reused since its writer died keeps that writer's shard open until the process ends.
+        """
+        sealed = 0
+        for part in sorted(self.directory.glob(f"{self.prefix}-*.part")):
+            name = part.name[: -len(".part")]
+            pid = name.rsplit("-", 2)[-2]
+            if name.endswith(".idx") or not pid.isdigit() or _process_running(int(pid)):
+                continue
+            index = part.with_name(f"{name}.idx.part")
+            entries: list[str] = []
+            if index.exists():
+                for line in index.read_text(encoding="utf-8").splitlines():
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # The last line of an index torn by the crash.
+                        break
+                    entries.append(line)
+                    end = entry["offset"] + entry["length"]
+            if not entries:
+                part.unlink()
+                index.unlink(missing_ok=True)
+                continue
+            with open(part, "r+b") as shard:
+                shard.truncate(end)
+                os.fsync(shard.fileno())
+            os.replace(part, part.with_name(f"{name}{self.suffix}"))
+            index.write_text("".join(entry + "\n" for entry in entries), encoding="utf-8")
+            os.replace(index, part.with_name(f"{name}.idx"))
+            logger.warning(f"Sealed the shard {name} of a process that stopped, with {len(entries)} documents")
+            sealed += 1
+        return sealed
+
+    def get(self, source: str) -> dict[str, Any] | None:
+        """
+        The document last saved from source, read back through the shard indexes, or None.
+        Documents still in the buffer are flushed first. Shards still being written, by this or another process, are
+        read through their .idx.part indexes.
+        """
+        self.flush(logger=self.logger)
+        self.recover(logger=self.logger)
+        indexes = [*self.directory.glob(f"{self.prefix}-*.idx"), *self.directory.glob(f"{self.prefix}-*.idx.part")]
+        for index in sorted(indexes, key=lambda index: index.name.split(".idx")[0], reverse=True):
+            entries = [json.loads(line) for line in _complete_lines(index)]
+            for entry in reversed(entries):
+                if entry["source"] == source:
+                    return self._read(index.name.split(".idx")[0], entry)
+        return None
+
+    def _read(self, name: str, entry: dict[str, Any]) -> dict[str, Any]:
+        """
+        Decompress the batch holding entry in the shard name and parse its document.
+        """
+        shard = self.directory / f"{name}.part"
+        if not shard.exists():
+            # Sealed since its index was read.
+            shard = self.directory / f"{name}{self.suffix}"
+        with open(shard, "rb") as file:
+            file.seek(entry["offset"])
+            batch = self._decompress(file.read(entry["length"]))
+        return loads(batch[entry["start"]:entry["start"] + entry["size"]])
+
+    def _open_shard(self, logger: Logger) -> Any:
+        """
+        The shard being written, opened under its .part name with its .part index on first use.
+        Shards left open by processes that died are sealed before this writer's first shard is opened.
+        """
+        if self._shard is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            if not self._sequence:
+                self.recover(logger=logger)
+            self._sequence += 1
+            self._shard_name = f"{self.prefix}-{time.strftime('%Y%m%d%H%M%S')}-{os.getpid()}-{self._sequence:05d}"
+            name = self.directory / self._shard_name
+            # pylint: disable=consider-using-with
+            self._shard = open(f"{name}.part", "wb")
+            self._index = open(f"{name}.idx.part", "w", encoding="utf-8")
+            self._shard_bytes = 0
+        return self._shard
+
+    def _close_shard(self) -> None:
+        """
+        Close the current shard and move it and its index into place.
+        The shard is renamed before its index, so every index found names a complete shard.
+        """
+        if self._shard is None:
+            return
+        for file in (self._shard, self._index):
+            file.flush()
+            os.fsync(file.fileno())
+            file.close()
+        self._shard = self._index = None
+        name = self.directory / self._shard_name
+        os.replace(f"{name}.part", f"{name}{self.suffix}")
+        os.replace(f"{name}.idx.part", f"{name}.idx")
+
+
+def _process_running(pid: int) -> bool:
+    """
+    Whether a process with the id pid is running.
+    """
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Running, as another user.
+        return True
+    return True
+
+
+def _complete_lines(path: Path) -> list[str]:
+    """
+    The lines of a JSON lines file that another process may be appending to, without a partly written last line.
+    """
+    try:
+        text = path.read_text(encoding="utf-8")
+    except FileNotFoundError:
+        # Renamed into place since it was listed.
+        text = path.with_suffix("").read_text(encoding="utf-8") if path.suffix == ".part" else ""
+    return text[: text.rfind("\n") + 1].splitlines()
+
+
+def content_hash(obj: dict[str, Any]) -> str:
+    """
+    Hash of the source file an object was extracted from.
+    Falls back to hashing the extracted text when the source file is not available.
+    """
+    source = obj.get("path") or obj.get("file")
+    if source and Path(source).is_file():
+        return file_sha256(source)
+    return bytes_sha256(str(obj["text"] if "text" in obj else document_text(obj)).encode("utf-8"))
+
 
 @dataclass
 class MongoWriter(StoreWriter):
     """
     Represents a storage handler for managing objects in MongoDB.
+
+    One pooled client is opened on first use and kept for the life of the writer, so build one writer per
+    process and share it between documents. Saved objects are buffered and written with a single bulk request
+    once batch_size objects are waiting or flush_interval seconds have passed since the last write.
+
+    With upsert set, objects are keyed on their source path plus content_hash so re-running over the same files
+    replaces their records rather than duplicating them.
     """
 
     path: dict[str, str]
@@ -73,20 +479,557 @@ class MongoWriter(StoreWriter):
     auth: dict[str, str] = field(default_factory=lambda: {
         "username": str(os.environ.get("MONGODB_USERNAME")),
         "password": str(os.environ.get("MONGODB_PASSWORD"))})
+    batch_size: int = 100
+    flush_interval: float = 5.0
+    upsert: bool = True
+    max_pool_size: int = 10
+    _client: Any = field(default=None, init=False, repr=False, compare=False)
+    _buffer: list[dict[str, Any]] = field(default_factory=list, init=False, repr=False, compare=False)
+    _last_flush: float = field(default_factory=time.monotonic, init=False, repr=False, compare=False)
+    _indexed: set[str] = field(default_factory=set, init=False, repr=False, compare=False)
+
+    @property
+    def client(self) -> Any:
+        """
+        The pooled pymongo.MongoClient, connected on first use.
+        """
+        if self._client is None:
+            import pymongo  # pylint: disable=import-outside-toplevel
+
+            self._client = pymongo.MongoClient(
+                host=self.path["host"],
+                username=self.auth["username"],
+                password=self.auth["password"],
+                maxPoolSize=self.max_pool_size,
+            )
+        return self._client
+
+    @property
+    def collection(self) -> Any:
+        """
+        The target collection.
+        """
+        return self.client[self.path["dbname"]][self.path["collection"]]
 
     def save(self, obj: Any, logger: Logger) -> bool:
         """
-        Save the object to MongoDB.
+        Buffer the object for MongoDB, writing the buffer out when it is full or old enough.
         path: dict[str, str] # {'host': 'mongodb://mongo:27017/', 'dbname': 'mydatabase2', 'collection': 'customers'}
         """
-        myclient = pymongo.MongoClient(
-            host=self.path["host"], username=self.auth["username"], password=self.auth["password"]
+        record = dict(as_plain(obj))
+        if self.upsert:
+            record.setdefault("content_hash", content_hash(record))
+        self._buffer.append(record)
+        # Registered from the first save, so a buffer that never reached the server is still written at exit.
+        _OPEN_WRITERS[id(self)] = self
+        if len(self._buffer) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            return self.flush(logger=logger)
+        return True
+
+    def flush(self, logger: Logger) -> bool:
+        """
+        Write every buffered object to MongoDB in one bulk request.
+        Objects stay buffered until they are written, so a failed request is retried by the next flush.
+        """
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return True
+        from pymongo.errors import BulkWriteError, PyMongoError  # pylint: disable=import-outside-toplevel
+
+        records = list(self._buffer)
+        try:
+            if self.upsert:
+                result = self.collection.bulk_write([self._replace(record) for record in records], ordered=False)
+                logger.info(
+                    f"Upserted {result.upserted_count} and replaced {result.modified_count} documents to {self.path}"
+                )
+            else:
+                result = self.collection.insert_many(records, ordered=False)
+                logger.info(f"Inserted {len(result.inserted_ids)} documents to {self.path}")
+        except BulkWriteError as e:
+            # An unordered request writes everything it can, only the objects it reports back are kept for a retry.
+            # A duplicate key means the object was stored by an earlier attempt.
+            failed = {error["index"] for error in e.details.get("writeErrors", []) if error.get("code") != 11000}
+            kept = [record for index, record in enumerate(records) if index in failed]
+            self._buffer = kept + self._buffer[len(records):]
+            logger.error(f"failed to write {len(failed)} documents to mongodb with error: {e} to path: {self.path}")
+            return not failed
+        except PyMongoError as e:
+            logger.error(f"failed to write {len(records)} documents to mongodb with error: {e} to path: {self.path}")
+            return False
+        del self._buffer[: len(records)]
+        return True
+
+    def pending(self) -> int:
+        """
+        The number of saved objects buffered and not yet written.
+        """
+        return len(self._buffer)
+
+    def discard(self, logger: Logger) -> int:
+        """
+        Drop the buffered objects, once their writes have been given up on.
+        """
+        dropped, self._buffer = len(self._buffer), []
+        if dropped:
+            logger.warning(f"Dropped {dropped} unwritten documents for {self.path}")
+        return dropped
+
+    def close(self, logger: Logger) -> None:
+        """
+        Flush the buffer, connecting first if nothing has been written yet, and close the client.
+        """
+        self.flush(logger=logger)
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+        _OPEN_WRITERS.pop(id(self), None)
+
+    def _replace(self, record: dict[str, Any]) -> Any:
+        """
+        Build the pymongo.ReplaceOne upsert for a record, keyed on its source path and content hash.
+        """
+        import pymongo  # pylint: disable=import-outside-toplevel
+
+        key_field = "path" if "path" in record else "file"
+        if key_field not in self._indexed:
+            self.collection.create_index([(key_field, pymongo.ASCENDING), ("content_hash", pymongo.ASCENDING)])
+            self._indexed.add(key_field)
+        return pymongo.ReplaceOne(
+            {key_field: record.get(key_field), "content_hash": record["content_hash"]}, record, upsert=True
         )
-        mydb = myclient[self.path["dbname"]]
-        mycol = mydb[self.path["collection"]]
-        result = mycol.insert_one(document=obj)
-        if result:
-            logger.info(f"Inserted document with id: {result.inserted_id} to {self.path}")
+
+
+SQLITE_SCHEMA: str = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL UNIQUE,
+    content_hash TEXT NOT NULL,
+    metadata TEXT NOT NULL,
+    saved_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pages (
+    id INTEGER PRIMARY KEY,
+    document_id INTEGER NOT NULL REFERENCES documents (id) ON DELETE CASCADE,
+    page_number INTEGER NOT NULL,
+    strategy TEXT,
+    text TEXT NOT NULL,
+    errors TEXT NOT NULL,
+    UNIQUE (document_id, page_number)
+);
+CREATE TABLE IF NOT EXISTS images (
+    id INTEGER PRIMARY KEY,
+    page_id INTEGER NOT NULL REFERENCES pages (id) ON DELETE CASCADE,
+    image_number INTEGER NOT NULL,
+    format TEXT,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS images_page_id ON images (page_id);
+"""
+
+# Contentless, so the text is not stored twice. Rows are keyed on pages.id and hold the page text and its OCR text.
+SQLITE_FTS_SCHEMA: str = "CREATE VIRTUAL TABLE IF NOT EXISTS pages_fts USING fts5(text, content='')"
+
+
+def _page_search_text(text: str, image_texts: list[str]) -> str:
+    """
+    Everything searchable on a page: its text layer followed by the text of its images.
+    """
+    return "\n".join(part for part in [text, *image_texts] if part)
+
+
+def page_text(page: PageRecord | dict[str, Any]) -> str:
+    """
+    The searchable text of a page record or page dict.
+    """
+    if isinstance(page, PageRecord):
+        return page.search_text
+    return _page_search_text(
+        page.get("text", ""), [image.get("text", "") for image in page.get("images", []) if isinstance(image, dict)]
+    )
+
+
+def document_text(obj: DocumentRecord | dict[str, Any]) -> str:
+    """
+    The searchable text of every page of a document, in order.
+    """
+    if isinstance(obj, DocumentRecord):
+        return obj.text
+    return "\n".join(page_text(page) for page in obj.get("pdf_pages", []))
+
+
+@dataclass
+class SQLiteWriter(StoreWriter):
+    """
+    Represents a storage handler for managing objects in a local SQLite database.
+
+    Documents are split into a documents table, a pages table and an images table holding the OCR result of each
+    image, with plain SQL types so the schema carries over to other SQL engines. Every page's text and image text
+    is indexed in the FTS5 table pages_fts, see `search`.
+
+    The database is opened in WAL mode on first use and kept open for the life of the writer, so build one writer
+    per process and share it between documents. Like MongoWriter, saved objects are buffered and written in a single
+    transaction once batch_size documents are waiting or flush_interval seconds have passed since the last write.
+    Saving a document whose source was saved before replaces it.
+    """
+
+    path: dict[str, str]
+    logger: Logger = field(default_factory=lambda: Logger("SQLiteWriter"))
+    auth: dict[str, str] = field(default_factory=dict)
+    batch_size: int = 100
+    flush_interval: float = 5.0
+    fts: bool = True
+    timeout: float = 30.0
+    _connection: sqlite3.Connection | None = field(default=None, init=False, repr=False, compare=False)
+    _buffer: list[dict[str, Any]] = field(default_factory=list, init=False, repr=False, compare=False)
+    _last_flush: float = field(default_factory=time.monotonic, init=False, repr=False, compare=False)
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """
+        The database connection, opened and given the schema on first use.
+        path: dict[str, str]  # {'uri': 'path/to/plat.sqlite'}
+        """
+        if self._connection is None:
+            connection = sqlite3.connect(
+                self.path["uri"], timeout=self.timeout, isolation_level=None, check_same_thread=False
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("PRAGMA foreign_keys=ON")
+            connection.executescript(SQLITE_SCHEMA)
+            if self.fts:
+                connection.execute(SQLITE_FTS_SCHEMA)
+            self._connection = connection
+        return self._connection
+
+    def save(self, obj: Any, logger: Logger) -> bool:
+        """
+        Buffer the object for the database, writing the buffer out when it is full or old enough.
+        """
+        self._buffer.append(dict(as_plain(obj)))
+        # Registered from the first save, so a buffer that never reached the database is still written at exit.
+        _OPEN_WRITERS[id(self)] = self
+        if len(self._buffer) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            return self.flush(logger=logger)
+        return True
+
+    def flush(self, logger: Logger) -> bool:
+        """
+        Write every buffered object to the database in one transaction.
+        Objects stay buffered until the transaction commits, so a failed write is retried by the next flush.
+        """
+        self._last_flush = time.monotonic()
+        if not self._buffer:
             return True
-        logger.error(f"failed to write to mongodb with error: {result} to path: {self.path}")
-        return False
+        records = list(self._buffer)
+        connection = None
+        try:
+            connection = self.connection
+            connection.execute("BEGIN IMMEDIATE")
+            pages = sum(self._write(connection, record) for record in records)
+            connection.execute("COMMIT")
+        except sqlite3.Error as e:
+            self._rollback(connection)
+            logger.error(f"failed to write {len(records)} documents to sqlite with error: {e} to path: {self.path}")
+            return False
+        except BaseException:
+            # A bad record or a document timeout firing mid-write must still release the database's write lock.
+            self._rollback(connection)
+            raise
+        del self._buffer[: len(records)]
+        logger.info(f"Wrote {len(records)} documents with {pages} pages to {self.path}")
+        return True
+
+    def pending(self) -> int:
+        """
+        The number of saved objects buffered and not yet written.
+        """
+        return len(self._buffer)
+
+    def discard(self, logger: Logger) -> int:
+        """
+        Drop the buffered objects, once their writes have been given up on.
+        """
+        dropped, self._buffer = len(self._buffer), []
+        if dropped:
+            logger.warning(f"Dropped {dropped} unwritten documents for {self.path}")
+        return dropped
+
+    def close(self, logger: Logger) -> None:
+        """
+        Flush the buffer, opening the database first if nothing has been written yet, and close the database.
+        """
+        self.flush(logger=logger)
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+        _OPEN_WRITERS.pop(id(self), None)
+
+    def search(self, query: str, limit: int = 20) -> list[dict[str, Any]]:
+        """
+        Pages matching an FTS5 query, best match first.
+        Each match is a dict of source, page and text, the page's own text layer.
+        """
+        rows = self.connection.execute(
+            """
+            SELECT documents.source, pages.page_number, pages.text
+            FROM pages_fts
+            JOIN pages ON pages.id = pages_fts.rowid
+            JOIN documents ON documents.id = pages.document_id
+            WHERE pages_fts MATCH ?
+            ORDER BY pages_fts.rank
+            LIMIT ?
+            """,
+            (query, limit),
+        )
+        return [{"source": source, "page": page, "text": text} for source, page, text in rows]
+
+    @staticmethod
+    def _rollback(connection: sqlite3.Connection | None) -> None:
+        """
+        Roll back the open transaction on connection, if there is one.
+        """
+        if connection is not None and connection.in_transaction:
+            connection.execute("ROLLBACK")
+
+    def _write(self, connection: sqlite3.Connection, record: dict[str, Any]) -> int:
+        """
+        Replace the document in the database and return the number of pages written.
+        PDFs carry their pages in pdf_pages; images carry their OCR text as a single page.
+        """
+        source = str(record.get("path") or record.get("file"))
+        if "pdf_pages" in record:
+            pages = record["pdf_pages"]
+        else:
+            pages = [{"page": 0, "strategy": "ocr", "text": record.get("text", "")}]
+        metadata = {key: value for key, value in record.items() if key not in ("pdf_pages", "searchable_text", "text")}
+
+        digest = record.get("content_hash") or content_hash(record)
+
+        self._delete(connection, source)
+        document_id = connection.execute(
+            "INSERT INTO documents (source, content_hash, metadata, saved_at) VALUES (?, ?, ?, ?)",
+            (source, digest, dumps(metadata).decode("utf-8"), time.time()),
+        ).lastrowid
+        for page in pages:
+            images = [image for image in page.get("images", []) if isinstance(image, dict)]
+            page_id = connection.execute(
+                "INSERT INTO pages (document_id, page_number, strategy, text, errors) VALUES (?, ?, ?, ?, ?)",
+                (
+                    document_id,
+                    page.get("page", 0),
+                    page.get("strategy"),
+                    page.get("text", ""),
+                    json.dumps(page.get("errors", [])),
+                ),
+            ).lastrowid
+            connection.executemany(
+                "INSERT INTO images (page_id, image_number, format, text) VALUES (?, ?, ?, ?)",
+                [(page_id, number, image.get("format"), image.get("text", "")) for number, image in enumerate(images)],
+            )
+            if self.fts:
+                connection.execute(
+                    "INSERT INTO pages_fts (rowid, text) VALUES (?, ?)",
+                    (page_id, _page_search_text(page.get("text", ""), [image.get("text", "") for image in images])),
+                )
+        return len(pages)
+
+    def _delete(self, connection: sqlite3.Connection, source: str) -> None:
+        """
+        Remove a previously saved document, with its pages, images and index entries.
+        The index is contentless, so its entries are removed by handing back the text they were built from.
+        """
+        row = connection.execute("SELECT id FROM documents WHERE source = ?", (source,)).fetchone()
+        if row is None:
+            return
+        if self.fts:
+            for page_id, text in connection.execute(
+                "SELECT id, text FROM pages WHERE document_id = ?", (row[0],)
+            ).fetchall():
+                image_texts = [
+                    image_text
+                    for (image_text,) in connection.execute(
+                        "SELECT text FROM images WHERE page_id = ? ORDER BY image_number", (page_id,)
+                    )
+                ]
+                connection.execute(
+                    "INSERT INTO pages_fts (pages_fts, rowid, text) VALUES ('delete', ?, ?)",
+                    (page_id, _page_search_text(text, image_texts)),
+                )
+        connection.execute("DELETE FROM documents WHERE id = ?", (row[0],))
+
+
+# Placed on a QueuedWriter's queue to stop its thread.
+_STOP: object = object()
+
+
+@dataclass
+class QueuedWriter(StoreWriter):
+    """
+    Hands everything given to another writer to a background thread, so processing never waits on storage.
+
+    Each QueuedWriter owns one thread, so wrapping several writers writes to them concurrently and one slow target
+    does not hold up the others, while the wrapped writer itself is only ever used by one thread at a time. The queue
+    holds at most max_pending calls; when it is full the caller blocks until the thread catches up.
+
+    A save, end of document or flush that fails, by returning False or raising, is retried up to retries times,
+    waiting backoff seconds before the first retry and twice as long before each one after, up to max_backoff. A
+    writer that buffers, such as MongoWriter, keeps an object it failed to write out in its buffer, so once it has
+    pending objects the retries flush that buffer rather than saving the object again. Calls that still fail are
+    logged and counted in failed, and the objects the wrapped writer still holds for them are discarded.
+
+    `flush` waits for the queue to drain and flushes the wrapped writer. It returns False when any call queued since
+    the last flush failed for good, which is how a caller that only sees save return True learns its writes were
+    lost. `confirm` learns the same without waiting: the thread flushes the wrapped writer once it reaches the call
+    and then hands the outcome to the callback. `close` also stops the thread and closes the wrapped writer.
+
+    Wrap writers that are shared across documents, such as one MongoWriter per process:
+
+        QueuedWriter(writer=MongoWriter(path=...))
+    """
+
+    writer: StoreWriter
+    max_pending: int = 64
+    retries: int = 3
+    backoff: float = 0.5
+    max_backoff: float = 30.0
+    path: dict[str, str] = field(init=False)
+    auth: dict[str, str] = field(init=False, repr=False)
+    logger: Logger = field(init=False, repr=False)
+    failed: int = field(default=0, init=False, compare=False)
+    _failures: int = field(default=0, init=False, repr=False, compare=False)
+    _queue: queue.Queue = field(init=False, repr=False, compare=False)
+    _thread: threading.Thread | None = field(default=None, init=False, repr=False, compare=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self.path = self.writer.path
+        self.auth = self.writer.auth
+        self.logger = getattr(self.writer, "logger", Logger("QueuedWriter"))
+        self._queue = queue.Queue(maxsize=self.max_pending)
+
+    def save(self, obj: Any, logger: Logger) -> bool:
+        """
+        Queue the object for the wrapped writer.
+        """
+        self._put(("save", obj, logger))
+        return True
+
+    def save_page(self, page: PageRecord | dict[str, Any], logger: Logger) -> None:
+        """
+        Queue the next page of a streamed document for the wrapped writer.
+        """
+        self._put(("save_page", page, logger))
+
+    def end_document(self, metadata: DocumentRecord | dict[str, Any], logger: Logger) -> bool:
+        """
+        Queue the end of a streamed document for the wrapped writer.
+        """
+        self._put(("end_document", metadata, logger))
+        return True
+
+    def flush(self, logger: Logger) -> bool:
+        """
+        Wait for every queued call to be written, then flush the wrapped writer.
+        Returns False if the wrapped writer failed to flush, or any call queued since the last flush failed.
+        """
+        if self._thread is None:
+            return self.writer.flush(logger=logger)
+        self._put(("flush", None, logger))
+        self._queue.join()
+        failures, self._failures = self._failures, 0
+        return not failures
+
+    def confirm(self, callback: Callable[[bool], None], logger: Logger) -> None:
+        """
+        Queue a flush of the wrapped writer and return at once. The thread calls callback with False when it, or any
+        call queued since the last flush or confirm, failed for good.
+        """
+        if self._thread is None:
+            self.writer.confirm(callback, logger=logger)
+            return
+        self._put(("confirm", callback, logger))
+
+    def close(self, logger: Logger) -> None:
+        """
+        Write everything queued, stop the thread and close the wrapped writer.
+        """
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+            _OPEN_WRITERS.pop(id(self), None)
+        self.writer.close(logger=logger)
+        if self.failed:
+            logger.error(f"{self.failed} writes to {self.path} failed after {self.retries} retries")
+
+    def _put(self, call: tuple[str, Any, Logger]) -> None:
+        """
+        Queue a call, starting the thread on first use. Blocks while the queue is full.
+        """
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name=f"QueuedWriter-{type(self.writer).__name__}", daemon=True
+                )
+                self._thread.start()
+                _OPEN_WRITERS[id(self)] = self
+        self._queue.put(call)
+
+    def _run(self) -> None:
+        """
+        Hand queued calls to the wrapped writer until told to stop.
+        """
+        while True:
+            call = self._queue.get()
+            try:
+                if call is _STOP:
+                    return
+                method, obj, logger = call
+                if method == "save_page":
+                    self.writer.save_page(obj, logger=logger)
+                elif method == "confirm":
+                    self._write("flush", None, logger)
+                    failures, self._failures = self._failures, 0
+                    obj(not failures)
+                else:
+                    self._write(method, obj, logger)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                self.failed += 1
+                self._failures += 1
+                call[2].error(f"Queued {call[0]} to {self.path} failed with error: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _write(self, method: str, obj: Any, logger: Logger) -> None:
+        """
+        Call save, end_document or flush on the wrapped writer, retrying with exponential backoff.
+        Once the wrapped writer holds the object in its buffer, the retries flush the buffer instead.
+        """
+        retry_flush = method == "flush"
+        delay = self.backoff
+        for attempt in range(self.retries + 1):
+            try:
+                if retry_flush:
+                    written = self.writer.flush(logger=logger)
+                else:
+                    written = getattr(self.writer, method)(obj, logger=logger)
+                if written:
+                    return
+                error = "the writer reported a failure"
+                retry_flush = retry_flush or self.writer.pending() > 0
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                error = str(e)
+            if attempt < self.retries:
+                logger.warning(f"{method} to {self.path} failed ({error}), retrying in {delay:.2f}s")
+                time.sleep(delay)
+                delay = min(delay * 2, self.max_backoff)
+        self.failed += 1
+        self._failures += 1
+        dropped = self.writer.discard(logger=logger)
+        logger.error(
+            f"Giving up on {method} to {self.path} after {self.retries + 1} attempts, "
+            f"dropping {dropped} buffered documents: {error}"
+        )
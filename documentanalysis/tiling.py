@@ -0,0 +1,221 @@
+"""
+tiling.py
+---------
+
+OCR very large images a piece at a time.
+
+A full size survey plat rendered at 300 DPI is a single image of a hundred megapixels or more. tesseract is slow on
+it, needs memory in proportion to it, and one failure loses the whole sheet. For images of at least
+`ProcessingConfig.tile_min_pixels`, `ocr_tiled` instead cuts the image into pieces, OCRs the pieces on a thread pool
+and merges the text back in reading order using each piece's position on the page.
+
+Pieces are found in one of two ways, selected with `ProcessingConfig.tile_mode`:
+
+- REGIONS: find the blocks of text with OpenCV, by smearing the ink of each block into one blob and taking the
+  contours of the blobs. Blank paper and drawings between the blocks are never OCR'd.
+- GRID: cover the image with tiles that overlap by `tile_overlap` pixels, so text cut by one tile edge is whole in
+  the next tile.
+
+No piece is larger than `tile_size` pixels a side, so the memory needed is bounded by the tile size and the number of
+threads rather than the size of the sheet. A piece that fails is logged and counted, the rest of the sheet is kept.
+
+Classes:
+    Tile: A rectangle of the image, in image coordinates.
+
+Functions:
+    grid_tiles: Overlapping tiles covering an image.
+    text_regions: Rectangles around the blocks of text in an image.
+    plan_tiles: The pieces to OCR for an image.
+    merge_text: The text of the pieces in reading order.
+    ocr_tiled: OCR an image piece by piece.
+    use_tiling: Whether an image is large enough to be OCR'd piece by piece.
+    identity: The tiling settings, for cache keys.
+"""
+
+import logging
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Any, Callable
+
+import cv2 as cv
+import numpy as np
+from PIL import Image  # pylint: disable=import-error
+
+from documentanalysis.config import ProcessingConfig
+from documentanalysis.metrics import METRICS
+
+REGIONS: str = "regions"
+GRID: str = "grid"
+
+# Smallest block of ink, in pixels a side, worth OCR'ing on its own. Smaller ones are specks.
+MIN_REGION_SIDE: int = 8
+# Margin kept around each text block so the edges of its characters are not cut.
+REGION_PADDING: int = 12
+
+logger: logging.Logger = logging.getLogger(name=__name__)
+
+
+@dataclass(frozen=True)
+class Tile:
+    """
+    A rectangle of the image, in image coordinates.
+    """
+
+    x: int
+    y: int
+    width: int
+    height: int
+
+    @property
+    def box(self) -> tuple[int, int, int, int]:
+        """
+        The rectangle as a PIL crop box: left, top, right, bottom.
+        """
+        return (self.x, self.y, self.x + self.width, self.y + self.height)
+
+
+def grid_tiles(width: int, height: int, tile_size: int, overlap: int = 0) -> list[Tile]:
+    """
+    Tiles of at most tile_size a side covering a width by height rectangle, each overlapping the next by overlap.
+    """
+    step = max(tile_size - overlap, 1)
+    tiles: list[Tile] = []
+    for y in range(0, max(height - overlap, 1), step):
+        for x in range(0, max(width - overlap, 1), step):
+            tiles.append(Tile(x, y, min(tile_size, width - x), min(tile_size, height - y)))
+    return tiles
+
+
+def text_regions(gray: np.ndarray) -> list[Tile]:
+    """
+    Rectangles around the blocks of text in a grayscale image of dark ink on light paper.
+    """
+    height, width = gray.shape[:2]
+    ink = cv.threshold(gray, 0, 255, cv.THRESH_BINARY_INV | cv.THRESH_OTSU)[1]
+    # Smear the ink of each block into one blob, reaching further across than down so the words of a line join
+    # before separate columns do.
+    kernel = cv.getStructuringElement(cv.MORPH_RECT, (max(width // 80, 9), max(height // 200, 5)))
+    blobs = cv.dilate(ink, kernel)
+    contours, _ = cv.findContours(blobs, cv.RETR_EXTERNAL, cv.CHAIN_APPROX_SIMPLE)
+    regions: list[Tile] = []
+    for contour in contours:
+        x, y, w, h = cv.boundingRect(contour)
+        if w < MIN_REGION_SIDE or h < MIN_REGION_SIDE:
+            continue
+        left, top = max(x - REGION_PADDING, 0), max(y - REGION_PADDING, 0)
+        right, bottom = min(x + w + REGION_PADDING, width), min(y + h + REGION_PADDING, height)
+        regions.append(Tile(left, top, right - left, bottom - top))
+    return regions
+
+
+def plan_tiles(image: Image.Image, config: ProcessingConfig) -> list[Tile]:
+    """
+    The pieces to OCR image in, none larger than config.tile_size a side.
+    Text regions larger than that are split into overlapping tiles of their own.
+    """
+    if config.tile_mode == GRID:
+        return grid_tiles(image.width, image.height, config.tile_size, config.tile_overlap)
+    if config.tile_mode != REGIONS:
+        raise ValueError(f"Unknown tile mode {config.tile_mode}, expected {REGIONS} or {GRID}")
+    tiles: list[Tile] = []
+    for region in text_regions(np.asarray(image.convert("L"))):
+        if region.width <= config.tile_size and region.height <= config.tile_size:
+            tiles.append(region)
+            continue
+        for tile in grid_tiles(region.width, region.height, config.tile_size, config.tile_overlap):
+            tiles.append(Tile(region.x + tile.x, region.y + tile.y, tile.width, tile.height))
+    return tiles
+
+
+def _band_lines(tile: Tile, lines: list[str], top: int, bottom: int) -> tuple[int, int]:
+    """
+    The slice of the lines of the piece at tile that fall between rows top and bottom of the image, at least one line.
+    OCR gives no positions, so the lines are taken to be spread evenly down the piece.
+    """
+    count, height = len(lines), max(tile.height, 1)
+    start = min(math.floor(count * (top - tile.y) / height), count - 1)
+    stop = max(math.ceil(count * (bottom - tile.y) / height), start + 1)
+    return max(start, 0), min(stop, count)
+
+
+def merge_text(results: list[dict[str, Any]]) -> str:
+    """
+    The text of the pieces in reading order: top to bottom, then left to right.
+    Lines at the start of a piece that repeat lines of an earlier piece inside the rows where the two pieces overlap,
+    as overlapping tiles produce, are kept once. Pieces that do not overlap are never de-duplicated.
+    """
+    lines: list[str] = []
+    earlier: list[tuple[Tile, list[str]]] = []
+    for result in sorted(results, key=lambda result: (result["y"], result["x"])):
+        tile = Tile(result["x"], result["y"], result.get("width", 0), result.get("height", 0))
+        piece = [line for line in result.get("text", "").splitlines() if line.strip()]
+        # For each earlier piece overlapping this one: how many leading lines of this piece lie in the overlap, and
+        # the lines of the earlier piece that lie there too.
+        repeats: list[tuple[int, set[str]]] = []
+        for other, other_lines in earlier:
+            left, top = max(tile.x, other.x), max(tile.y, other.y)
+            right = min(tile.x + tile.width, other.x + other.width)
+            bottom = min(tile.y + tile.height, other.y + other.height)
+            if left >= right or top >= bottom or not piece or not other_lines:
+                continue
+            start, stop = _band_lines(other, other_lines, top, bottom)
+            repeats.append((_band_lines(tile, piece, top, bottom)[1], set(other_lines[start:stop])))
+        skip = 0
+        while skip < len(piece) and any(skip < limit and piece[skip] in seen for limit, seen in repeats):
+            skip += 1
+        earlier.append((tile, piece))
+        lines.extend(piece[skip:])
+    return "\n".join(lines)
+
+
+def ocr_tiled(
+    image: Image.Image, ocr: Callable[[Image.Image], str], config: ProcessingConfig
+) -> tuple[str, list[dict[str, Any]]]:
+    """
+    OCR image piece by piece with ocr, on config.tile_workers threads.
+    Returns the merged text and, for each piece, its position on the image with its text or the error it failed with.
+    """
+    tiles = plan_tiles(image, config)
+    workers = config.tile_workers or os.cpu_count() or 1
+    # Decode the image up front, so the threads only ever read it.
+    image.load()
+
+    def run(tile: Tile) -> dict[str, Any]:
+        result: dict[str, Any] = asdict(tile)
+        with METRICS.stage("ocr_tile", images=1) as stage:
+            try:
+                with image.crop(tile.box) as piece:
+                    result["text"] = ocr(piece)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                logger.warning(f"OCR failed for the tile at {tile.box}: {type(e).__name__}: {e}")
+                stage.add(errors=1)
+                result["error"] = f"{type(e).__name__}: {e}"
+        return result
+
+    if workers <= 1 or len(tiles) <= 1:
+        results = [run(tile) for tile in tiles]
+    else:
+        with ThreadPoolExecutor(max_workers=min(workers, len(tiles))) as pool:
+            results = list(pool.map(run, tiles))
+    return merge_text([result for result in results if "text" in result]), results
+
+
+def identity(config: ProcessingConfig) -> str:
+    """
+    The tiling settings, empty when tiling is off. Tiling changes the text produced, so it is part of cache keys.
+    """
+    if not config.tile_mode:
+        return ""
+    size = f"min={config.tile_min_pixels} size={config.tile_size} overlap={config.tile_overlap}"
+    return f"tiles {config.tile_mode} {size}"
+
+
+def use_tiling(image: Any, config: ProcessingConfig) -> bool:
+    """
+    True when image is large enough to be OCR'd piece by piece under config.
+    """
+    return bool(config.tile_mode) and isinstance(image, Image.Image) and image.width * image.height >= (
+        config.tile_min_pixels
+    )
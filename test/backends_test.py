@@ -0,0 +1,139 @@
+"""
+This module contains tests for the OCR backends in documentanalysis.backends.
+tesserocr is replaced with a fake module so the tests run without tesseract installed.
+"""
+
+import logging
+import multiprocessing
+import sys
+import threading
+import types
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from documentanalysis.backends import PytesseractBackend, TesserocrBackend, get_backend
+from documentanalysis.config import ProcessingConfig
+from documentanalysis.processors import PNGProcessor
+
+logger: logging.Logger = logging.getLogger(name=__name__)
+
+PNG_FILE = Path("test/test_files/Pasted image 20240209155743.png")
+
+
+class FakeTessBaseAPI:
+    """
+    Stands in for tesserocr.PyTessBaseAPI and counts how many handles are created.
+    """
+
+    created = 0
+
+    def __init__(self, lang: str) -> None:
+        FakeTessBaseAPI.created += 1
+        self.lang = lang
+        self.image = None
+        self.lock = threading.Lock()
+
+    def SetImage(self, image) -> None:  # pylint: disable=invalid-name
+        assert self.lock.acquire(blocking=False), "handle used by two threads at once"
+        self.image = image
+
+    def GetUTF8Text(self) -> str:  # pylint: disable=invalid-name
+        return f"text from {self.image}"
+
+    def MeanTextConf(self) -> int:  # pylint: disable=invalid-name
+        self.lock.release()
+        return 87
+
+    def End(self) -> None:  # pylint: disable=invalid-name
+        pass
+
+
+@pytest.fixture
+def fake_tesserocr(monkeypatch):
+    """
+    Install a fake tesserocr module.
+    """
+    FakeTessBaseAPI.created = 0
+    module = types.ModuleType("tesserocr")
+    module.PyTessBaseAPI = FakeTessBaseAPI
+    module.tesseract_version = lambda: "tesseract 5.3.0\n leptonica-1.82.0"
+    monkeypatch.setitem(sys.modules, "tesserocr", module)
+    return module
+
+
+def test_get_backend_is_shared_per_process():
+    """
+    The same backend is returned for the same options.
+    """
+    backend = get_backend(ProcessingConfig())
+    assert isinstance(backend, PytesseractBackend)
+    assert get_backend(ProcessingConfig(fast_path=False)) is backend
+
+
+def test_unknown_backend():
+    """
+    Asking for an engine that does not exist fails clearly.
+    """
+    with pytest.raises(ValueError, match="Unknown OCR backend"):
+        get_backend(ProcessingConfig(ocr_backend="nope"))
+
+
+def test_tesserocr_backend_pools_handles(fake_tesserocr):
+    """
+    Handles are created once and shared between threads without overlapping.
+    """
+    backend = TesserocrBackend(lang="eng", workers=2)
+    results: list[str] = []
+    threads = [
+        threading.Thread(target=lambda n=n: results.append(backend.image_to_string(f"image {n}"))) for n in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert FakeTessBaseAPI.created == 2
+    assert sorted(results) == sorted(f"text from image {n}" for n in range(8))
+    assert backend.identity() == "tesseract 5.3.0 eng"
+    backend.close()
+
+
+def test_processor_uses_selected_backend(fake_tesserocr, mocker):
+    """
+    The processors OCR through the backend chosen for the run.
+    """
+    image_to_string = mocker.patch("pytesseract.image_to_string")
+    config = ProcessingConfig(ocr_backend="tesserocr", ocr_lang="deu")
+
+    text = PNGProcessor(PNG_FILE, logger, config).process()
+
+    assert text[0].startswith("text from <PIL.PngImagePlugin.PngImageFile")
+    image_to_string.assert_not_called()
+
+
+def test_tesserocr_backend_reports_confidence(fake_tesserocr):
+    """
+    tesserocr reports the mean confidence of the same recognition pass, pytesseract does not.
+    """
+    assert TesserocrBackend(lang="eng").image_to_text("image") == ("text from image", 87.0)
+
+
+def backend_id(config: ProcessingConfig) -> int:
+    """
+    The identity of the backend a process gets for config.
+    """
+    return id(get_backend(config))
+
+
+def test_forked_workers_create_their_own_backend():
+    """
+    A forked worker creates its own OCR backend rather than using the one it inherited.
+    """
+    config = ProcessingConfig(ocr_backend="null")
+    inherited = get_backend(config)
+    assert get_backend(config) is inherited
+
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("fork")) as pool:
+        assert pool.submit(backend_id, config).result() != id(inherited)
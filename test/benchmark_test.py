@@ -0,0 +1,73 @@
+"""
+This module contains tests for the benchmark harness in documentanalysis.benchmark.
+The cases run in this process with the null OCR backend to keep the tests quick.
+"""
+
+from pathlib import Path
+
+import pytest
+
+from documentanalysis.benchmark import (
+    PDF_TARGETS,
+    PNG_TARGETS,
+    WRITER_TARGETS,
+    build_corpus,
+    cases,
+    reset_peak_rss,
+    run_case,
+)
+from documentanalysis.config import ProcessingConfig
+
+CONFIG = ProcessingConfig(ocr_backend="null")
+
+
+@pytest.fixture(scope="module")
+def corpus(tmp_path_factory) -> dict[str, Path]:
+    """
+    The synthetic corpus, built once for the module.
+    """
+    return build_corpus(tmp_path_factory.mktemp("corpus"))
+
+
+def test_build_corpus(corpus: dict[str, Path]):
+    """
+    Every kind of document is generated and every target gets a case.
+    """
+    assert set(corpus) == {"searchable", "scanned", "mixed", "small_images", "huge_raster", "clipping"}
+    assert all(path.exists() for path in corpus.values())
+    assert len(cases(corpus)) == 5 * len(PDF_TARGETS) + len(PNG_TARGETS) + len(WRITER_TARGETS)
+
+
+@pytest.mark.parametrize(
+    "target, case",
+    [("PDFProcessor.process", "scanned"), ("PNGProcessor.process", "clipping"), ("FileWriter.save", "searchable")],
+)
+def test_run_case_reports_throughput(corpus: dict[str, Path], target: str, case: str):
+    """
+    A case reports its throughput and memory as plain numbers.
+    """
+    result = run_case(target, str(corpus[case]), CONFIG)
+
+    assert result["target"] == target
+    assert result["case"] == case
+    assert result["pages"] > 0
+    assert result["seconds"] > 0
+    assert result["pages_per_sec"] > 0
+    assert result["mb_per_sec"] > 0
+    assert result["peak_rss_mb"] > 0
+    assert result["rss_growth_mb"] >= 0
+
+
+def test_peak_memory_is_the_cases_own(corpus: dict[str, Path]):
+    """
+    Peak memory is measured from the start of each case, not inherited from what the process did before, so the
+    huge raster reports a far larger peak than a small document run after it.
+    """
+    if reset_peak_rss() is None:
+        pytest.skip("the peak resident set size cannot be reset on this platform")
+    huge = run_case("PDFProcessor.process", str(corpus["huge_raster"]), CONFIG)
+    small = run_case("PDFProcessor.process", str(corpus["searchable"]), CONFIG)
+
+    assert huge["rss_growth_mb"] > 50
+    assert huge["rss_growth_mb"] > 10 * small["rss_growth_mb"]
+    assert huge["peak_rss_mb"] > small["peak_rss_mb"]
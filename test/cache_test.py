@@ -0,0 +1,148 @@
+"""
+This module contains tests for the OCRCache class from the documentanalysis.cache module
+and its use by the processors.
+"""
+
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pytest
+from pypdf.generic import ArrayObject, ByteStringObject, NameObject, NumberObject, StreamObject
+
+from documentanalysis.cache import OCRCache, get_cache
+from documentanalysis.config import ProcessingConfig
+from documentanalysis.processors import PDFProcessor, PNGProcessor, stream_image_bytes
+
+logger: logging.Logger = logging.getLogger(name=__name__)
+
+PNG_FILE = Path("test/test_files/Pasted image 20240209155743.png")
+SCANNED_PDF = Path("test/test_files/201100030.pdf")
+
+
+@pytest.fixture
+def image_to_string(mocker):
+    """
+    Replace tesseract with a stub.
+    """
+    mocker.patch("pytesseract.get_tesseract_version", return_value="5.3.0")
+    return mocker.patch("pytesseract.image_to_string", return_value="stub text")
+
+
+def test_cache_round_trip(tmp_path: Path):
+    """
+    A stored result is returned for the same image and engine only.
+    """
+    cache = OCRCache(tmp_path / "ocr.sqlite")
+    key = cache.key(b"image bytes", engine="tesseract 5.3.0")
+    assert cache.get(key) is None
+    cache.put(key, "some text")
+    assert cache.get(key) == "some text"
+    assert cache.get(cache.key(b"image bytes", engine="tesseract 5.4.0")) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_cache_evicts_least_recently_used(tmp_path: Path):
+    """
+    Going over max_bytes evicts the oldest results first.
+    """
+    cache = OCRCache(tmp_path / "ocr.sqlite", max_bytes=400)
+    keys = [cache.key(str(number).encode(), engine="e") for number in range(3)]
+    cache.put(keys[0], "a" * 100)
+    cache.put(keys[1], "b" * 100)
+    cache.get(keys[0])
+    cache.put(keys[2], "c" * 100)
+
+    assert cache.size() <= 400
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) == "a" * 100
+
+
+def test_cache_size_is_not_summed_on_every_insert(tmp_path: Path, mocker):
+    """
+    Inserts under the limit keep a running total instead of summing the table, which is still re-read now and then
+    to take in other processes' inserts.
+    """
+    mocker.patch("documentanalysis.cache.SIZE_CHECK_PUTS", 50)
+    cache = OCRCache(tmp_path / "ocr.sqlite")
+    size = mocker.spy(cache, "size")
+    for number in range(100):
+        cache.put(cache.key(str(number).encode(), engine="e"), "text")
+
+    assert size.call_count == 2
+
+
+def image_xobject(**entries) -> StreamObject:
+    """
+    An 8 bit image XObject of two by one pixels with the given extra entries.
+    """
+    stream = StreamObject()
+    stream.set_data(b"\x00\x01")
+    stream.update({NameObject("/Width"): NumberObject(2), NameObject("/Height"): NumberObject(1)})
+    stream[NameObject("/BitsPerComponent")] = NumberObject(8)
+    stream.update({NameObject(f"/{name}"): value for name, value in entries.items()})
+    return stream
+
+
+def palette(colors: bytes) -> ArrayObject:
+    """
+    An Indexed colorspace over RGB with the given palette.
+    """
+    return ArrayObject([NameObject("/Indexed"), NameObject("/DeviceRGB"), NumberObject(1), ByteStringObject(colors)])
+
+
+def test_pdf_image_keys_cover_how_the_image_decodes():
+    """
+    Images with the same stored bytes but a different palette, decode array or soft mask get different cache keys,
+    and identical images the same key.
+    """
+    mask = image_xobject(ColorSpace=NameObject("/DeviceGray"))
+    other_mask = image_xobject(ColorSpace=NameObject("/DeviceGray"))
+    other_mask.set_data(b"\xff\xff")
+    variants = [
+        image_xobject(ColorSpace=palette(b"\x00\x00\x00\xff\xff\xff")),
+        image_xobject(ColorSpace=palette(b"\xff\xff\xff\x00\x00\x00")),
+        image_xobject(ColorSpace=NameObject("/DeviceGray"), Decode=ArrayObject([NumberObject(1), NumberObject(0)])),
+        image_xobject(ColorSpace=NameObject("/DeviceGray"), SMask=mask),
+        image_xobject(ColorSpace=NameObject("/DeviceGray"), SMask=other_mask),
+        image_xobject(ColorSpace=NameObject("/DeviceGray"), Filter=NameObject("/RunLengthDecode")),
+        image_xobject(ColorSpace=NameObject("/DeviceGray")),
+    ]
+
+    keys = [stream_image_bytes(variant) for variant in variants]
+    assert len(set(keys)) == len(variants)
+    assert stream_image_bytes(image_xobject(ColorSpace=palette(b"\x00\x00\x00\xff\xff\xff"))) == keys[0]
+
+
+@pytest.mark.parametrize("processor, calls", [(PNGProcessor, 1), (PDFProcessor, 4)])
+def test_processor_uses_cache(tmp_path: Path, image_to_string, processor, calls: int):
+    """
+    Processing the same file twice only OCRs each image once.
+    """
+    config = ProcessingConfig(ocr_cache_path=str(tmp_path / "ocr.sqlite"))
+    path = PNG_FILE if processor is PNGProcessor else SCANNED_PDF
+
+    processor(path, logger, config).process()
+    processor(path, logger, config).process()
+
+    assert image_to_string.call_count == calls
+
+
+def cache_id(config: ProcessingConfig) -> int:
+    """
+    The identity of the cache a process gets for config.
+    """
+    return id(get_cache(config))
+
+
+def test_forked_workers_open_their_own_cache(tmp_path: Path):
+    """
+    A forked worker opens its own cache connection rather than using the one it inherited.
+    """
+    config = ProcessingConfig(ocr_cache_path=str(tmp_path / "ocr.sqlite"))
+    inherited = get_cache(config)
+    assert get_cache(config) is inherited
+
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("fork")) as pool:
+        assert pool.submit(cache_id, config).result() != id(inherited)
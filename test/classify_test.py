@@ -0,0 +1,50 @@
+"""
+This module contains tests for the page classifier in documentanalysis.classify
+and the searchable PDF fast path in PDFProcessor.
+"""
+
+import logging
+from pathlib import Path
+
+import fitz
+import pytest
+
+from documentanalysis.classify import BOTH, OCR, TEXT, classify_page
+from documentanalysis.config import ProcessingConfig
+from documentanalysis.processors import PDFProcessor
+
+logger: logging.Logger = logging.getLogger(name=__name__)
+
+SEARCHABLE_PDF = Path("test/test_files/AR Dec - Bluffs v01.pdf")
+SCANNED_PDF = Path("test/test_files/201100030.pdf")
+
+
+@pytest.mark.parametrize(
+    "path, config, strategy",
+    [
+        (SEARCHABLE_PDF, ProcessingConfig(), TEXT),
+        (SEARCHABLE_PDF, ProcessingConfig(fast_path=False), BOTH),
+        (SCANNED_PDF, ProcessingConfig(), OCR),
+    ],
+)
+def test_classify_page(path: Path, config: ProcessingConfig, strategy: str):
+    """
+    Searchable pages are extracted, scanned pages are OCR'd.
+    """
+    with fitz.open(path) as doc:
+        page = doc[0]
+        decision = classify_page(page, page.get_text(), config)
+    assert decision.strategy == strategy
+
+
+def test_searchable_pdf_skips_ocr(mocker):
+    """
+    A searchable PDF is not sent to tesseract and the decision is recorded per page.
+    """
+    image_to_string = mocker.patch("pytesseract.image_to_string", return_value="stub text")
+
+    record = PDFProcessor(SEARCHABLE_PDF, logger).process()
+
+    image_to_string.assert_not_called()
+    assert record.properties["page_strategies"] == {TEXT: 48}
+    assert all(page.strategy == TEXT and page.text for page in record.pages)
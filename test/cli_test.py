@@ -0,0 +1,186 @@
+"""
+This module contains tests for the batch command line interface in documentanalysis.cli.
+"""
+
+import json
+import logging
+import pickle
+import shutil
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from documentanalysis.cli import Writers, discover, main, output_name, parse_writer
+from documentanalysis.journal import FAILED
+from documentanalysis.store import FileWriter, ShardedFileWriter
+
+logger: logging.Logger = logging.getLogger(name=__name__)
+
+PDF_FILE = Path("test/test_files/201100030.pdf")
+PNG_FILE = Path("test/test_files/Pasted image 20240209155743.png")
+
+
+@pytest.fixture(name="corpus")
+def fixture_corpus(tmp_path: Path) -> Path:
+    """
+    A directory holding a PDF, a nested PNG and a file that is not a document.
+    """
+    shutil.copy(PDF_FILE, tmp_path / "plat.pdf")
+    (tmp_path / "nested").mkdir()
+    shutil.copy(PNG_FILE, tmp_path / "nested" / "clipping.png")
+    (tmp_path / "notes.txt").write_text("not a document", encoding="utf-8")
+    return tmp_path
+
+
+def test_parse_writer():
+    """
+    Writer specs split into kind and target, bad ones are rejected.
+    """
+    assert parse_writer("file:out/text") == ("file", "out/text")
+    assert parse_writer("mongo:mongodb://mongo:27017/hoa_docs/ccrs") == ("mongo", "mongodb://mongo:27017/hoa_docs/ccrs")
+    for spec in ["ftp:somewhere", "sqlite:", "mongo:mongodb://mongo:27017/hoa_docs"]:
+        with pytest.raises(ValueError):
+            parse_writer(spec)
+
+
+def test_discover(corpus: Path):
+    """
+    Directories contribute their documents, recursively when asked, and globs are expanded.
+    """
+    assert discover([str(corpus)]) == [corpus / "plat.pdf"]
+    assert discover([str(corpus)], recursive=True) == [corpus / "nested" / "clipping.png", corpus / "plat.pdf"]
+    assert discover([str(corpus / "**" / "*.png"), str(corpus / "plat.pdf")], recursive=True) == [
+        corpus / "nested" / "clipping.png",
+        corpus / "plat.pdf",
+    ]
+
+
+def test_writers_pickle_and_build(tmp_path: Path):
+    """
+    The writer factory survives pickling into a worker and builds one writer per spec.
+    """
+    writers = pickle.loads(pickle.dumps(Writers((f"file:{tmp_path}", f"shards:{tmp_path / 'shards'}"))))
+    built = writers(Path("some dir/plat 1.pdf"))
+    assert len(built) == 2
+    assert isinstance(built[0], FileWriter)
+    assert built[0].path == {"uri": str(tmp_path / output_name(Path("some dir/plat 1.pdf")))}
+    assert isinstance(built[1], ShardedFileWriter)
+    assert built[1] is writers(Path("other.pdf"))[1]
+
+
+def test_output_names_do_not_collide():
+    """
+    Inputs of the same name in different directories get different output files.
+    """
+    first, second = output_name(Path("a/plat.pdf")), output_name(Path("b/plat.pdf"))
+    assert first != second
+    assert first.startswith("plat-") and first.endswith(".txt")
+
+
+def test_dry_run_processes_nothing(corpus: Path, tmp_path: Path):
+    """
+    A dry run lists the documents with their page counts and writes nothing.
+    """
+    output = tmp_path / "output"
+    result = CliRunner().invoke(
+        main, [str(corpus), "-r", "--dry-run", "--no-manifest", "--writer", f"file:{output}"]
+    )
+    assert result.exit_code == 0, result.output
+    assert "2 files to process" in result.output
+    assert f"process\t{corpus / 'plat.pdf'}\t" in result.output
+    assert not output.exists()
+
+
+def test_run_writes_results(tmp_path: Path, mocker):
+    """
+    A run processes each input into the chosen writers.
+    """
+    mocker.patch("pytesseract.image_to_string", return_value="Lot 31 Block 2")
+    output = tmp_path / "output"
+    output.mkdir()
+    result = CliRunner().invoke(
+        main,
+        [
+            str(PNG_FILE), "--writer", f"file:{output}", "--workers", "1", "--no-manifest",
+            "--journal", str(tmp_path / "journal.jsonl"),
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    assert "1 of 1 files ok" in result.output
+    assert (output / output_name(PNG_FILE)).read_text(encoding="utf-8") == "Lot 31 Block 2"
+
+
+def test_failed_write_fails_the_run(tmp_path: Path, mocker):
+    """
+    A file whose results cannot be written is recorded as failed and the run exits with status 1.
+    """
+    mocker.patch("pytesseract.image_to_string", return_value="Lot 31 Block 2")
+    journal = tmp_path / "journal.jsonl"
+    result = CliRunner().invoke(
+        main,
+        [
+            str(PNG_FILE), "--writer", f"file:{tmp_path / 'missing'}", "--workers", "1", "--no-manifest",
+            "--journal", str(journal),
+        ],
+    )
+    assert result.exit_code == 1, result.output
+    assert "0 of 1 files ok" in result.output
+    last = json.loads(journal.read_text(encoding="utf-8").splitlines()[-1])
+    assert (last["state"], last["error_type"]) == (FAILED, "StoreWriteError")
+
+
+def test_rejects_bad_writer():
+    """
+    An invalid writer spec is a usage error.
+    """
+    result = CliRunner().invoke(main, [str(PNG_FILE), "--writer", "ftp:somewhere"])
+    assert result.exit_code == 2
+    assert "Invalid writer" in result.output
+
+
+def test_resume_skips_finished_files(tmp_path: Path, mocker):
+    """
+    A resumed run processes only the files the journal does not record as finished.
+    """
+    ocr = mocker.patch("pytesseract.image_to_string", return_value="Lot 31 Block 2")
+    arguments = [
+        str(PNG_FILE), "--writer", f"file:{tmp_path}", "--workers", "1", "--no-manifest",
+        "--journal", str(tmp_path / "journal.jsonl"),
+    ]
+    assert CliRunner().invoke(main, arguments).exit_code == 0
+    result = CliRunner().invoke(main, [*arguments, "--resume"])
+    assert result.exit_code == 0, result.output
+    assert "1 of 1 files ok" in result.output
+    assert ocr.call_count == 1
+
+
+def test_image_options_reach_the_config(tmp_path: Path, mocker):
+    """
+    The preprocessing, tiling and rendering options end up in the ProcessingConfig the run is given, and their
+    defaults leave the config's own.
+    """
+    ingestor = mocker.patch("documentanalysis.cli.BatchIngestor")
+    ingestor.return_value.run.return_value = []
+    arguments = [str(PNG_FILE), "--no-manifest", "--journal", str(tmp_path / "journal.jsonl")]
+
+    result = CliRunner().invoke(main, arguments)
+    assert result.exit_code == 0, result.output
+    defaults = ingestor.call_args.kwargs["config"]
+    result = CliRunner().invoke(
+        main,
+        [
+            *arguments, "--preprocess", "strip_color", "--preprocess", "deskew", "--preprocess-target-dpi", "200",
+            "--preprocess-color", "green", "--tile-mode", "grid", "--tile-min-pixels", "1000", "--tile-size", "512",
+            "--tile-overlap", "16", "--tile-workers", "3", "--render-colorspace", "rgb",
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    config = ingestor.call_args.kwargs["config"]
+
+    assert (defaults.preprocess, defaults.preprocess_colors, defaults.tile_mode) == ((), ("blue", "red"), "")
+    assert defaults.render_colorspace == "gray"
+    assert config.preprocess == ("strip_color", "deskew")
+    assert (config.preprocess_target_dpi, config.preprocess_colors) == (200, ("green",))
+    assert (config.tile_mode, config.tile_min_pixels, config.tile_size, config.tile_overlap) == ("grid", 1000, 512, 16)
+    assert (config.tile_workers, config.render_colorspace) == (3, "rgb")
@@ -0,0 +1,59 @@
+"""
+Fixtures shared by the test modules.
+
+OCR is replaced with a stub by stub_tesseract so the tests do not need a tesseract install. Tests that run processing
+in worker processes rely on the fork start method carrying that stub into the workers.
+"""
+
+import logging
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from documentanalysis.store import StoreWriter
+
+
+class ListWriter(StoreWriter):
+    """
+    Keeps everything it is asked to save.
+    """
+
+    def __init__(self) -> None:
+        self.saved: list[dict[str, Any]] = []
+
+    def save(self, obj: Any, logger: logging.Logger) -> bool:
+        self.saved.append(obj)
+        return True
+
+
+def discard_results(path: Path) -> list[StoreWriter]:
+    """
+    Writer factory that discards the results.
+    Module level so it pickles into worker processes.
+    """
+    return []
+
+
+@pytest.fixture
+def list_writer() -> ListWriter:
+    """
+    A writer that keeps what it is asked to save, in saved.
+    """
+    return ListWriter()
+
+
+@pytest.fixture
+def stub_tesseract(mocker):
+    """
+    Replace tesseract with a stub returning "stub text".
+    """
+    return mocker.patch("pytesseract.image_to_string", return_value="stub text")
+
+
+@pytest.fixture
+def no_writers():
+    """
+    A writer factory that discards the results.
+    """
+    return discard_results
@@ -0,0 +1,68 @@
+"""
+This module contains tests for decoding and OCR'ing each image repeated across the pages of a PDF once.
+"""
+
+import logging
+from pathlib import Path
+
+import fitz
+import pytest
+
+from documentanalysis.benchmark import png_bytes, text_raster
+from documentanalysis.png import PDFProcessorNew
+from documentanalysis.processors import PDFProcessor
+
+logger: logging.Logger = logging.getLogger(name=__name__)
+
+
+@pytest.fixture
+def seal_pdf(tmp_path: Path) -> Path:
+    """
+    Three pages that each show the same seal and a page specific image.
+    """
+    seal = png_bytes(text_raster(200, 100, 2))
+    path = tmp_path / "seals.pdf"
+    with fitz.open() as doc:
+        for page_number in range(3):
+            page = doc.new_page()
+            page.insert_image(fitz.Rect(36, 36, 236, 136), stream=seal)
+            body = png_bytes(text_raster(400, 300 + page_number, 4))
+            page.insert_image(fitz.Rect(36, 200, 436, 500), stream=body)
+        doc.save(path)
+    return path
+
+
+def test_repeated_images_are_ocrd_once(seal_pdf: Path, mocker):
+    """
+    The seal is OCR'd on its first page and referenced from the others.
+    """
+    image_to_string = mocker.patch("pytesseract.image_to_string", return_value="stub text")
+
+    pages = PDFProcessor(seal_pdf, logger).process().pages
+
+    assert image_to_string.call_count == 4
+    seals = [page.images[0] for page in pages]
+    assert not seals[0].duplicate
+    assert all(seal.duplicate for seal in seals[1:])
+    assert {seal.sha256 for seal in seals} == {seals[0].sha256}
+    assert {seal.xref for seal in seals} == {seals[0].xref}
+    assert all(seal.text == "stub text" for seal in seals)
+    assert len({page.images[1].sha256 for page in pages}) == 3
+
+
+def test_pdf_processor_new_decodes_each_image_once(seal_pdf: Path):
+    """
+    image_extraction yields one pixmap per unique image, on the first page it appears on, and the pages each appears
+    on.
+    """
+    processor = PDFProcessorNew(seal_pdf, logger)
+    pages = processor.image_extraction()
+    first = next(pages)
+    assert len(first) == 2
+    assert len(processor.image_refs) == 2
+    images = first + [image for page in pages for image in page]
+    processor.close()
+
+    assert len(images) == 4
+    assert all(isinstance(image, fitz.Pixmap) for image in images)
+    assert sorted(processor.image_refs.values()) == [[0], [0, 1, 2], [1], [2]]
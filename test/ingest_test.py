@@ -0,0 +1,288 @@
+"""
+This module contains tests for the BatchIngestor class from the documentanalysis.ingest module.
+
+OCR is replaced with the stub_tesseract fixture. The pool tests rely on the fork start method carrying that stub into
+the worker processes.
+"""
+
+import logging
+import os
+import shutil
+import signal
+import time
+from pathlib import Path
+
+import pytest
+
+from documentanalysis.ingest import DONE, FAILED, BatchIngestor, IngestResult, process_path
+from documentanalysis.journal import Journal
+from documentanalysis.store import FileWriter, QueuedWriter, StoreWriter
+
+logger: logging.Logger = logging.getLogger(name=__name__)
+
+PNG_FILE = Path("test/test_files/Pasted image 20240209155743.png")
+MISSING_PDF = Path("test/test_files/does not exist.pdf")
+
+pytestmark = pytest.mark.usefixtures("stub_tesseract")
+
+
+def misbehaving_writers(path: Path) -> list[StoreWriter]:
+    """
+    Writer factory that kills its process for files named crash, hangs for files named slow, and hangs where the
+    worker cannot interrupt it for files named stuck.
+    """
+    if path.stem == "crash":
+        os._exit(1)
+    if path.stem == "stuck":
+        signal.pthread_sigmask(signal.SIG_BLOCK, [signal.SIGALRM])
+    if path.stem in ("slow", "stuck"):
+        time.sleep(30)
+    return []
+
+
+def corpus(directory: Path, *names: str) -> list[Path]:
+    """
+    Copies of the PNG fixture with the given names.
+    """
+    paths = [directory / f"{name}.png" for name in names]
+    for path in paths:
+        shutil.copy(PNG_FILE, path)
+    return paths
+
+
+def test_process_path_records_failure(no_writers):
+    """
+    A file that cannot be opened is recorded as failed rather than raised.
+    """
+    result = process_path(MISSING_PDF, no_writers)
+    assert result.status == FAILED
+    assert result.error_type == "FileNotFoundError"
+    assert not result.ok
+
+
+class UnflushedWriter(StoreWriter):
+    """
+    Accepts every save and then fails to flush it.
+    """
+
+    def __init__(self) -> None:
+        pass
+
+    def save(self, obj, logger: logging.Logger) -> bool:
+        return True
+
+    def flush(self, logger: logging.Logger) -> bool:
+        return False
+
+
+def test_failed_writes_fail_the_file(tmp_path: Path):
+    """
+    A file whose results cannot be saved, or flushed, to its writers fails.
+    """
+    missing = FileWriter(auth={}, path={"uri": str(tmp_path / "missing" / "out.txt")})
+    result = process_path(PNG_FILE, lambda path: [missing])
+    assert result.status == FAILED
+    assert result.error_type == "StoreWriteError"
+
+    result = process_path(PNG_FILE, lambda path: [UnflushedWriter()])
+    assert result.status == FAILED
+    assert result.error_type == "StoreWriteError"
+
+
+def test_failed_queued_writes_fail_the_file(tmp_path: Path):
+    """
+    Writes a QueuedWriter gives up on in the background fail the file they belong to.
+    """
+    missing = FileWriter(auth={}, path={"uri": str(tmp_path / "missing" / "out.txt")})
+    queued = QueuedWriter(writer=missing, retries=1, backoff=0.01)
+
+    result = process_path(PNG_FILE, lambda path: [queued])
+
+    assert result.status == FAILED
+    assert result.error_type == "StoreWriteError"
+    assert queued.failed == 1
+    queued.close(logger=logger)
+
+
+class CountingWriter(StoreWriter):
+    """
+    Buffers what it is given and counts its flushes, failing them when told to.
+    """
+
+    def __init__(self, fail: bool = False) -> None:
+        self.path = {}
+        self.auth = {}
+        self.fail = fail
+        self.buffered: list = []
+        self.flushes = 0
+
+    def save(self, obj, logger: logging.Logger) -> bool:
+        self.buffered.append(obj)
+        return True
+
+    def flush(self, logger: logging.Logger) -> bool:
+        self.flushes += 1
+        if self.fail:
+            return False
+        self.buffered.clear()
+        return True
+
+    def discard(self, logger: logging.Logger) -> int:
+        dropped, self.buffered = len(self.buffered), []
+        return dropped
+
+
+def test_writes_are_confirmed_in_groups(tmp_path: Path):
+    """
+    A shared writer is flushed once per group of files, from the QueuedWriter's thread, rather than once per file.
+    """
+    counting = CountingWriter()
+    queued = QueuedWriter(writer=counting)
+    ingestor = BatchIngestor(writers_for=lambda path: [queued], logger=logger, workers=1, confirm_every=3)
+
+    results = ingestor.run(corpus(tmp_path, "a", "b", "c", "d"))
+
+    assert sorted(result.status for result in results) == [DONE] * 4
+    # One flush for each group of three and one as the writer is closed at the end of the run.
+    assert counting.flushes == 3
+    assert not counting.buffered
+
+
+def test_failed_confirmation_fails_its_group(tmp_path: Path):
+    """
+    Every file confirmed with a writer that fails to flush fails, and the journal records none of them DONE.
+    """
+    journal = Journal(tmp_path / "journal.jsonl", "v")
+    paths = corpus(tmp_path, "a", "b")
+    counting = CountingWriter(fail=True)
+    ingestor = BatchIngestor(
+        writers_for=lambda path: [counting], logger=logger, workers=1, journal=journal, confirm_every=2
+    )
+
+    results = ingestor.run(paths)
+
+    assert [result.error_type for result in results] == ["StoreWriteError"] * 2
+    assert counting.flushes == 1
+    assert not counting.buffered
+    journal = Journal(tmp_path / "journal.jsonl", "v", resume=True)
+    assert [journal.entry(path).state for path in paths] == [FAILED, FAILED]
+
+
+_SHARED: list[StoreWriter] = []
+
+
+def shared_file_writer(path: Path) -> list[StoreWriter]:
+    """
+    Writer factory giving each worker process one QueuedWriter, appending each document's path to a file named after
+    the process.
+    """
+    if not _SHARED:
+        _SHARED.append(QueuedWriter(writer=AppendingWriter(path.parent / f"written.{os.getpid()}")))
+    return _SHARED
+
+
+class AppendingWriter(CountingWriter):
+    """
+    Appends the path of each document to a file when it is flushed.
+    """
+
+    def __init__(self, target: Path) -> None:
+        super().__init__()
+        self.target = target
+
+    def flush(self, logger: logging.Logger) -> bool:
+        with open(self.target, "a", encoding="utf-8") as file:
+            file.writelines(f"{document.path}\n" for document in self.buffered)
+        return super().flush(logger)
+
+
+def test_pool_workers_confirm_on_exit(tmp_path: Path):
+    """
+    Files a worker has not confirmed when the batch ends are confirmed as it exits, and only then reported DONE.
+    """
+    paths = corpus(tmp_path, "a", "b", "c", "d")
+    ingestor = BatchIngestor(writers_for=shared_file_writer, logger=logger, workers=2, confirm_every=100)
+
+    results = ingestor.run(paths)
+
+    assert sorted(result.status for result in results) == [DONE] * 4
+    written = [line for file in tmp_path.glob("written.*") for line in file.read_text(encoding="utf-8").split()]
+    assert sorted(written) == sorted(str(path) for path in paths)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_batch_ingestor(workers: int, no_writers):
+    """
+    Every file gets a result, failures do not stop the batch.
+    """
+    ingestor = BatchIngestor(writers_for=no_writers, logger=logger, workers=workers, max_in_flight=1)
+    results = ingestor.run([PNG_FILE, MISSING_PDF, PNG_FILE])
+
+    assert all(isinstance(result, IngestResult) for result in results)
+    assert len(results) == 3
+    assert sorted(result.status for result in results) == [DONE, DONE, FAILED]
+    assert [result.path for result in results if not result.ok] == [str(MISSING_PDF)]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_timeout_fails_the_slow_file(tmp_path: Path, workers: int):
+    """
+    A file that runs past the timeout fails with DocumentTimeoutError and the rest are processed.
+    """
+    ingestor = BatchIngestor(writers_for=misbehaving_writers, logger=logger, workers=workers, timeout=0.5)
+    results = {Path(result.path).stem: result for result in ingestor.run(corpus(tmp_path, "ok", "slow", "fine"))}
+
+    assert results["slow"].status == FAILED
+    assert results["slow"].error_type == "DocumentTimeoutError"
+    assert results["ok"].status == results["fine"].status == DONE
+
+
+def test_stuck_worker_is_killed(tmp_path: Path):
+    """
+    A worker that ignores the timeout is killed, and the files that were in flight with it are run again.
+    """
+    ingestor = BatchIngestor(
+        writers_for=misbehaving_writers, logger=logger, workers=2, timeout=0.25, timeout_grace=0.5
+    )
+    results = {Path(result.path).stem: result for result in ingestor.run(corpus(tmp_path, "stuck", "ok", "fine"))}
+
+    assert results["stuck"].error_type == "DocumentTimeoutError"
+    assert results["ok"].status == results["fine"].status == DONE
+
+
+def test_worker_crash_is_isolated(tmp_path: Path):
+    """
+    A file that kills its worker fails with WorkerCrashError, the files in flight with it are still processed.
+    """
+    ingestor = BatchIngestor(writers_for=misbehaving_writers, logger=logger, workers=2)
+    results = {
+        Path(result.path).stem: result for result in ingestor.run(corpus(tmp_path, "ok", "crash", "fine", "good"))
+    }
+
+    assert results["crash"].status == FAILED
+    assert results["crash"].error_type == "WorkerCrashError"
+    assert [results[name].status for name in ("ok", "fine", "good")] == [DONE, DONE, DONE]
+
+
+def test_journal_resume(tmp_path: Path, no_writers):
+    """
+    Every file's state is journaled, and a resumed run skips the files that finished.
+    """
+    paths = corpus(tmp_path, "ok", "crash")
+    journal_path = tmp_path / "journal.jsonl"
+    BatchIngestor(writers_for=misbehaving_writers, logger=logger, workers=2, journal=Journal(journal_path, "v")).run(
+        paths
+    )
+    journal = Journal(journal_path, "v", resume=True)
+    assert journal.entry(paths[0]).state == DONE
+    assert journal.entry(paths[1]).error_type == "WorkerCrashError"
+
+    results = BatchIngestor(writers_for=no_writers, logger=logger, workers=1, journal=journal).run(paths)
+    assert [(result.status, result.seconds) for result in results] == [(DONE, 0.0), (FAILED, 0.0)]
+
+    journal = Journal(journal_path, "v", resume=True)
+    results = BatchIngestor(
+        writers_for=no_writers, logger=logger, workers=1, journal=journal, retry_failed=True
+    ).run(paths)
+    assert [result.status for result in results] == [DONE, DONE]
+    assert results[1].seconds > 0
@@ -0,0 +1,62 @@
+"""
+This module contains tests for the Journal class from the documentanalysis.journal module.
+"""
+
+from pathlib import Path
+
+import pytest
+
+from documentanalysis.journal import DONE, FAILED, PENDING, Journal
+
+
+def test_journal_resume(tmp_path: Path):
+    """
+    A resumed journal knows the last state of every file; a new one starts empty.
+    """
+    path = tmp_path / "journal.jsonl"
+    journal = Journal(path, version="1:abc")
+    journal.record("a.pdf", PENDING)
+    journal.record("a.pdf", DONE)
+    journal.record("b.pdf", PENDING)
+    journal.record("c.pdf", FAILED, "DocumentTimeoutError", "Processing took longer than 60s")
+    journal.close()
+
+    resumed = Journal(path, version="1:abc", resume=True)
+    assert resumed.finished("a.pdf")
+    assert not resumed.finished("b.pdf")
+    assert resumed.finished("c.pdf")
+    assert not resumed.finished("c.pdf", retry_failed=True)
+    assert resumed.entry("c.pdf").error_type == "DocumentTimeoutError"
+    assert resumed.counts() == {DONE: 1, PENDING: 1, FAILED: 1}
+
+    assert Journal(path, version="1:abc").entries == {}
+
+
+def test_journal_ignores_torn_line(tmp_path: Path):
+    """
+    A line cut short by a crash is ignored, and the journal can still be added to.
+    """
+    path = tmp_path / "journal.jsonl"
+    journal = Journal(path, version="1:abc")
+    journal.record("a.pdf", DONE)
+    journal.close()
+    with open(path, "a", encoding="utf-8") as file:
+        file.write('{"path": "b.pdf", "sta')
+
+    resumed = Journal(path, version="1:abc", resume=True)
+    assert not resumed.finished("b.pdf")
+    resumed.record("b.pdf", DONE)
+    resumed.close()
+    assert Journal(path, version="1:abc", resume=True).finished("b.pdf")
+
+
+def test_journal_rejects_other_version(tmp_path: Path):
+    """
+    A journal written under other processor options cannot be resumed.
+    """
+    path = tmp_path / "journal.jsonl"
+    journal = Journal(path, version="1:abc")
+    journal.record("a.pdf", DONE)
+    journal.close()
+    with pytest.raises(ValueError):
+        Journal(path, version="1:def", resume=True)
@@ -0,0 +1,87 @@
+"""
+This module contains tests for the Manifest class from the documentanalysis.manifest module
+and incremental runs of the BatchIngestor.
+"""
+
+import logging
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+
+from documentanalysis.config import ProcessingConfig
+from documentanalysis.ingest import DONE, FAILED, SKIPPED, BatchIngestor
+from documentanalysis.manifest import Manifest
+from documentanalysis.store import FileWriter, StoreWriter
+
+logger: logging.Logger = logging.getLogger(name=__name__)
+
+PNG_FILE = Path("test/test_files/Pasted image 20240209155743.png")
+
+
+def test_manifest_detects_changes(tmp_path: Path):
+    """
+    Only new, modified or re-versioned files count as changed.
+    """
+    file = tmp_path / "doc.txt"
+    file.write_text("first")
+    manifest = Manifest(tmp_path / "manifest.json", version="1:a")
+    assert manifest.changed(file)
+
+    manifest.record(file)
+    manifest.save()
+    reloaded = Manifest(tmp_path / "manifest.json", version="1:a")
+    assert not reloaded.changed(file)
+
+    stat = os.stat(file)
+    os.utime(file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert not reloaded.changed(file)
+
+    file.write_text("second")
+    assert reloaded.changed(file)
+    assert Manifest(tmp_path / "manifest.json", version="2:a").changed(tmp_path / "doc.txt")
+
+
+def test_fingerprint_ignores_speed_options():
+    """
+    Cache settings do not change what a run produces, other options do.
+    """
+    assert ProcessingConfig().fingerprint() == ProcessingConfig(ocr_cache_path="ocr.sqlite").fingerprint()
+    assert ProcessingConfig().fingerprint() != ProcessingConfig(fast_path=False).fingerprint()
+    assert ProcessingConfig().fingerprint() != ProcessingConfig(writers=("sqlite:plats.db",)).fingerprint()
+
+
+@pytest.mark.usefixtures("stub_tesseract")
+def test_failed_writes_are_not_recorded(tmp_path: Path):
+    """
+    A file whose results could not be written is processed again by the next run.
+    """
+    png = tmp_path / "image.png"
+    shutil.copy(PNG_FILE, png)
+
+    def missing_directory(path: Path) -> list[StoreWriter]:
+        return [FileWriter(auth={}, path={"uri": str(tmp_path / "missing" / "image.txt")})]
+
+    manifest = Manifest(tmp_path / "manifest.json", version=ProcessingConfig().fingerprint())
+    ingestor = BatchIngestor(writers_for=missing_directory, logger=logger, workers=1, manifest=manifest)
+    assert [result.status for result in ingestor.run([png])] == [FAILED]
+    assert Manifest(tmp_path / "manifest.json", version=ProcessingConfig().fingerprint()).changed(png)
+
+
+def test_ingestor_skips_unchanged(tmp_path: Path, stub_tesseract, no_writers):
+    """
+    A second run over the same files skips them.
+    """
+    png = tmp_path / "image.png"
+    shutil.copy(PNG_FILE, png)
+
+    def run() -> list[str]:
+        manifest = Manifest(tmp_path / "manifest.json", version=ProcessingConfig().fingerprint())
+        ingestor = BatchIngestor(writers_for=no_writers, logger=logger, workers=1, manifest=manifest)
+        return [result.status for result in ingestor.run([png])]
+
+    assert run() == [DONE]
+    assert stub_tesseract.call_count == 1
+    assert run() == [SKIPPED]
+    assert stub_tesseract.call_count == 1
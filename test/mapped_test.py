@@ -0,0 +1,108 @@
+"""
+This module contains tests for MappedFile and for the processors reading their input through it.
+"""
+
+import logging
+from pathlib import Path
+
+import fitz
+import pytest
+from pypdf import PageObject  # pylint: disable=import-error
+
+from documentanalysis import processors
+from documentanalysis.hashing import file_sha256
+from documentanalysis.mapped import MappedFile
+from documentanalysis.processors import PDFProcessor, PNGProcessor
+from documentanalysis.session import PDFSession
+
+logger: logging.Logger = logging.getLogger(name=__name__)
+
+SCANNED_PDF = Path("test/test_files/201100030.pdf")
+PNG_FILE = Path("test/test_files/Pasted image 20240209155743.png")
+
+
+def test_view_and_stream_read_the_file():
+    """
+    The view and the stream both give the file's bytes.
+    """
+    data = PNG_FILE.read_bytes()
+    with MappedFile(PNG_FILE) as mapped:
+        assert len(mapped) == len(data)
+        view = mapped.view
+        assert view.readonly
+        assert view[:8] == data[:8]
+        view.release()
+        mapped.stream.seek(0)
+        assert mapped.stream.read() == data
+
+
+def test_map_is_not_closed_under_a_view():
+    """
+    A map cannot be unmapped while a view of it is alive, and nothing can be read from it once it is.
+    """
+    mapped = MappedFile(PNG_FILE)
+    view = mapped.view
+    with pytest.raises(BufferError):
+        mapped.close()
+    view.release()
+    mapped.close()
+    with pytest.raises(ValueError):
+        mapped.view  # pylint: disable=pointless-statement
+
+
+def test_empty_file(tmp_path):
+    """
+    Empty files cannot be mapped, they are given an empty view and stream.
+    """
+    empty = tmp_path / "empty.pdf"
+    empty.touch()
+    with MappedFile(empty) as mapped:
+        assert len(mapped) == 0
+        assert mapped.view.tobytes() == b""
+        assert mapped.stream.read() == b""
+    assert file_sha256(empty) == file_sha256(Path("test/test.txt"))
+
+
+def test_session_reads_through_the_map(mocker):
+    """
+    PyMuPDF and pypdf read the same map, and it is unmapped when the session closes.
+    """
+    fitz_open = mocker.patch("documentanalysis.session.fitz.open", wraps=fitz.open)
+    with PDFSession(SCANNED_PDF, logger) as session:
+        assert session.page_count == len(session.reader.pages) == 4
+        mapped = session.mapped
+        assert isinstance(fitz_open.call_args.kwargs["stream"], memoryview)
+        # The mock's record of the call holds a view too.
+        fitz_open.reset_mock()
+    assert mapped._closed  # pylint: disable=protected-access
+    assert session._mapped is None  # pylint: disable=protected-access
+
+
+def test_pdf_images_are_decoded_once(mocker):
+    """
+    Images are OCR'd from the raster pypdf decoded, not decoded again from a re-encode.
+    """
+    mocker.patch("pytesseract.image_to_string", return_value="stub text")
+    decoded = mocker.spy(PageObject, "_get_image")
+    ocr = mocker.spy(processors, "image_to_string")
+
+    record = PDFProcessor(SCANNED_PDF, logger).process()
+
+    assert ocr.call_count == len(record.pages)
+    rasters = [image.image for image in decoded.spy_return_list]
+    assert all(any(call.args[0] is raster for raster in rasters) for call in ocr.call_args_list)
+    assert record.pages[0].images[0].text == "stub text"
+
+
+def test_png_is_read_from_the_map(mocker):
+    """
+    A PNG is decoded from the map rather than a copy of the file.
+    """
+    mocker.patch("pytesseract.image_to_string", return_value="stub text")
+    read_bytes = mocker.spy(Path, "read_bytes")
+
+    processor = PNGProcessor(PNG_FILE, logger)
+
+    assert processor.process() == ["stub text"]
+    assert processor.metadata["bytes"] == PNG_FILE.stat().st_size
+    read_bytes.assert_not_called()
@@ -0,0 +1,112 @@
+"""
+This module contains tests for the per stage metrics in documentanalysis.metrics
+and their collection by the batch ingestion engine.
+"""
+
+import json
+import logging
+from pathlib import Path
+
+import pytest
+
+from documentanalysis.config import ProcessingConfig
+from documentanalysis.ingest import BatchIngestor
+from documentanalysis.metrics import METRICS, Metrics
+from documentanalysis.store import FileWriter, StoreWriter
+
+logger: logging.Logger = logging.getLogger(name=__name__)
+
+SCANNED_PDF = Path("test/test_files/201100030.pdf")
+PNG_FILE = Path("test/test_files/Pasted image 20240209155743.png")
+
+
+def file_writers(path: Path) -> list[StoreWriter]:
+    """
+    Write each document's text next to the metrics.
+    """
+    return [FileWriter(auth={}, path={"uri": f"/tmp/metrics_test_{path.stem}.txt"})]
+
+
+pytestmark = pytest.mark.usefixtures("stub_tesseract")
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    """
+    Leave the shared metrics as they were found.
+    """
+    yield
+    METRICS.enabled = False
+    METRICS.reset()
+
+
+def test_disabled_metrics_record_nothing():
+    """
+    With metrics off, stages are a shared no-op.
+    """
+    metrics = Metrics()
+    with metrics.document("a.pdf"), metrics.stage("ocr", bytes=10) as stage:
+        stage.add(errors=1)
+
+    assert metrics.documents == []
+    assert metrics.summary()["stages"] == {}
+
+
+def test_stages_accumulate_per_document(tmp_path: Path):
+    """
+    Passes through a stage add up within a document and across documents in the summary.
+    """
+    metrics = Metrics()
+    metrics.enabled = True
+    for name in ("a.pdf", "b.pdf"):
+        with metrics.document(name):
+            for _ in range(2):
+                with metrics.stage("ocr", images=1, bytes=100):
+                    pass
+    with pytest.raises(RuntimeError):
+        with metrics.document("c.pdf"), metrics.stage("ocr", images=1):
+            raise RuntimeError("boom")
+
+    assert metrics.documents[0]["stages"]["ocr"]["calls"] == 2
+    assert metrics.documents[0]["stages"]["ocr"]["bytes"] == 200
+    summary = metrics.summary()
+    assert summary["documents"] == 3
+    assert summary["stages"]["ocr"]["calls"] == 5
+    assert summary["stages"]["ocr"]["images"] == 5
+    assert summary["stages"]["ocr"]["errors"] == 1
+
+    metrics.export(tmp_path / "metrics.json")
+    report = json.loads((tmp_path / "metrics.json").read_text(encoding="utf-8"))
+    assert [document["path"] for document in report["documents"]] == ["a.pdf", "b.pdf", "c.pdf"]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_batch_exports_stage_metrics(tmp_path: Path, workers: int):
+    """
+    A batch with metrics_path set exports the stages of every file, whichever process handled it.
+    """
+    metrics_path = tmp_path / "metrics.json"
+    config = ProcessingConfig(metrics_path=str(metrics_path))
+    ingestor = BatchIngestor(writers_for=file_writers, logger=logger, workers=workers, config=config)
+
+    results = ingestor.run([SCANNED_PDF, PNG_FILE])
+
+    assert all(len(result.metrics) == 1 for result in results)
+    report = json.loads(metrics_path.read_text(encoding="utf-8"))
+    stages = report["summary"]["stages"]
+    assert report["summary"]["documents"] == 2
+    assert stages["process_file"]["calls"] == 2
+    assert stages["pdf_text"]["pages"] == 4
+    pdf_stages = next(document for document in report["documents"] if document["path"] == str(SCANNED_PDF))["stages"]
+    assert pdf_stages["ocr"]["images"] == 4
+    assert pdf_stages["pdf_images"]["images"] == 4
+    assert stages["ocr"]["images"] == 5
+    assert stages["png_process"]["pages"] == 1
+    assert stages["save.FileWriter"]["calls"] >= 2
+
+
+def test_metrics_do_not_change_the_fingerprint():
+    """
+    Turning metrics on does not force files to be reprocessed.
+    """
+    assert ProcessingConfig(metrics_path="m.json").fingerprint() == ProcessingConfig().fingerprint()
@@ -0,0 +1,97 @@
+"""
+This module contains tests for the batched MongoWriter in documentanalysis.store,
+run against mongomock in place of a mongod.
+"""
+
+from logging import Logger
+
+import pytest
+from pymongo.errors import AutoReconnect
+
+from documentanalysis.store import MongoWriter, close_all_writers
+
+mongomock = pytest.importorskip("mongomock")
+
+PATH: dict[str, str] = {"host": "mongodb://mongo:27017/", "dbname": "mydatabase", "collection": "customers"}
+AUTH: dict[str, str] = {"username": "user", "password": "password"}
+PDF_FILE = "test/test_files/201600225.pdf"
+
+logger = Logger("test")
+
+
+@pytest.fixture(autouse=True)
+def mock_mongo(mocker):
+    """
+    Replace pymongo's client with mongomock's.
+    """
+    mocker.patch("pymongo.MongoClient", mongomock.MongoClient)
+
+
+def test_mongo_writer_buffers_until_batch_size():
+    """
+    Nothing is written until batch_size documents are waiting, and one client is used throughout.
+    """
+    writer = MongoWriter(path=PATH, auth=AUTH, batch_size=3, flush_interval=60, upsert=False)
+    writer.save({"file": "a.png", "text": "a"}, logger=logger)
+    writer.save({"file": "b.png", "text": "b"}, logger=logger)
+    client = writer.client
+    assert writer.collection.count_documents({}) == 0
+
+    writer.save({"file": "c.png", "text": "c"}, logger=logger)
+    assert writer.collection.count_documents({}) == 3
+    assert writer.client is client
+
+
+def test_mongo_writer_upsert_is_idempotent():
+    """
+    Saving the same file twice keeps a single record.
+    """
+    writer = MongoWriter(path=PATH, auth=AUTH, batch_size=10, flush_interval=60)
+    for text in ("first run", "second run"):
+        writer.save({"path": PDF_FILE, "text": text}, logger=logger)
+        writer.flush(logger=logger)
+
+    records = list(writer.collection.find({"path": PDF_FILE}))
+    assert len(records) == 1
+    assert records[0]["text"] == "second run"
+    assert len(records[0]["content_hash"]) == 64
+
+
+def test_close_all_writers_flushes(mocker):
+    """
+    Closing connects and writes anything still buffered, even when nothing has been written yet, and drops the client.
+    """
+    server = mongomock.MongoClient()
+    mocker.patch("pymongo.MongoClient", return_value=server)
+    writer = MongoWriter(path=PATH, auth=AUTH, batch_size=10, flush_interval=60)
+    writer.save({"file": "a.png", "text": "a"}, logger=logger)
+    assert writer._client is None  # pylint: disable=protected-access
+
+    close_all_writers(logger)
+
+    assert server[PATH["dbname"]][PATH["collection"]].count_documents({}) == 1
+    assert writer._client is None  # pylint: disable=protected-access
+
+
+def test_failed_flush_keeps_the_buffer(mocker):
+    """
+    Documents stay buffered when a bulk write fails and are written by the next flush.
+    """
+    writer = MongoWriter(path=PATH, auth=AUTH, batch_size=10, flush_interval=60)
+    writer.save({"path": PDF_FILE, "text": "a"}, logger=logger)
+    writer.save({"file": "b.png", "text": "b"}, logger=logger)
+    real_bulk_write = mongomock.Collection.bulk_write
+
+    def bulk_write(collection, requests, **kwargs):
+        if bulk_write_mock.call_count == 1:
+            raise AutoReconnect("connection reset")
+        return real_bulk_write(collection, requests, **kwargs)
+
+    bulk_write_mock = mocker.patch.object(mongomock.Collection, "bulk_write", autospec=True, side_effect=bulk_write)
+
+    assert not writer.flush(logger=logger)
+    assert writer.collection.count_documents({}) == 0
+
+    assert writer.flush(logger=logger)
+    assert writer.collection.count_documents({}) == 2
+    assert not writer._buffer  # pylint: disable=protected-access
@@ -0,0 +1,124 @@
+"""
+This module contains tests for splitting a PDF into page ranges handled by page worker processes.
+
+Page workers start from a fork server, so mocks made in the test process do not reach them; the tests use the null
+OCR backend instead of a stub.
+"""
+
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+from pathlib import Path
+from typing import Any, Callable
+
+import pytest
+
+from documentanalysis.config import ProcessingConfig
+from documentanalysis.errors import DocumentTimeoutError
+from documentanalysis.metrics import METRICS
+from documentanalysis.processors import PDFProcessor, page_ranges
+from documentanalysis.results import PageRecord
+
+logger: logging.Logger = logging.getLogger(name=__name__)
+
+SCANNED_PDF = Path("test/test_files/201100030.pdf")
+
+
+def without_timings(pages: list[PageRecord]) -> list[PageRecord]:
+    """
+    The page records without their timings, which differ between runs.
+    """
+    return [replace(page, timings={}) for page in pages]
+
+
+@pytest.mark.parametrize(
+    "page_count, parts, expected",
+    [
+        (10, 4, [range(0, 3), range(3, 6), range(6, 8), range(8, 10)]),
+        (3, 8, [range(0, 1), range(1, 2), range(2, 3)]),
+        (0, 2, [range(0, 0)]),
+    ],
+)
+def test_page_ranges(page_count: int, parts: int, expected: list[range]):
+    """
+    Pages are split into contiguous ranges of near equal length, in order.
+    """
+    assert page_ranges(page_count, parts) == expected
+
+
+def test_parallel_pages_match_serial():
+    """
+    Page workers produce the same page records, in the same order, as processing the pages in process.
+    """
+    serial = PDFProcessor(SCANNED_PDF, logger, ProcessingConfig(ocr_backend="null")).process()
+    config = ProcessingConfig(ocr_backend="null", page_workers=2, page_parallel_min_pages=2)
+    parallel = PDFProcessor(SCANNED_PDF, logger, config).process()
+
+    assert [page.page for page in parallel.pages] == [0, 1, 2, 3]
+    assert without_timings(parallel.pages) == without_timings(serial.pages)
+    assert parallel.properties["page_strategies"] == serial.properties["page_strategies"]
+
+
+def test_parallel_pages_report_metrics():
+    """
+    Stages run in the page workers are added to the document's metrics.
+    """
+    config = ProcessingConfig(ocr_backend="null", page_workers=2, page_parallel_min_pages=2, metrics_path="unused.json")
+    METRICS.reset()
+    METRICS.enabled = True
+    try:
+        with METRICS.document(SCANNED_PDF):
+            PDFProcessor(SCANNED_PDF, logger, config).process()
+        stages = METRICS.pop_documents()[0]["stages"]
+    finally:
+        METRICS.enabled = False
+        METRICS.reset()
+
+    assert stages["pdf_text"]["calls"] == 4
+    assert stages["pdf_text"]["pages"] == 4
+    assert stages["ocr"]["calls"] >= 4
+
+
+def slow_after_the_first(function: Callable[..., Any], path: Path, pages: range, config: ProcessingConfig) -> Any:
+    """
+    Run a page range, taking a minute over every range but the first.
+    """
+    if pages.start:
+        time.sleep(60)
+    return function(path, pages, config)
+
+
+def test_interrupted_documents_stop_their_page_workers(mocker):
+    """
+    A timeout raised while the pages are being collected terminates the page workers instead of waiting for them.
+    """
+    pools: list[ProcessPoolExecutor] = []
+
+    class SlowPool(ProcessPoolExecutor):
+        """
+        A pool whose ranges after the first take a minute.
+        """
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            pools.append(self)
+
+        def submit(self, fn, /, *args, **kwargs):
+            return super().submit(slow_after_the_first, fn, *args, **kwargs)
+
+    mocker.patch("documentanalysis.processors.ProcessPoolExecutor", SlowPool)
+    config = ProcessingConfig(ocr_backend="null", page_workers=2, page_parallel_min_pages=2)
+    pages = PDFProcessor(SCANNED_PDF, logger, config).stream()
+
+    assert next(pages).page == 0
+    processes = list(pools[0]._processes.values())  # pylint: disable=protected-access
+    assert pools[0]._mp_context.get_start_method() == "forkserver"  # pylint: disable=protected-access
+    started = time.monotonic()
+    with pytest.raises(DocumentTimeoutError):
+        pages.throw(DocumentTimeoutError("Processing took longer than 1s", SCANNED_PDF))
+    for process in processes:
+        process.join(timeout=10)
+
+    assert time.monotonic() - started < 10
+    assert not any(process.is_alive() for process in processes)
@@ -0,0 +1,49 @@
+"""
+This module contains tests for PNGProcessor and the memoized ImageResult it produces.
+"""
+
+import logging
+from pathlib import Path
+
+from documentanalysis.ocr import Document
+from documentanalysis.processors import ImageResult, PNGProcessor
+
+logger: logging.Logger = logging.getLogger(name=__name__)
+
+PNG_FILE = Path("test/test_files/Pasted image 20240209155743.png")
+
+
+def test_result_is_computed_once(stub_tesseract):
+    """
+    The image is OCR'd once however many times the result is read.
+    """
+    processor = PNGProcessor(PNG_FILE, logger)
+
+    assert processor.process() == ["stub text"]
+    assert processor.process() == ["stub text"]
+    result = processor.result
+    assert isinstance(result, ImageResult)
+    assert result.text == "stub text"
+    assert result.confidence is None
+    assert processor.metadata["format"] == "PNG"
+    assert processor.metadata["width"] > 0
+    assert processor.metadata["bytes"] == PNG_FILE.stat().st_size
+    assert stub_tesseract.call_count == 1
+
+
+def test_document_ocrs_png_once(stub_tesseract, list_writer):
+    """
+    Document writes the text of a PNG with its metadata, OCR'ing it once. The text is kept on the image only.
+    """
+    writer = list_writer
+
+    Document(location=PNG_FILE, logger=logger, writers=[writer])
+
+    assert stub_tesseract.call_count == 1
+    (saved,) = writer.saved
+    assert saved.path == str(PNG_FILE)
+    assert saved.text == "stub text"
+    assert saved.properties["format"] == "PNG"
+    assert saved.pages[0].images[0].confidence is None
+    assert "text" not in saved.properties
+    assert "text" not in saved.as_dict()
@@ -0,0 +1,109 @@
+"""
+This module contains tests for the OpenCV preprocessing steps in documentanalysis.preprocess
+and for their place between image extraction and OCR.
+"""
+
+import logging
+from pathlib import Path
+
+import cv2 as cv
+import numpy as np
+import pytest
+from PIL import Image
+
+from documentanalysis.benchmark import text_raster
+from documentanalysis.config import ProcessingConfig
+from documentanalysis.preprocess import deskew, deskew_angle, downscale, identity, preprocess, strip_color
+from documentanalysis.processors import PNGProcessor
+
+logger: logging.Logger = logging.getLogger(name=__name__)
+
+PNG_FILE = Path("test/test_files/Pasted image 20240209155743.png")
+
+
+def rotated(array: np.ndarray, degrees: float) -> np.ndarray:
+    """
+    array rotated counter-clockwise on a white background.
+    """
+    height, width = array.shape[:2]
+    matrix = cv.getRotationMatrix2D((width / 2, height / 2), degrees, 1.0)
+    return cv.warpAffine(array, matrix, (width, height), borderValue=255)
+
+
+def test_strip_color_keeps_black_ink():
+    """
+    Blue and red pixels turn white, black and grey pixels are kept.
+    """
+    rgb = np.array([[[0, 0, 255], [255, 0, 0], [0, 0, 0], [128, 128, 128], [0, 160, 0]]], dtype=np.uint8)
+
+    stripped = strip_color(rgb, ("blue", "red"))
+
+    assert stripped[0].tolist() == [[255, 255, 255], [255, 255, 255], [0, 0, 0], [128, 128, 128], [0, 160, 0]]
+    with pytest.raises(ValueError, match="Unknown colour"):
+        strip_color(rgb, ("purple",))
+
+
+def test_downscale_to_target_dpi():
+    """
+    Images above the target resolution shrink to it, others are left alone.
+    """
+    array = np.zeros((1200, 800), dtype=np.uint8)
+
+    assert downscale(array, 600, 300).shape == (600, 400)
+    assert downscale(array, 200, 300) is array
+    assert downscale(array, None, 300) is array
+
+
+@pytest.mark.parametrize("degrees", [4.0, -6.0])
+def test_deskew_levels_text(degrees: float):
+    """
+    Tilted text is rotated back to horizontal.
+    """
+    page = np.asarray(text_raster(800, 600, 20))
+    tilted = rotated(page, degrees)
+    assert deskew_angle(cv.threshold(tilted, 127, 255, cv.THRESH_BINARY)[1]) == pytest.approx(-degrees, abs=0.5)
+
+    levelled = deskew(tilted)
+
+    assert deskew_angle(cv.threshold(levelled, 127, 255, cv.THRESH_BINARY)[1]) == pytest.approx(0, abs=0.5)
+
+
+def test_preprocess_pipeline():
+    """
+    The configured steps produce a binary, single channel image at the target resolution.
+    """
+    image = text_raster(1200, 800, 10).convert("RGB")
+    image.info["dpi"] = (600, 600)
+    config = ProcessingConfig(preprocess=("strip_color", "grayscale", "downscale", "denoise", "threshold", "deskew"))
+
+    result = preprocess(image, config)
+
+    assert result.mode == "L"
+    assert result.size == (600, 400)
+    assert set(np.unique(np.asarray(result))) <= {0, 255}
+    assert result.info["dpi"] == (300, 300)
+    assert preprocess(image, ProcessingConfig()) is image
+    with pytest.raises(ValueError, match="Unknown preprocessing steps"):
+        preprocess(image, ProcessingConfig(preprocess=("sharpen",)))
+
+
+def test_preprocessing_runs_before_ocr_and_keys_the_cache(tmp_path: Path, mocker):
+    """
+    tesseract receives the preprocessed image, and results are cached per preprocessing setting.
+    """
+    image_to_string = mocker.patch("pytesseract.image_to_string", return_value="stub text")
+    mocker.patch("pytesseract.get_tesseract_version", return_value="5.3.0")
+    cache_path = str(tmp_path / "ocr.sqlite")
+    plain = ProcessingConfig(ocr_cache_path=cache_path)
+    cleaned = ProcessingConfig(ocr_cache_path=cache_path, preprocess=("grayscale", "threshold"))
+
+    PNGProcessor(PNG_FILE, logger, plain).process()
+    PNGProcessor(PNG_FILE, logger, cleaned).process()
+    PNGProcessor(PNG_FILE, logger, cleaned).process()
+
+    assert image_to_string.call_count == 2
+    assert isinstance(image_to_string.call_args_list[1].args[0], Image.Image)
+    assert image_to_string.call_args_list[1].args[0].mode == "L"
+    assert identity(plain) == ""
+    assert identity(cleaned) != identity(ProcessingConfig(preprocess=("grayscale",)))
+    assert plain.fingerprint() != cleaned.fingerprint()
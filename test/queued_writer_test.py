@@ -0,0 +1,221 @@
+"""
+This module contains tests for QueuedWriter in documentanalysis.store,
+which moves another writer's work onto a background thread.
+"""
+
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from documentanalysis.config import ProcessingConfig
+from documentanalysis.ocr import Document
+from documentanalysis.store import QueuedWriter, SQLiteWriter, StoreWriter, close_all_writers
+
+logger: logging.Logger = logging.getLogger(name=__name__)
+
+SCANNED_PDF = Path("test/test_files/201100030.pdf")
+
+
+class RecordingWriter(StoreWriter):
+    """
+    Keeps what it saves, optionally after a delay or a number of failures.
+    """
+
+    def __init__(self, delay: float = 0.0, failures: int = 0, raises: bool = False) -> None:
+        self.path = {"uri": "memory"}
+        self.auth = {}
+        self.delay = delay
+        self.failures = failures
+        self.raises = raises
+        self.saved: list[Any] = []
+        self.threads: set[str] = set()
+        self.flushes = 0
+        self.closed = False
+
+    def save(self, obj: Any, logger: logging.Logger) -> bool:
+        self.threads.add(threading.current_thread().name)
+        time.sleep(self.delay)
+        if self.failures:
+            self.failures -= 1
+            if self.raises:
+                raise ConnectionError("storage unavailable")
+            return False
+        self.saved.append(obj)
+        return True
+
+    def flush(self, logger: logging.Logger) -> bool:
+        self.flushes += 1
+        return True
+
+    def close(self, logger: logging.Logger) -> None:
+        self.closed = True
+
+
+def test_saves_do_not_wait_on_the_writer():
+    """
+    Saving returns at once and the writes happen in order on the writer's own thread.
+    """
+    inner = RecordingWriter(delay=0.05)
+    writer = QueuedWriter(writer=inner)
+
+    start = time.perf_counter()
+    for number in range(5):
+        assert writer.save({"number": number}, logger=logger)
+    assert time.perf_counter() - start < 0.05
+
+    assert writer.flush(logger=logger)
+    assert [obj["number"] for obj in inner.saved] == [0, 1, 2, 3, 4]
+    assert inner.flushes == 1
+    assert threading.current_thread().name not in inner.threads
+    writer.close(logger=logger)
+    assert inner.closed
+
+
+def test_full_queue_applies_backpressure():
+    """
+    Once max_pending calls are waiting, the caller blocks until the writer catches up.
+    """
+    writer = QueuedWriter(writer=RecordingWriter(delay=0.05), max_pending=1)
+
+    start = time.perf_counter()
+    for number in range(4):
+        writer.save({"number": number}, logger=logger)
+    assert time.perf_counter() - start >= 0.05
+    writer.close(logger=logger)
+
+
+def test_failed_saves_are_retried_with_backoff():
+    """
+    Saves that fail or raise are retried, and counted once the retries run out.
+    """
+    inner = RecordingWriter(failures=2, raises=True)
+    writer = QueuedWriter(writer=inner, retries=2, backoff=0.01)
+    writer.save({"number": 1}, logger=logger)
+    writer.flush(logger=logger)
+    assert inner.saved == [{"number": 1}]
+    assert writer.failed == 0
+
+    inner.failures = 3
+    writer.save({"number": 2}, logger=logger)
+    writer.close(logger=logger)
+    assert inner.saved == [{"number": 1}]
+    assert writer.failed == 1
+
+
+class BufferingWriter(StoreWriter):
+    """
+    Buffers what it saves, like MongoWriter, and fails to write the buffer out a number of times.
+    """
+
+    def __init__(self, failures: int = 0) -> None:
+        self.path = {"uri": "memory"}
+        self.auth = {}
+        self.failures = failures
+        self.buffer: list[Any] = []
+        self.written: list[Any] = []
+        self.saves = 0
+
+    def save(self, obj: Any, logger: logging.Logger) -> bool:
+        self.saves += 1
+        self.buffer.append(obj)
+        return self.flush(logger=logger)
+
+    def flush(self, logger: logging.Logger) -> bool:
+        if self.failures:
+            self.failures -= 1
+            return False
+        self.written += self.buffer
+        self.buffer = []
+        return True
+
+    def pending(self) -> int:
+        return len(self.buffer)
+
+    def discard(self, logger: logging.Logger) -> int:
+        dropped, self.buffer = len(self.buffer), []
+        return dropped
+
+
+def test_retries_flush_the_buffered_batch():
+    """
+    Once the wrapped writer holds a failed batch, retries flush it rather than saving the object again.
+    """
+    inner = BufferingWriter(failures=2)
+    writer = QueuedWriter(writer=inner, retries=2, backoff=0.01)
+    writer.save({"number": 1}, logger=logger)
+
+    assert writer.flush(logger=logger)
+    assert inner.saves == 1
+    assert inner.written == [{"number": 1}]
+    writer.close(logger=logger)
+
+
+def test_flush_reports_failed_writes():
+    """
+    Writes that fail for good make the next flush return False, and their batch is dropped.
+    """
+    inner = BufferingWriter(failures=3)
+    writer = QueuedWriter(writer=inner, retries=2, backoff=0.01)
+    writer.save({"number": 1}, logger=logger)
+
+    assert not writer.flush(logger=logger)
+    assert writer.failed == 1
+    assert inner.pending() == 0
+
+    writer.save({"number": 2}, logger=logger)
+    assert writer.flush(logger=logger)
+    assert inner.written == [{"number": 2}]
+    writer.close(logger=logger)
+
+
+def test_confirm_reports_from_the_thread():
+    """
+    confirm returns at once, and the thread reports whether everything queued before it was written.
+    """
+    inner = BufferingWriter(failures=3)
+    writer = QueuedWriter(writer=inner, retries=2, backoff=0.01)
+    outcomes: list[tuple[bool, str]] = []
+
+    def report(written: bool) -> None:
+        outcomes.append((written, threading.current_thread().name))
+
+    writer.save({"number": 1}, logger=logger)
+    writer.confirm(report, logger=logger)
+    writer.save({"number": 2}, logger=logger)
+    writer.confirm(report, logger=logger)
+    writer.close(logger=logger)
+
+    assert [written for written, _ in outcomes] == [False, True]
+    assert threading.current_thread().name not in {thread for _, thread in outcomes}
+    assert inner.written == [{"number": 2}]
+
+
+def test_close_all_writers_drains_the_queue():
+    """
+    Queued work is written when the writers are closed at shutdown.
+    """
+    inner = RecordingWriter(delay=0.01)
+    writer = QueuedWriter(writer=inner)
+    for number in range(10):
+        writer.save({"number": number}, logger=logger)
+
+    close_all_writers(logger)
+
+    assert len(inner.saved) == 10
+    assert inner.closed
+
+
+def test_document_streams_through_a_queued_writer(mocker, tmp_path: Path):
+    """
+    Streamed pages and the end of the document reach the wrapped writer in order.
+    """
+    mocker.patch("pytesseract.image_to_string", return_value="stub text")
+    writer = QueuedWriter(writer=SQLiteWriter(path={"uri": str(tmp_path / "plat.sqlite")}))
+
+    Document(location=SCANNED_PDF, logger=logger, writers=[writer], config=ProcessingConfig(stream_pages=True))
+    writer.flush(logger=logger)
+
+    assert [match["page"] for match in writer.writer.search("stub")] == [0, 1, 2, 3]
+    writer.close(logger=logger)
@@ -0,0 +1,103 @@
+"""
+This module contains tests for recognising files by their header and for the TIFF and JPEG processors.
+"""
+
+import logging
+import shutil
+from pathlib import Path
+
+import pytest
+from PIL import Image, ImageDraw  # pylint: disable=import-error
+
+from documentanalysis.config import ProcessingConfig
+from documentanalysis.ocr import Document
+from documentanalysis.processors import TIFFProcessor
+from documentanalysis.registry import JPEG, PDF, PNG, TIFF, sniff
+
+logger: logging.Logger = logging.getLogger(name=__name__)
+
+PDF_FILE = Path("test/test_files/201100030.pdf")
+PNG_FILE = Path("test/test_files/Pasted image 20240209155743.png")
+
+
+def page(number: int) -> Image.Image:
+    """
+    A grayscale page with a line of text on it.
+    """
+    image = Image.new("L", (400, 200), color=255)
+    ImageDraw.Draw(image).text((20, 20), f"Page {number} of the recorded plat", fill=0)
+    return image
+
+
+@pytest.fixture(name="tiff_file")
+def fixture_tiff_file(tmp_path: Path) -> Path:
+    """
+    A three page TIFF scan.
+    """
+    path = tmp_path / "scan.tif"
+    first, *rest = [page(number) for number in range(3)]
+    first.save(path, save_all=True, append_images=rest, compression="tiff_lzw")
+    return path
+
+
+def test_sniff(tmp_path: Path, tiff_file: Path):
+    """
+    Files are recognised by their header, whatever their name.
+    """
+    page(0).save(tmp_path / "photo.dat", format="JPEG")
+    shutil.copy(PNG_FILE, tmp_path / "clipping.pdf")
+    (tmp_path / "prefixed.bin").write_bytes(b"\x00scanner junk\n" + PDF_FILE.read_bytes())
+    (tmp_path / "notes.pdf").write_text("not a document", encoding="utf-8")
+
+    assert sniff(PDF_FILE) is PDF
+    assert sniff(PNG_FILE) is PNG
+    assert sniff(tiff_file) is TIFF
+    assert sniff(tmp_path / "photo.dat") is JPEG
+    assert sniff(tmp_path / "clipping.pdf") is PNG
+    assert sniff(tmp_path / "prefixed.bin") is PDF
+    assert sniff(tmp_path / "notes.pdf") is None
+
+
+def test_tiff_pages_are_streamed(tiff_file: Path, stub_tesseract):
+    """
+    TIFF pages are decoded and OCR'd one at a time, as they are reached.
+    """
+    pages = TIFFProcessor(tiff_file, logger).stream()
+
+    first = next(pages)
+    assert stub_tesseract.call_count == 1
+    assert first.page == 0
+    assert first.images[0].text == "stub text"
+    assert [record.page for record in pages] == [1, 2]
+    assert stub_tesseract.call_count == 3
+
+
+def test_document_processes_tiff(tiff_file: Path, stub_tesseract, list_writer):
+    """
+    A TIFF scan is saved in the same structure as a PDF, one page per frame.
+    """
+    writer = list_writer
+    Document(location=tiff_file, logger=logger, writers=[writer], config=ProcessingConfig())
+
+    (saved,) = writer.saved
+    assert saved.kind == "tiff"
+    assert saved.properties["format"] == "TIFF"
+    assert saved.properties["pages"] == 3
+    assert [record.page for record in saved.pages] == [0, 1, 2]
+    assert all(record.errors == [] for record in saved.pages)
+
+
+def test_document_processes_misnamed_jpeg(tmp_path: Path, stub_tesseract, list_writer):
+    """
+    A JPEG is OCR'd as one image even when its name says otherwise.
+    """
+    path = tmp_path / "clipping.png"
+    page(0).save(path, format="JPEG")
+    writer = list_writer
+    Document(location=path, logger=logger, writers=[writer], config=ProcessingConfig())
+
+    (saved,) = writer.saved
+    assert saved.kind == "jpeg"
+    assert saved.properties["format"] == "JPEG"
+    assert saved.text == "stub text"
+    assert stub_tesseract.call_count == 1
@@ -0,0 +1,92 @@
+"""
+This module contains tests for rasterising PDF pages with PyMuPDF and for falling back
+between the rendered and the embedded image raster paths.
+"""
+
+import logging
+from pathlib import Path
+
+import pytest
+
+from documentanalysis.config import ProcessingConfig
+from documentanalysis.processors import IMAGES, RENDER, PDFProcessor
+from documentanalysis.results import ErrorRecord, ImageRecord
+from documentanalysis.session import PDFSession
+
+logger: logging.Logger = logging.getLogger(name=__name__)
+
+SCANNED_PDF = Path("test/test_files/201100030.pdf")
+
+
+@pytest.fixture
+def image_to_string(mocker):
+    """
+    Replace tesseract with a stub that records the images it is given.
+    """
+    return mocker.patch("pytesseract.image_to_string", return_value="stub text")
+
+
+def test_render_page_at_dpi():
+    """
+    Pages render straight into a PIL image of the requested size and mode.
+    """
+    with PDFSession(SCANNED_PDF, logger) as session:
+        rect = session.document[0].rect
+        gray = session.render_page(0, dpi=72, colorspace="gray")
+        rgb = session.render_page(0, dpi=144, colorspace="rgb")
+
+        assert gray.mode == "L"
+        assert gray.size == pytest.approx((rect.width, rect.height), abs=1)
+        assert rgb.mode == "RGB"
+        assert rgb.size == pytest.approx((rect.width * 2, rect.height * 2), abs=2)
+        with pytest.raises(ValueError, match="Unknown colorspace"):
+            session.render_page(0, colorspace="cmyk")
+
+
+def test_processor_renders_pages(image_to_string):
+    """
+    With page_raster set to render, each page is OCR'd once as a whole, at the configured DPI.
+    """
+    config = ProcessingConfig(page_raster=RENDER, render_dpi=100)
+
+    record = PDFProcessor(SCANNED_PDF, logger, config).process()
+
+    assert image_to_string.call_count == 4
+    assert {image.mode for image in (call.args[0] for call in image_to_string.call_args_list)} == {"L"}
+    for page in record.pages:
+        assert page.raster == RENDER
+        assert page.images == [ImageRecord(format=RENDER, text="stub text", dpi=100)]
+
+
+def test_failed_image_extraction_falls_back_to_render(image_to_string, mocker):
+    """
+    A page whose embedded images cannot be decoded is rendered instead of being lost.
+    """
+
+    def unsupported(page, errors):
+        errors.append(ErrorRecord("unsupported filter /JBIG2Decode", "NotImplementedError"))
+        return []
+
+    processor = PDFProcessor(SCANNED_PDF, logger)
+    mocker.patch.object(processor, "collect_pdf_images", side_effect=unsupported)
+
+    pages = processor.process().pages
+
+    assert [page.raster for page in pages] == [RENDER] * 4
+    assert all(page.images[0].text == "stub text" for page in pages)
+    assert pages[0].errors == [ErrorRecord("unsupported filter /JBIG2Decode", "NotImplementedError")]
+
+
+def test_failed_render_falls_back_to_images(image_to_string):
+    """
+    A page PyMuPDF cannot render goes through the embedded images instead.
+    MuPDF refuses a raster this large with FzErrorLimit, which is not a RuntimeError.
+    """
+    config = ProcessingConfig(page_raster=RENDER, render_dpi=200_000)
+
+    pages = PDFProcessor(SCANNED_PDF, logger, config).process().pages
+
+    assert [page.raster for page in pages] == [IMAGES] * 4
+    assert all(page.images[0].format == "TIFF" for page in pages)
+    assert "Overly large image" in pages[0].errors[0].message
+    assert pages[0].errors[0].error_type == "FzErrorLimit"
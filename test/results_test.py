@@ -0,0 +1,137 @@
+"""
+This module contains tests for the typed result model handed to the writers and its serialization.
+"""
+
+import json
+import logging
+from pathlib import Path
+
+import pytest
+from pypdf import PdfReader  # pylint: disable=import-error
+from pypdf.generic import ArrayObject, FloatObject, NameObject, NumberObject, TextStringObject
+
+from documentanalysis import results
+from documentanalysis.ocr import Document
+from documentanalysis.results import SCHEMA_VERSION, DocumentRecord, ErrorRecord, ImageRecord, PageRecord, plain
+from documentanalysis.store import FileWriter
+
+logger: logging.Logger = logging.getLogger(name=__name__)
+
+SEARCHABLE_PDF = Path("test/test_files/AR Dec - Bluffs v01.pdf")
+SCANNED_PDF = Path("test/test_files/201100030.pdf")
+PNG_FILE = Path("test/test_files/Pasted image 20240209155743.png")
+
+
+def test_plain_turns_pypdf_objects_into_json_types():
+    """
+    pypdf's strings, numbers and arrays, and the document information of a real file, become plain values.
+    """
+    size = ArrayObject([NumberObject(3), FloatObject(1.5)])
+    value = plain({NameObject("/Title"): TextStringObject("Plat"), "/Size": size})
+    assert value == {"/Title": "Plat", "/Size": [3, 1.5]}
+    assert type(value["/Title"]) is str  # pylint: disable=unidiomatic-typecheck
+    assert plain(b"\x01\xff") == "01ff"
+
+    information = plain(PdfReader(SEARCHABLE_PDF).metadata)
+    assert information["/Author"] == "Ashley Koirtyohann"
+    assert json.loads(json.dumps(information)) == information
+
+
+def test_page_record_from_dict():
+    """
+    Page dicts are read into records, with error strings found among the images moved to the errors.
+    Errors keep their type in the dict.
+    """
+    page = PageRecord.from_dict(
+        {
+            "page": 2,
+            "strategy": "ocr",
+            "text": "",
+            "raster": "images",
+            "images": [{"format": "TIFF", "text": "Lot 31", "sha256": "ab", "xref": 7}, "struct error on image"],
+            "errors": [{"message": "cannot render", "error_type": "FzErrorLimit"}],
+            "text_chars": 0,
+            "timings": {"total": 0.5},
+            "note": "kept",
+        }
+    )
+    assert page.images == [ImageRecord(format="TIFF", text="Lot 31", sha256="ab", xref=7)]
+    assert page.errors == [ErrorRecord("cannot render", "FzErrorLimit"), ErrorRecord("struct error on image")]
+    assert page.search_text == "Lot 31"
+    assert page.as_dict() == {
+        "page": 2,
+        "strategy": "ocr",
+        "text": "",
+        "raster": "images",
+        "images": [{"format": "TIFF", "text": "Lot 31", "sha256": "ab", "xref": 7}],
+        "errors": [{"message": "cannot render", "error_type": "FzErrorLimit"}, {"message": "struct error on image"}],
+        "text_chars": 0,
+        "timings": {"total": 0.5},
+        "note": "kept",
+    }
+    assert not hasattr(page, "__dict__")
+
+
+@pytest.mark.usefixtures("stub_tesseract")
+def test_document_records_share_one_structure(list_writer):
+    """
+    PDFs and images reach the writers as records with the same layout, a schema version and only plain values.
+    """
+    writer = list_writer
+
+    Document(location=SCANNED_PDF, logger=logger, writers=[writer])
+    Document(location=PNG_FILE, logger=logger, writers=[writer])
+
+    pdf, png = writer.saved
+    for saved in (pdf, png):
+        assert isinstance(saved, DocumentRecord)
+        document = saved.as_dict()
+        assert document["schema_version"] == SCHEMA_VERSION
+        assert json.loads(json.dumps(document)) == document
+        assert document["pdf_pages"][0]["images"][0]["text"] == "stub text"
+    assert pdf.kind == "pdf"
+    assert pdf.path == str(SCANNED_PDF)
+    assert isinstance(pdf.properties["pdf_file_metadata"], dict)
+    assert len(pdf.pages) == 4
+    assert png.kind == "png"
+    assert png.path == str(PNG_FILE)
+    assert png.text == "stub text"
+    assert "text" not in png.as_dict()
+    assert png.pages[0].images[0].format == "PNG"
+
+
+def test_file_writer_writes_pdf_pages(tmp_path):
+    """
+    Documents without a top level text are written as the text of their pages.
+    """
+    record = DocumentRecord(
+        path="plat.pdf",
+        kind="pdf",
+        pages=[PageRecord(page=0, text="Lot 31"), PageRecord(page=1, images=[ImageRecord("TIFF", "Block 2")])],
+    )
+    target = tmp_path / "plat.txt"
+
+    assert FileWriter(auth={}, path={"uri": str(target)}).save(record, logger=logger)
+    assert target.read_text(encoding="utf-8") == record.text == "Lot 31\nBlock 2"
+
+
+def test_dumps_without_orjson(mocker):
+    """
+    JSON falls back to the standard library and stays compact.
+    """
+    mocker.patch("documentanalysis.results._orjson", return_value=None)
+    record = DocumentRecord(path="a.png", kind="png", pages=[PageRecord(page=0, images=[ImageRecord("PNG", "é")])])
+
+    data = results.dumps(record)
+
+    assert data.startswith(b'{"schema_version":2,"kind":"png"')
+    assert results.loads(data) == record.as_dict()
+
+
+def test_msgpack_round_trip():
+    """
+    Records pack to MessagePack and back when msgpack is installed.
+    """
+    pytest.importorskip("msgpack")
+    record = DocumentRecord(path="a.png", kind="png", pages=[PageRecord(page=0, text="Lot 31")])
+    assert results.unpackb(results.packb(record)) == record.as_dict()
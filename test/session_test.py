@@ -0,0 +1,47 @@
+"""
+This module contains tests for the PDFSession class from the documentanalysis.session module
+and its use by PDFProcessor.
+"""
+
+import logging
+from pathlib import Path
+
+import fitz
+import pytest
+
+from documentanalysis.processors import PDFProcessor
+from documentanalysis.session import PDFSession
+
+logger: logging.Logger = logging.getLogger(name=__name__)
+
+SEARCHABLE_PDF = Path("test/test_files/AR Dec - Bluffs v01.pdf")
+SCANNED_PDF = Path("test/test_files/201100030.pdf")
+
+
+def test_session_caches_text():
+    """
+    The text layer is extracted once per page and reused.
+    """
+    with PDFSession(SEARCHABLE_PDF, logger) as session:
+        first = session.page_text(0)
+        assert session.page_text(0) is first
+        assert session.searchable_text.startswith(first)
+        assert session.page_count == 48
+        assert isinstance(session.metadata, dict)
+    assert session._document is None  # pylint: disable=protected-access
+
+
+def test_pdf_processor_opens_document_once(mocker):
+    """
+    OCR'ing every image on every page must not reopen the document.
+    """
+    mocker.patch("pytesseract.image_to_string", return_value="stub text")
+    fitz_open = mocker.patch("documentanalysis.session.fitz.open", wraps=fitz.open)
+
+    record = PDFProcessor(SCANNED_PDF, logger).process()
+
+    assert fitz_open.call_count == 1
+    assert len(record.pages) == 4
+    assert "searchable_text" not in record.properties
+    assert record.text.startswith("stub text")
+    assert record.pages[0].images[0].text == "stub text"
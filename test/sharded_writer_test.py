@@ -0,0 +1,118 @@
+"""
+This module contains tests for the ShardedFileWriter in documentanalysis.store.
+"""
+
+import gzip
+import json
+import os
+from logging import Logger
+from pathlib import Path
+
+import pytest
+
+from documentanalysis.store import FileWriter, ShardedFileWriter, close_all_writers
+
+logger = Logger("test")
+
+
+def record(number: int) -> dict:
+    """
+    A document record with some text.
+    """
+    return {"path": f"plats/{number}/plat.pdf", "pdf_pages": [{"page": 0, "text": f"Lot {number} Block 2 " * 20}]}
+
+
+def test_shards_rotate_and_read_back(tmp_path: Path):
+    """
+    Documents go to rotating gzip shards that are readable as a whole and one document at a time.
+    """
+    writer = ShardedFileWriter(path={"uri": str(tmp_path)}, batch_bytes=1000, max_shard_bytes=3000)
+    for number in range(20):
+        assert writer.save(record(number), logger=logger)
+    assert writer.get("plats/19/plat.pdf") == record(19)
+    writer.close(logger=logger)
+
+    shards = sorted(tmp_path.glob("documents-*.jsonl.gz"))
+    assert len(shards) > 1
+    assert not list(tmp_path.glob("*.part"))
+    assert len(list(tmp_path.glob("documents-*.idx"))) == len(shards)
+    lines = [json.loads(line) for shard in shards for line in gzip.decompress(shard.read_bytes()).splitlines()]
+    assert lines == [record(number) for number in range(20)]
+
+    reader = ShardedFileWriter(path={"uri": str(tmp_path)})
+    assert reader.get("plats/7/plat.pdf") == record(7)
+    assert reader.get("plats/missing/plat.pdf") is None
+
+
+def test_latest_save_wins(tmp_path: Path):
+    """
+    Reading a source saved twice returns what was saved last.
+    """
+    writer = ShardedFileWriter(path={"uri": str(tmp_path)}, compression="")
+    writer.save(record(1), logger=logger)
+    writer.save({**record(1), "version": 2}, logger=logger)
+    close_all_writers(logger=logger)
+
+    assert sorted(path.suffix for path in tmp_path.iterdir()) == [".idx", ".jsonl"]
+    assert ShardedFileWriter(path={"uri": str(tmp_path)}, compression="").get("plats/1/plat.pdf")["version"] == 2
+
+
+def test_unknown_compression(tmp_path: Path):
+    """
+    Only the known compressions are accepted.
+    """
+    with pytest.raises(ValueError):
+        ShardedFileWriter(path={"uri": str(tmp_path)}, compression="lz4")
+
+
+def test_file_writer_replaces_atomically(tmp_path: Path):
+    """
+    FileWriter leaves only the finished file behind.
+    """
+    target = tmp_path / "plat.txt"
+    writer = FileWriter(auth={}, path={"uri": str(target)})
+    assert writer.save({"text": "first"}, logger=logger)
+    assert writer.save({"text": "second"}, logger=logger)
+    assert target.read_text(encoding="utf-8") == "second"
+    assert [path.name for path in tmp_path.iterdir()] == ["plat.txt"]
+
+
+def test_open_shards_are_readable_from_other_writers(tmp_path: Path):
+    """
+    A flushed document is found through the .part index of a shard another writer still has open.
+    """
+    writer = ShardedFileWriter(path={"uri": str(tmp_path)})
+    writer.save(record(1), logger=logger)
+    assert writer.flush(logger=logger)
+
+    assert sorted(path.name.split(".", 1)[1] for path in tmp_path.iterdir()) == ["idx.part", "part"]
+    assert ShardedFileWriter(path={"uri": str(tmp_path)}).get("plats/1/plat.pdf") == record(1)
+    writer.close(logger=logger)
+
+
+def test_shards_of_dead_processes_are_sealed(tmp_path: Path):
+    """
+    A worker that dies after a flush leaves its shard open; the next writer seals it with every flushed document and
+    without the batch that was being written when it died.
+    """
+    pid = os.fork()
+    if pid == 0:
+        writer = ShardedFileWriter(path={"uri": str(tmp_path)})
+        writer.save(record(1), logger=logger)
+        writer.flush(logger=logger)
+        writer.save(record(2), logger=logger)
+        writer.flush(logger=logger)
+        # A batch that reached the shard but not the index.
+        writer._shard.write(b"torn batch")  # pylint: disable=protected-access
+        writer._shard.flush()  # pylint: disable=protected-access
+        os._exit(0)  # pylint: disable=protected-access
+    os.waitpid(pid, 0)
+
+    writer = ShardedFileWriter(path={"uri": str(tmp_path)})
+    assert writer.get("plats/2/plat.pdf") == record(2)
+    assert not list(tmp_path.glob("*.part"))
+    shards = list(tmp_path.glob("documents-*.jsonl.gz"))
+    assert len(shards) == 1
+    lines = [json.loads(line) for line in gzip.decompress(shards[0].read_bytes()).splitlines()]
+    assert lines == [record(1), record(2)]
+    assert len((tmp_path / shards[0].name.replace(".jsonl.gz", ".idx")).read_text(encoding="utf-8").splitlines()) == 2
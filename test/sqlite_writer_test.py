@@ -0,0 +1,192 @@
+"""
+This module contains tests for the batched SQLiteWriter in documentanalysis.store.
+"""
+
+import sqlite3
+from logging import Logger
+from pathlib import Path
+
+import pytest
+
+from documentanalysis.results import DocumentRecord, ErrorRecord, ImageRecord, PageRecord
+from documentanalysis.store import SQLiteWriter, close_all_writers
+
+logger = Logger("test")
+
+PDF_RECORD = {
+    "path": "test/test_files/201100030.pdf",
+    "pdf_metadata": {"title": "Spyglass Ridge"},
+    "searchable_text": "Lot 31 Block 2",
+    "pdf_pages": [
+        {"page": 0, "strategy": "text", "text": "Lot 31 Block 2", "images": [], "errors": []},
+        {
+            "page": 1,
+            "strategy": "ocr",
+            "text": "",
+            "images": [{"format": "TIFF", "text": "recorded in Book 1234"}],
+            "errors": [],
+        },
+    ],
+}
+
+
+@pytest.fixture
+def writer(tmp_path: Path):
+    """
+    A writer on a fresh database, closed after the test.
+    """
+    sqlite_writer = SQLiteWriter(path={"uri": str(tmp_path / "plat.sqlite")}, batch_size=2, flush_interval=60)
+    yield sqlite_writer
+    sqlite_writer.close(logger=logger)
+
+
+def count(writer: SQLiteWriter, table: str) -> int:
+    """
+    Rows in a table.
+    """
+    return writer.connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_sqlite_writer_buffers_until_batch_size(writer: SQLiteWriter):
+    """
+    Nothing is written until batch_size documents are waiting, then they are written in WAL mode.
+    """
+    writer.save({"file": "a.png", "text": "a clipping"}, logger=logger)
+    assert count(writer, "documents") == 0
+
+    writer.save(PDF_RECORD, logger=logger)
+    assert count(writer, "documents") == 2
+    assert count(writer, "pages") == 3
+    assert count(writer, "images") == 1
+    assert writer.connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_sqlite_writer_full_text_search(writer: SQLiteWriter):
+    """
+    Page text and image OCR text are both searchable.
+    """
+    writer.save(PDF_RECORD, logger=logger)
+    writer.save({"file": "a.png", "text": "a clipping about Spyglass"}, logger=logger)
+
+    assert writer.search("Block") == [{"source": PDF_RECORD["path"], "page": 0, "text": "Lot 31 Block 2"}]
+    assert [match["page"] for match in writer.search("Book")] == [1]
+    assert [match["source"] for match in writer.search("spyglass")] == ["a.png"]
+
+
+def test_sqlite_writer_replaces_saved_documents(writer: SQLiteWriter):
+    """
+    Saving a document again replaces its pages and its index entries.
+    """
+    writer.save(PDF_RECORD, logger=logger)
+    writer.flush(logger=logger)
+    second_run = {**PDF_RECORD, "pdf_pages": [{"page": 0, "text": "Lot 32 Block 3", "images": []}]}
+    writer.save(second_run, logger=logger)
+    writer.flush(logger=logger)
+
+    assert count(writer, "documents") == 1
+    assert count(writer, "pages") == 1
+    assert count(writer, "images") == 0
+    assert writer.search("Book") == []
+    assert writer.search("31") == []
+    assert [match["text"] for match in writer.search("32")] == ["Lot 32 Block 3"]
+
+
+def test_sqlite_writer_saves_records(writer: SQLiteWriter):
+    """
+    Records are serialized by the writer, with the text stored once and the type of each error kept.
+    """
+    record = DocumentRecord(
+        path="plat.pdf",
+        kind="pdf",
+        pages=[
+            PageRecord(
+                page=0,
+                images=[ImageRecord("TIFF", "recorded in Book 1234")],
+                errors=[ErrorRecord("cannot render", "FzErrorLimit")],
+            )
+        ],
+    )
+    writer.save(record, logger=logger)
+    writer.flush(logger=logger)
+
+    assert [match["page"] for match in writer.search("Book")] == [0]
+    assert writer.connection.execute("SELECT errors FROM pages").fetchone()[0] == (
+        '[{"message": "cannot render", "error_type": "FzErrorLimit"}]'
+    )
+    assert "Book" not in writer.connection.execute("SELECT metadata FROM documents").fetchone()[0]
+
+
+def test_close_all_writers_flushes(tmp_path: Path):
+    """
+    Buffered documents are written when the writers are closed at shutdown.
+    """
+    database = tmp_path / "plat.sqlite"
+    writer = SQLiteWriter(path={"uri": str(database)}, batch_size=100, flush_interval=60)
+    writer.save({"file": "a.png", "text": "a clipping"}, logger=logger)
+    writer.flush(logger=logger)
+    writer.save({"file": "b.png", "text": "b clipping"}, logger=logger)
+
+    close_all_writers(logger)
+
+    with sqlite3.connect(database) as connection:
+        assert connection.execute("SELECT COUNT(*) FROM documents").fetchone()[0] == 2
+
+
+def test_close_all_writers_opens_the_database(tmp_path: Path):
+    """
+    A writer that has only buffered, and never opened its database, is still flushed at shutdown.
+    """
+    database = tmp_path / "plat.sqlite"
+    writer = SQLiteWriter(path={"uri": str(database)}, batch_size=100, flush_interval=60)
+    writer.save({"file": "a.png", "text": "a clipping"}, logger=logger)
+    assert writer._connection is None  # pylint: disable=protected-access
+
+    close_all_writers(logger)
+
+    with sqlite3.connect(database) as connection:
+        assert connection.execute("SELECT COUNT(*) FROM documents").fetchone()[0] == 1
+
+
+def test_failed_flush_keeps_the_buffer(tmp_path: Path):
+    """
+    Documents stay buffered while the database is locked and are written by the next flush.
+    """
+    database = tmp_path / "plat.sqlite"
+    writer = SQLiteWriter(path={"uri": str(database)}, batch_size=100, flush_interval=60, timeout=0.1)
+    writer.save({"file": "a.png", "text": "a clipping"}, logger=logger)
+    writer.connection  # pylint: disable=pointless-statement
+    other = sqlite3.connect(database, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+
+    assert not writer.flush(logger=logger)
+    other.execute("ROLLBACK")
+    other.close()
+
+    assert writer.flush(logger=logger)
+    assert count(writer, "documents") == 1
+    writer.close(logger=logger)
+
+
+def test_interrupted_flush_releases_the_database(tmp_path: Path, mocker):
+    """
+    An error other than a database error part way through a flush rolls the transaction back and releases the lock,
+    so other connections can write and the next flush writes the whole batch.
+    """
+    database = tmp_path / "plat.sqlite"
+    writer = SQLiteWriter(path={"uri": str(database)}, batch_size=100, flush_interval=60, timeout=0.1)
+    writer.save(PDF_RECORD, logger=logger)
+    writer.save({"file": "a.png", "text": "a clipping"}, logger=logger)
+    mocker.patch.object(SQLiteWriter, "_write", side_effect=[1, OSError("file vanished")])
+
+    with pytest.raises(OSError):
+        writer.flush(logger=logger)
+    assert not writer.connection.in_transaction
+    other = sqlite3.connect(database, timeout=0.1, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    other.execute("ROLLBACK")
+    other.close()
+
+    mocker.stopall()
+    assert writer.flush(logger=logger)
+    assert count(writer, "documents") == 2
+    writer.close(logger=logger)
@@ -0,0 +1,28 @@
+"""
+This module contains tests that the modules loaded by the CLI and the ingestion workers leave the heavy document and
+storage libraries to be imported when they are needed. How long they take to import depends on the machine, and is
+reported against the startup budget by documentanalysis.benchmark rather than tested.
+"""
+
+import pytest
+
+from documentanalysis import ocr, processors
+from documentanalysis.benchmark import STARTUP_MODULES, measure_startup
+
+
+@pytest.mark.parametrize("module", [*STARTUP_MODULES, "documentanalysis.ocr", "documentanalysis.image_analysis"])
+def test_import_leaves_heavy_libraries_unloaded(module: str):
+    """
+    Importing the module pulls in none of PyMuPDF, pypdf, PIL, OpenCV, tesseract or the database drivers.
+    """
+    assert measure_startup(module)["heavy_modules"] == []
+
+
+def test_processors_are_imported_lazily():
+    """
+    The processors stay importable from documentanalysis.ocr, loaded on first access.
+    """
+    assert ocr.PDFProcessor is processors.PDFProcessor
+    assert ocr.PNGProcessor is processors.PNGProcessor
+    with pytest.raises(AttributeError):
+        ocr.NotAProcessor  # pylint: disable=pointless-statement
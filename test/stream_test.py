@@ -0,0 +1,73 @@
+"""
+This module contains tests for processing PDFs one page at a time with PDFProcessor.stream
+and for writers consuming the pages as they arrive.
+"""
+
+import logging
+from pathlib import Path
+
+import pytest
+
+from documentanalysis.config import ProcessingConfig
+from documentanalysis.ocr import Document
+from documentanalysis.processors import PDFProcessor
+from documentanalysis.session import PDFSession
+from documentanalysis.store import FileWriter
+
+logger: logging.Logger = logging.getLogger(name=__name__)
+
+SCANNED_PDF = Path("test/test_files/201100030.pdf")
+
+
+pytestmark = pytest.mark.usefixtures("stub_tesseract")
+
+
+def test_stream_yields_pages_one_at_a_time():
+    """
+    Pages come out in order with their timings and errors, and are not collected on the processor.
+    """
+    processor = PDFProcessor(SCANNED_PDF, logger)
+    pages = processor.stream()
+
+    first = next(pages)
+    assert first.page == 0
+    assert set(first.timings) == {"extract", "ocr", "total"}
+    assert first.errors == []
+    assert [page.page for page in pages] == [1, 2, 3]
+    assert "pdf_pages" not in processor.metadata
+    assert processor.metadata["page_strategies"] == {"ocr": 4}
+
+
+def test_release_page_drops_decoded_images():
+    """
+    The decoded image streams of a page are dropped once the page is done.
+    """
+    with PDFSession(SCANNED_PDF, logger) as session:
+        page = session.reader.pages[0]
+        assert page.images[0].data
+        xobject = page.images[0].indirect_reference.get_object()
+        assert xobject.decoded_self is not None
+
+        session.release_page(0, page)
+
+        assert xobject.decoded_self is None
+
+
+def test_document_streams_to_writers(tmp_path: Path, list_writer):
+    """
+    A streaming FileWriter writes each page as it arrives, other writers get the whole document at the end.
+    """
+    output = tmp_path / "out.txt"
+    file_writer = FileWriter(auth={}, path={"uri": str(output)})
+
+    Document(
+        location=SCANNED_PDF,
+        logger=logger,
+        writers=[file_writer, list_writer],
+        config=ProcessingConfig(stream_pages=True),
+    )
+
+    assert output.read_text(encoding="utf-8").count("stub text") == 4
+    (saved,) = list_writer.saved
+    assert len(saved.pages) == 4
+    assert saved.path == str(SCANNED_PDF)
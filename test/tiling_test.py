@@ -0,0 +1,135 @@
+"""
+This module contains tests for OCR'ing very large images tile by tile with documentanalysis.tiling.
+"""
+
+import itertools
+import logging
+import threading
+
+import pytest
+from PIL import Image, ImageDraw
+
+from documentanalysis.config import ProcessingConfig
+from documentanalysis.processors import image_to_text
+from documentanalysis.tiling import GRID, REGIONS, Tile, grid_tiles, merge_text, ocr_tiled, plan_tiles
+
+logger: logging.Logger = logging.getLogger(name=__name__)
+
+
+@pytest.fixture
+def sheet() -> Image.Image:
+    """
+    A large blank sheet with two blocks of text far apart.
+    """
+    image = Image.new("L", (3000, 2000), color=255)
+    draw = ImageDraw.Draw(image)
+    for line in range(3):
+        draw.text((100, 100 + line * 14), "Lot 31 Block 2 Spyglass Ridge", fill=0)
+        draw.text((2200, 1700 + line * 14), "Recorded in Book 1234 Page 567", fill=0)
+    return image
+
+
+def test_grid_tiles_cover_with_overlap():
+    """
+    Tiles are no larger than the tile size, overlap their neighbours and cover the whole image.
+    """
+    tiles = grid_tiles(1000, 600, tile_size=400, overlap=50)
+
+    assert all(tile.width <= 400 and tile.height <= 400 for tile in tiles)
+    assert {(tile.x, tile.y) for tile in tiles} == {(x, y) for x in (0, 350, 700) for y in (0, 350)}
+    assert max(tile.x + tile.width for tile in tiles) == 1000
+    assert max(tile.y + tile.height for tile in tiles) == 600
+
+
+def test_text_regions_skip_blank_paper(sheet: Image.Image):
+    """
+    Only the blocks of text are OCR'd, each as one region.
+    """
+    tiles = plan_tiles(sheet, ProcessingConfig(tile_mode=REGIONS))
+
+    assert len(tiles) == 2
+    first, second = sorted(tiles, key=lambda tile: tile.y)
+    assert first.x <= 100 and first.y <= 100 and first.x + first.width > 250
+    assert second.x <= 2200 and second.y <= 1700
+    assert sum(tile.width * tile.height for tile in tiles) < sheet.width * sheet.height / 20
+
+
+def test_merge_text_in_reading_order():
+    """
+    Pieces are read top to bottom then left to right, and lines repeated where two tiles overlap are kept once.
+    """
+    results = [
+        {"x": 0, "y": 900, "width": 1000, "height": 100, "text": "third"},
+        {"x": 900, "y": 0, "width": 1000, "height": 500, "text": "second\nshared"},
+        {"x": 0, "y": 0, "width": 1000, "height": 500, "text": "first"},
+        {"x": 900, "y": 450, "width": 1000, "height": 500, "text": "shared\nafter"},
+    ]
+
+    assert merge_text(results) == "first\nsecond\nshared\nafter\nthird"
+
+
+def test_merge_text_keeps_lines_shared_by_separate_regions():
+    """
+    Regions that do not overlap keep every line, even lines another region also has.
+    """
+    results = [
+        {"x": 0, "y": 0, "width": 200, "height": 60, "text": "LOT 31\n0.25 AC"},
+        {"x": 0, "y": 100, "width": 200, "height": 60, "text": "LOT 32\n0.25 AC"},
+        {"x": 0, "y": 200, "width": 200, "height": 60, "text": "0.25 AC\nLOT 33"},
+    ]
+
+    assert merge_text(results) == "LOT 31\n0.25 AC\nLOT 32\n0.25 AC\n0.25 AC\nLOT 33"
+
+
+def test_merge_text_only_looks_inside_the_overlap():
+    """
+    A leading line is dropped only when it repeats a line of the earlier tile that lies in the rows both tiles cover.
+    """
+    above = {"x": 0, "y": 0, "width": 1000, "height": 1000, "text": "title\nbody\nbody\nfooter"}
+    below = {"x": 0, "y": 950, "width": 1000, "height": 1000, "text": "title\nfooter\nnext"}
+
+    assert merge_text([above, below]) == "title\nbody\nbody\nfooter\ntitle\nfooter\nnext"
+    below["text"] = "footer\nnext"
+    assert merge_text([above, below]) == "title\nbody\nbody\nfooter\nnext"
+
+
+def test_ocr_tiled_runs_in_parallel_and_survives_failures(sheet: Image.Image):
+    """
+    Tiles are OCR'd on several threads, and a failing tile loses only itself.
+    """
+    threads: set[str] = set()
+    barrier = threading.Barrier(2, timeout=5)
+    calls = itertools.count()
+
+    def ocr(piece: Image.Image) -> str:
+        threads.add(threading.current_thread().name)
+        barrier.wait()
+        call = next(calls)
+        if call == 0:
+            raise RuntimeError("tesseract crashed")
+        return f"tile {call} {piece.width}x{piece.height}"
+
+    config = ProcessingConfig(tile_mode=GRID, tile_size=1000, tile_overlap=0, tile_workers=2)
+    text, results = ocr_tiled(sheet, ocr, config)
+
+    assert len(results) == 6
+    assert len(threads) == 2
+    assert [result["error"] for result in results if "error" in result] == ["RuntimeError: tesseract crashed"]
+    assert len(text.splitlines()) == 5
+    assert all(line.endswith("1000x1000") for line in text.splitlines())
+
+
+def test_large_images_are_tiled_in_the_ocr_path(sheet: Image.Image, mocker):
+    """
+    Images over the size threshold go to OCR region by region, smaller ones whole.
+    """
+    image_to_string = mocker.patch("pytesseract.image_to_string", side_effect=lambda image, lang: f"{image.width}")
+    config = ProcessingConfig(tile_mode=REGIONS, tile_min_pixels=1_000_000, tile_workers=1)
+
+    text, confidence = image_to_text(sheet, None, config)
+
+    assert image_to_string.call_count == 2
+    assert len(text.splitlines()) == 2
+    assert confidence is None
+    image_to_text(sheet.crop(Tile(0, 0, 500, 500).box), None, config)
+    assert image_to_string.call_count == 3